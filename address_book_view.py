@@ -0,0 +1,264 @@
+"""Address book window for the Tk GUI.
+
+The window shows the trusted address book in a ttk.Treeview that only ever
+holds the rows currently on screen. Scrolling moves a window over the search
+results instead of the widget scrolling over every inserted row, so opening
+or searching a book of any size costs a handful of row inserts.
+
+Searches use an AddressSearchIndex: sorted lists of address keys, reversed
+keys and the word suffixes of labels, where a prefix (or suffix) query is one
+bisect. Address matches are a contiguous range that is never copied; label
+matches are the first entry of each record in that range, picked out in one
+vectorized pass over it.
+"""
+import tkinter as tk
+from bisect import bisect_left
+from operator import attrgetter, itemgetter
+from tkinter import ttk
+
+import numpy as np
+
+# Rows materialized in the Treeview
+VISIBLE_ROWS = 20
+
+# Milliseconds to wait after a keystroke before searching
+SEARCH_DELAY = 150
+
+SEARCH_MODES = ("prefix", "suffix", "label")
+
+# Sorts after every character that can appear in a key or label
+_HIGHEST = "\U0010ffff"
+
+
+class _Selection:
+    """Read-only view of the items at `positions` (a range or an integer
+    array) that does not copy the items."""
+
+    def __init__(self, items, positions):
+        self._items = items
+        self._positions = positions
+
+    def __len__(self):
+        return len(self._positions)
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self._items[i] for i in self._positions[position]]
+        if not 0 <= position < len(self):
+            raise IndexError(position)
+        return self._items[self._positions[position]]
+
+
+def _prefix_bounds(keys, prefix):
+    start = bisect_left(keys, prefix)
+    return start, bisect_left(keys, prefix + _HIGHEST, start)
+
+
+class AddressSearchIndex:
+    """Sorted views of an AddressIndex for prefix, suffix and label search.
+
+    Each view is built on its first search and dropped when the index's
+    version changes, so only the search modes in use are ever sorted.
+    """
+
+    def __init__(self, index):
+        self.index = index
+        self.version = index.version
+        self._views = {}
+
+    def __len__(self):
+        return len(self.index)
+
+    def _view(self, mode):
+        if self.version != self.index.version:
+            self._views.clear()
+            self.version = self.index.version
+        view = self._views.get(mode)
+        if view is None:
+            view = self._views[mode] = self._build(mode)
+        return view
+
+    def _build(self, mode):
+        """Returns (sorted search keys, record of each key) for a mode, and
+        for label search the position of the previous key of each record."""
+        if mode == "prefix":
+            records = sorted(self.index, key=attrgetter("key"))
+            return [record.key for record in records], records
+        if mode == "suffix":
+            entries = sorted((record.key[::-1], record) for record in self.index)
+            return [key for key, _ in entries], [record for _, record in entries]
+        if mode != "label":
+            raise ValueError(f"unknown search mode: {mode}")
+
+        # Every label is indexed from each of its words on, so "cold" and
+        # "cold wallet" find "My cold wallet"
+        entries = []
+        for record in self.index:
+            words = record.label.lower().split()
+            entries.extend((" ".join(words[i:]), record) for i in range(len(words)))
+        entries.sort(key=itemgetter(0))
+        previous = np.empty(len(entries), dtype=np.intp)
+        seen = {}
+        for position, (_, record) in enumerate(entries):
+            previous[position] = seen.get(record.key, -1)
+            seen[record.key] = position
+        return [key for key, _ in entries], [record for _, record in entries], previous
+
+    def search(self, query, mode="prefix"):
+        """Returns the records matching `query` as a sequence, sorted by
+        address for prefix search, by reversed address for suffix search
+        and by the matching part of the label for label search. An empty
+        query matches every record."""
+        query = " ".join(query.lower().split())
+        if not query:
+            mode = "prefix"
+        if mode == "suffix":
+            query = query[::-1]
+        if mode != "label":
+            keys, records = self._view(mode)
+            return _Selection(records, range(*_prefix_bounds(keys, query)))
+
+        # A record matches once even when several of its words do: an entry
+        # is kept unless an earlier entry of its record is in the range too
+        keys, records, previous = self._view(mode)
+        start, stop = _prefix_bounds(keys, query)
+        return _Selection(records, np.flatnonzero(previous[start:stop] < start) + start)
+
+
+class AddressBookView(tk.Toplevel):
+    """Searchable window over a trusted address book (an IndexedAddressBook).
+
+    `on_select(address)` is called when a row is double-clicked.
+    """
+
+    def __init__(self, master, book, on_select=None):
+        super().__init__(master)
+        self.title("Address Book")
+        self.geometry("560x520")
+        self.book = book
+        self.on_select = on_select
+        self.search_index = AddressSearchIndex(book.index)
+        self.results = self.search_index.search("")
+        self.offset = 0
+        self._pending_search = None
+
+        search_frame = tk.Frame(self)
+        search_frame.pack(fill=tk.X, padx=8, pady=6)
+        self.query = tk.StringVar()
+        self.query.trace_add("write", lambda *_: self._schedule_search())
+        entry = tk.Entry(search_frame, textvariable=self.query, font=("Arial", 12))
+        entry.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        entry.focus_set()
+
+        self.mode = tk.StringVar(value="prefix")
+        for mode in SEARCH_MODES:
+            tk.Radiobutton(search_frame, text=mode.capitalize(), variable=self.mode, value=mode,
+                           command=self._search).pack(side=tk.LEFT)
+
+        list_frame = tk.Frame(self)
+        list_frame.pack(fill=tk.BOTH, expand=True, padx=8)
+        self.tree = ttk.Treeview(list_frame, columns=("address", "label"), show="headings",
+                                 height=VISIBLE_ROWS, selectmode="browse")
+        self.tree.heading("address", text="Address")
+        self.tree.heading("label", text="Label")
+        self.tree.column("address", width=360, stretch=True)
+        self.tree.column("label", width=160, stretch=True)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.scrollbar = ttk.Scrollbar(list_frame, orient=tk.VERTICAL, command=self._on_scrollbar)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        self.status = tk.Label(self, anchor="w")
+        self.status.pack(fill=tk.X, padx=8, pady=4)
+
+        self.tree.bind("<MouseWheel>", self._on_mousewheel)
+        self.tree.bind("<Button-4>", lambda event: self.scroll_to(self.offset - 3))
+        self.tree.bind("<Button-5>", lambda event: self.scroll_to(self.offset + 3))
+        self.tree.bind("<Down>", lambda event: self._move_selection(1))
+        self.tree.bind("<Up>", lambda event: self._move_selection(-1))
+        self.tree.bind("<Next>", lambda event: self.scroll_to(self.offset + VISIBLE_ROWS))
+        self.tree.bind("<Prior>", lambda event: self.scroll_to(self.offset - VISIBLE_ROWS))
+        self.tree.bind("<Double-1>", self._on_double_click)
+        self._render()
+
+    # Search
+
+    def _schedule_search(self):
+        if self._pending_search is not None:
+            self.after_cancel(self._pending_search)
+        self._pending_search = self.after(SEARCH_DELAY, self._search)
+
+    def _search(self):
+        self._pending_search = None
+        self.results = self.search_index.search(self.query.get(), self.mode.get())
+        self.offset = 0
+        self._render()
+
+    def refresh(self):
+        """Re-runs the current search, picking up changes to the book."""
+        self.results = self.search_index.search(self.query.get(), self.mode.get())
+        self.scroll_to(self.offset)
+
+    # Virtual scrolling
+
+    def scroll_to(self, offset):
+        self.offset = max(0, min(offset, len(self.results) - VISIBLE_ROWS))
+        self._render()
+        return "break"
+
+    def _render(self):
+        self.tree.delete(*self.tree.get_children())
+        for row, record in enumerate(self.results[self.offset:self.offset + VISIBLE_ROWS]):
+            self.tree.insert("", tk.END, iid=str(self.offset + row), values=(record.address, record.label))
+
+        total = len(self.results)
+        if total > VISIBLE_ROWS:
+            self.scrollbar.set(self.offset / total, (self.offset + VISIBLE_ROWS) / total)
+        else:
+            self.scrollbar.set(0.0, 1.0)
+        self.status.config(text=f"{total} of {len(self.search_index)} addresses")
+
+    def _on_scrollbar(self, action, amount, unit=None):
+        if action == "moveto":
+            self.scroll_to(int(float(amount) * len(self.results)))
+        elif unit == "pages":
+            self.scroll_to(self.offset + int(amount) * VISIBLE_ROWS)
+        else:
+            self.scroll_to(self.offset + int(amount))
+
+    def _on_mousewheel(self, event):
+        return self.scroll_to(self.offset - (1 if event.delta > 0 else -1) * 3)
+
+    def _move_selection(self, step):
+        selected = self.tree.selection()
+        position = int(selected[0]) + step if selected else self.offset
+        position = max(0, min(position, len(self.results) - 1))
+        if position < self.offset:
+            self.scroll_to(position)
+        elif position >= self.offset + VISIBLE_ROWS:
+            self.scroll_to(position - VISIBLE_ROWS + 1)
+        if self.tree.exists(str(position)):
+            self.tree.selection_set(str(position))
+            self.tree.see(str(position))
+        return "break"
+
+    def _on_double_click(self, event):
+        row = self.tree.identify_row(event.y)
+        if row and self.on_select is not None:
+            self.on_select(self.results[int(row)].address)
+
+
+class LogRing:
+    """Keeps a Text widget to its last `max_lines` lines."""
+
+    def __init__(self, text_widget, max_lines=500):
+        self.text_widget = text_widget
+        self.max_lines = max_lines
+
+    def append(self, message):
+        widget = self.text_widget
+        widget.insert(tk.END, message + "\n")
+        # The last line of a Text widget is always the empty one after "\n"
+        lines = int(widget.index("end-1c").split(".")[0]) - 1
+        if lines > self.max_lines:
+            widget.delete("1.0", f"{lines - self.max_lines + 1}.0")
+        widget.yview(tk.END)
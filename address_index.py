@@ -0,0 +1,222 @@
+import gc
+import itertools
+from contextlib import contextmanager
+from collections.abc import Mapping, MutableMapping
+
+from address_record import KEY_LENGTHS, make_record
+from batch_scoring import PackedAddressBook
+from qgram_index import QGramIndex
+
+# Number of leading/trailing characters compared by the exact match rule
+MATCH_LENGTH = 10
+
+@contextmanager
+def paused_gc():
+    """Pauses the cyclic garbage collector while building many objects that
+    live on. Left running, it rescans the growing index on every pass and
+    dominates bulk loads."""
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+# Versions are unique across all indexes, so a version also identifies the index
+_versions = itertools.count(1)
+
+
+class AddressIndex:
+    """Index of address records for the lookalike checks.
+
+    For every length in address_record.KEY_LENGTHS the index keeps one map
+    from prefix to records and one from suffix to records, so finding the
+    addresses that share a prefix or suffix with a copied address does not
+    scan the whole set, and a QGramIndex answers edit distance range
+    queries. All of them are partitioned by chain family, so a lookup only
+    returns records of the same family as the copied address. EVM records
+    are also kept in a PackedAddressBook for vectorized scoring. `version`
+    changes on every add, remove and clear.
+    """
+
+    def __init__(self):
+        self._records = {}
+        # family -> (prefix maps, suffix maps, QGramIndex), one map per KEY_LENGTHS slot
+        self._partitions = {}
+        self._match_slot = KEY_LENGTHS.index(MATCH_LENGTH)
+        self.packed = PackedAddressBook()
+        self.version = next(_versions)
+
+    def __len__(self):
+        return len(self._records)
+
+    def __iter__(self):
+        return iter(self._records.values())
+
+    def __contains__(self, address):
+        return address.lower() in self._records
+
+    def _partition(self, chain):
+        partition = self._partitions.get(chain)
+        if partition is None:
+            partition = self._partitions[chain] = ([{} for _ in KEY_LENGTHS], [{} for _ in KEY_LENGTHS], QGramIndex())
+        return partition
+
+    def get(self, address):
+        """Returns the record of an address, or None."""
+        return self._records.get(address.lower())
+
+    def add(self, record):
+        """Adds a record to the index, replacing the one with the same key."""
+        if record.key in self._records:
+            self.remove(record.key)
+        self._records[record.key] = record
+        self.version = next(_versions)
+        if record.chain == "evm" and record.payload is not None:
+            self.packed.add(record)
+        prefixes, suffixes, qgrams = self._partition(record.chain)
+        qgrams.add(record)
+        for slot, key in enumerate(record.prefixes):
+            prefixes[slot].setdefault(key, set()).add(record)
+        for slot, key in enumerate(record.suffixes):
+            suffixes[slot].setdefault(key, set()).add(record)
+
+    def extend(self, records):
+        """Adds many records with new keys, grouping them by partition and
+        slot so each bucket map is filled in one tight loop. Faster than
+        add() for bulk loads; records whose key is present are replaced."""
+        with paused_gc():
+            # The last record of a key wins, as with repeated add() calls
+            records = list({record.key: record for record in records}.values())
+            if any(record.key in self._records for record in records):
+                for record in records:
+                    self.add(record)
+                return
+            self._records.update((record.key, record) for record in records)
+            self.version = next(_versions)
+
+            by_chain = {}
+            for record in records:
+                by_chain.setdefault(record.chain, []).append(record)
+                if record.chain == "evm" and record.payload is not None:
+                    self.packed.add(record)
+            for chain, members in by_chain.items():
+                prefixes, suffixes, qgrams = self._partition(chain)
+                qgrams.extend(members)
+                for slot, length in enumerate(KEY_LENGTHS):
+                    for keys, pairs in ((prefixes[slot], [(record.key[:length], record) for record in members]),
+                                        (suffixes[slot], [(record.key[-length:], record) for record in members])):
+                        for key, record in pairs:
+                            if len(key) < length:
+                                continue
+                            bucket = keys.get(key)
+                            if bucket is None:
+                                keys[key] = {record}
+                            else:
+                                bucket.add(record)
+
+    def remove(self, address):
+        """Removes an address from the index if it is present."""
+        record = self._records.pop(address.lower(), None)
+        if record is None:
+            return
+        self.version = next(_versions)
+        self.packed.remove(record)
+        prefixes, suffixes, qgrams = self._partitions[record.chain]
+        qgrams.remove(record.key)
+        for keys, record_keys in ((prefixes, record.prefixes), (suffixes, record.suffixes)):
+            for slot, key in enumerate(record_keys):
+                bucket = keys[slot][key]
+                bucket.discard(record)
+                if not bucket:
+                    del keys[slot][key]
+
+    def clear(self):
+        self._records.clear()
+        self.packed.clear()
+        self._partitions.clear()
+        self.version = next(_versions)
+
+    def prepare(self):
+        """Builds the q-gram postings a bulk load deferred, so the first
+        lookup does not pay for them. Safe to call from another thread."""
+        for _, _, qgrams in list(self._partitions.values()):
+            qgrams.prepare()
+
+    def exact_match(self, record):
+        """Returns an indexed record of the same family whose first or last
+        MATCH_LENGTH characters equal those of `record`, or None."""
+        slot = self._match_slot
+        partition = self._partitions.get(record.chain)
+        if partition is None or len(record.prefixes) <= slot:
+            return None
+        prefixes, suffixes, _ = partition
+        for keys, key in ((prefixes[slot], record.prefixes[slot]),
+                          (suffixes[slot], record.suffixes[slot])):
+            for match in keys.get(key, ()):
+                if match.key != record.key:
+                    return match
+        return None
+
+    def candidates(self, record, threshold):
+        """Returns the indexed records of the same family that may have a
+        Levenshtein similarity above `threshold` with `record`. Every record
+        that does is among them."""
+        partition = self._partitions.get(record.chain)
+        if partition is None:
+            return []
+        return partition[2].candidates(record.key, threshold)
+
+    def similar(self, record, threshold):
+        """Returns the indexed records of the same family whose Levenshtein
+        similarity with `record` is above `threshold`."""
+        partition = self._partitions.get(record.chain)
+        if partition is None:
+            return []
+        return partition[2].search(record.key, threshold)
+
+
+class IndexedAddressBook(MutableMapping):
+    """Trusted address book (address -> label) that keeps an AddressIndex
+    of AddressRecords up to date as entries are added or removed."""
+
+    def __init__(self, entries=None):
+        self.index = AddressIndex()
+        if entries:
+            self.index.extend(make_record(address, label) for address, label in
+                              (entries.items() if isinstance(entries, Mapping) else entries))
+
+    def __getitem__(self, address):
+        record = self.index.get(address)
+        if record is None:
+            raise KeyError(address)
+        return record.label
+
+    def __setitem__(self, address, label):
+        self.index.add(make_record(address, label))
+
+    def __delitem__(self, address):
+        if address not in self.index:
+            raise KeyError(address)
+        self.index.remove(address)
+
+    def __iter__(self):
+        return (record.address for record in self.index)
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, address):
+        return isinstance(address, str) and address in self.index
+
+    def clear(self):
+        self.index.clear()
+
+    def record(self, address):
+        """Returns the AddressRecord of an address, or None."""
+        return self.index.get(address)
+
+    def to_dict(self):
+        return {record.address: record.label for record in self.index}
@@ -0,0 +1,49 @@
+from chains import address_family, validate_address
+
+# Prefix/suffix lengths precomputed for every record, for the exact match rule.
+# Shorter lengths only used to order the Levenshtein candidates, which the
+# q-gram index now finds directly, so each record keeps just the match length
+KEY_LENGTHS = (10,)
+
+# Families whose addresses are case-insensitive and stored in lowercase
+_LOWERCASE_FAMILIES = ("evm", "bech32")
+
+
+class AddressRecord:
+    """An address decoded once when it is added or loaded.
+
+    `address` is the canonical form shown to the user (lowercase for EVM and
+    bech32 addresses, case preserved for base58). `chain` is the family from
+    chains.address_family. `key` is the lowercase form that comparisons use,
+    `payload` the decoded bytes (20 bytes for EVM, BTC and Tron, the witness
+    program for bech32, 32 bytes for Solana, None when the address does not
+    validate), and `prefixes`/`suffixes` the leading/trailing characters of
+    `key` at each of KEY_LENGTHS.
+    """
+
+    __slots__ = ("address", "key", "chain", "payload", "prefixes", "suffixes", "label")
+
+    def __init__(self, address, key, chain, payload, label=""):
+        self.address = address
+        self.key = key
+        self.chain = chain
+        self.payload = payload
+        self.label = label
+        self.prefixes = tuple([key[:length] for length in KEY_LENGTHS if len(key) >= length])
+        self.suffixes = tuple([key[-length:] for length in KEY_LENGTHS if len(key) >= length])
+
+    def __repr__(self):
+        return f"AddressRecord({self.address!r}, chain={self.chain!r}, label={self.label!r})"
+
+
+def make_record(address, label=""):
+    """Builds the AddressRecord of an address string."""
+    address = address.strip()
+    chain_format, payload = validate_address(address)
+    # Invalid addresses still get a family, so lowercase legacy entries are
+    # compared with addresses of their own chain
+    chain = chain_format.family if chain_format is not None else address_family(address)
+    key = address.lower()
+    if chain in _LOWERCASE_FAMILIES:
+        address = key
+    return AddressRecord(address, key, chain, payload, label or "")
@@ -0,0 +1,56 @@
+"""Extraction of addresses from arbitrary clipboard text.
+
+One combined regular expression matches the shape of every supported
+format (EVM hex, bech32 and base58, which covers Bitcoin, Tron and Solana),
+so a payload is scanned in a single linear pass whatever chains it mixes.
+Every match must stand alone, not inside a longer run of letters and digits,
+and is then validated by the chain registry like a copied address.
+
+Only the first SCAN_MAX_CHARS characters of a payload are scanned, and
+content_digest hashes only that part, so an unchanged multi-megabyte
+clipboard costs one hash per change notification instead of a full scan.
+"""
+import re
+
+from address_record import make_record
+
+# Characters of a clipboard payload that are scanned for addresses
+SCAN_MAX_CHARS = 1024 * 1024
+
+# Addresses checked per payload; the rest of a huge list is ignored
+SCAN_MAX_ADDRESSES = 500
+
+# Longest supported address (bech32); longer clipboards can only be scanned
+MAX_ADDRESS_LENGTH = 74
+
+# Every address shape, standing alone
+ADDRESS_PATTERN = re.compile(
+    r"(?<![0-9A-Za-z])(?:"
+    r"0[xX][0-9a-fA-F]{40}"
+    r"|[bB][cC]1[02-9ac-hj-np-zAC-HJ-NP-Z]{11,71}"
+    r"|[1-9A-HJ-NP-Za-km-z]{26,44}"
+    r")(?![0-9A-Za-z])"
+)
+
+
+def content_digest(text):
+    """Returns a digest of the part of `text` that extract_addresses scans."""
+    if len(text) > SCAN_MAX_CHARS:
+        return len(text), hash(text[:SCAN_MAX_CHARS])
+    return len(text), hash(text)
+
+
+def extract_addresses(text, max_addresses=SCAN_MAX_ADDRESSES):
+    """Returns the AddressRecords of the valid addresses in `text`, each
+    once, in the order they first appear."""
+    if len(text) > SCAN_MAX_CHARS:
+        text = text[:SCAN_MAX_CHARS]
+    records = {}
+    for match in ADDRESS_PATTERN.finditer(text):
+        record = make_record(match.group())
+        if record.payload is None or record.key in records:
+            continue
+        records[record.key] = record
+        if len(records) == max_addresses:
+            break
+    return list(records.values())
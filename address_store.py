@@ -0,0 +1,140 @@
+import json
+import os
+import sqlite3
+import threading
+
+from address_record import make_record
+from chains import address_family
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS addresses (
+    address TEXT PRIMARY KEY COLLATE NOCASE,
+    label TEXT NOT NULL DEFAULT '',
+    chain TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value NOT NULL
+);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('book_id', lower(hex(randomblob(16))));
+INSERT OR IGNORE INTO meta (key, value) VALUES ('generation', 0);
+CREATE TRIGGER IF NOT EXISTS addresses_inserted AFTER INSERT ON addresses
+BEGIN UPDATE meta SET value = value + 1 WHERE key = 'generation'; END;
+CREATE TRIGGER IF NOT EXISTS addresses_updated AFTER UPDATE ON addresses
+BEGIN UPDATE meta SET value = value + 1 WHERE key = 'generation'; END;
+CREATE TRIGGER IF NOT EXISTS addresses_deleted AFTER DELETE ON addresses
+BEGIN UPDATE meta SET value = value + 1 WHERE key = 'generation'; END;
+"""
+
+def read_json_addresses(path):
+    """Reads a JSON address file as an address -> label dict.
+
+    The GUI saved a dict of labels and older CLI versions a plain list.
+    """
+    with open(path, "r") as f:
+        saved = json.load(f).get("trusted_addresses", {})
+    if isinstance(saved, list):
+        saved = {address: "" for address in saved}
+    if not isinstance(saved, dict):
+        raise ValueError("trusted_addresses is not a dictionary")
+    return {make_record(address).address: label or "" for address, label in saved.items()}
+
+
+class AddressStore:
+    """Trusted address book stored in SQLite in WAL mode.
+
+    Every add or remove is one small transaction, so an edit costs the same
+    whatever the size of the book and a crash never leaves a half-written
+    file. The database is opened on first use. If `legacy_json` names an
+    existing JSON address file, its entries are imported once and the file
+    is renamed with a ".migrated" suffix.
+    """
+
+    def __init__(self, path, legacy_json=None):
+        self.path = path
+        self.legacy_json = legacy_json
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._conn = conn
+            if self.legacy_json and os.path.exists(self.legacy_json):
+                self._migrate(self.legacy_json)
+        return self._conn
+
+    def _migrate(self, json_path):
+        entries = read_json_addresses(json_path)
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO addresses (address, label, chain) VALUES (?, ?, ?)",
+                ((address, label, address_family(address)) for address, label in entries.items())
+            )
+        os.replace(json_path, json_path + ".migrated")
+        print(f"🔄 Migrated {len(entries)} addresses from {json_path}.")
+
+    def upsert(self, address, label="", chain=None):
+        """Adds an address or updates its label. Addresses are compared
+        case-insensitively but stored as given."""
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute(
+                    "INSERT INTO addresses (address, label, chain) VALUES (?, ?, ?) "
+                    "ON CONFLICT(address) DO UPDATE SET address = excluded.address, "
+                    "label = excluded.label, chain = excluded.chain",
+                    (address, label or "", chain or address_family(address))
+                )
+
+    def delete(self, address):
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute("DELETE FROM addresses WHERE address = ?", (address,))
+
+    def replace_all(self, entries):
+        """Replaces the whole book with an address -> label mapping in one transaction."""
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute("DELETE FROM addresses")
+                conn.executemany(
+                    "INSERT OR REPLACE INTO addresses (address, label, chain) VALUES (?, ?, ?)",
+                    ((address, label or "", address_family(address)) for address, label in entries.items())
+                )
+
+    def records(self):
+        """Yields (address, label, chain) for every stored address."""
+        with self._lock:
+            rows = self._connection().execute("SELECT address, label, chain FROM addresses ORDER BY rowid").fetchall()
+        return iter(rows)
+
+    def labels(self):
+        """Yields (address, label) for every stored address."""
+        return ((address, label) for address, label, _ in self.records())
+
+    def data_version(self):
+        """Returns a number that changes whenever another connection commits."""
+        with self._lock:
+            return self._connection().execute("PRAGMA data_version").fetchone()[0]
+
+    def generation(self):
+        """Returns a token that changes on every committed change to the
+        addresses, across connections and restarts."""
+        with self._lock:
+            meta = dict(self._connection().execute("SELECT key, value FROM meta").fetchall())
+        return f"{meta['book_id']}:{meta['generation']}"
+
+    def __len__(self):
+        with self._lock:
+            return self._connection().execute("SELECT COUNT(*) FROM addresses").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,181 @@
+import numpy as np
+
+# ETH/BSC addresses are "0x" followed by exactly 40 hex characters
+PAYLOAD_WIDTH = 40
+ADDRESS_WIDTH = PAYLOAD_WIDTH + 2
+
+# Candidate pairs first_matches compares at once
+PAIRS_PER_CHUNK = 1 << 18
+
+# Nibbles of a block that fit in the int64 join key of first_matches
+_MAX_BLOCK_WIDTH = 15
+
+# Blocks of up to this many nibbles are joined through a lookup table
+_MAX_TABLE_WIDTH = 4
+
+
+def pack_payload(payload):
+    """Returns the 40 nibbles of a 20-byte payload as a uint8 array."""
+    data = np.frombuffer(payload, dtype=np.uint8)
+    nibbles = np.empty(PAYLOAD_WIDTH, dtype=np.uint8)
+    nibbles[0::2] = data >> 4
+    nibbles[1::2] = data & 0x0F
+    return nibbles
+
+
+class PackedAddressBook:
+    """Fixed-width address records stored as rows of a uint8 nibble matrix.
+
+    Rows are appended into spare capacity and removed by moving the last row
+    into the freed slot, so adds and removes do not copy the matrix.
+    `records[row]` is the AddressRecord of each row, and `version` changes
+    whenever a row is added or removed.
+    """
+
+    def __init__(self, capacity=64):
+        self._matrix = np.empty((capacity, PAYLOAD_WIDTH), dtype=np.uint8)
+        self.records = []
+        self._rows = {}
+        self.version = 0
+
+    def __len__(self):
+        return len(self.records)
+
+    def __contains__(self, address):
+        return address.lower() in self._rows
+
+    @property
+    def matrix(self):
+        """The packed rows currently in use."""
+        return self._matrix[:len(self.records)]
+
+    def add(self, record):
+        if record.key in self._rows:
+            return
+        row = len(self.records)
+        if row == len(self._matrix):
+            grown = np.empty((max(2 * row, 64), PAYLOAD_WIDTH), dtype=np.uint8)
+            grown[:row] = self._matrix[:row]
+            self._matrix = grown
+        self._matrix[row] = pack_payload(record.payload)
+        self.records.append(record)
+        self._rows[record.key] = row
+        self.version += 1
+
+    def adopt(self, records, matrix):
+        """Fills an empty book with `records` whose nibble rows are the
+        rows of `matrix`, without packing them one by one. The matrix is
+        used as the book's storage, so it must be writable."""
+        if self.records:
+            raise ValueError("adopt needs an empty book")
+        self._matrix = matrix
+        self.records = list(records)
+        self._rows = {record.key: row for row, record in enumerate(self.records)}
+        self.version += 1
+
+    def remove(self, record):
+        row = self._rows.pop(record.key, None)
+        if row is None:
+            return
+        last = len(self.records) - 1
+        if row != last:
+            moved = self.records[last]
+            self._matrix[row] = self._matrix[last]
+            self.records[row] = moved
+            self._rows[moved.key] = row
+        self.records.pop()
+        self.version += 1
+
+    def clear(self):
+        self.records.clear()
+        self._rows.clear()
+        self.version += 1
+
+
+def score_many(candidate, book):
+    """Scores one fixed-width address (an AddressRecord or a string) against
+    every row of a PackedAddressBook in a single vectorized pass.
+
+    Returns the Hamming similarity of every row, on the same 0-100 scale as
+    similarity.hamming_similarity over the full "0x..." string.
+    """
+    matrix = book.matrix
+    if not len(matrix):
+        return np.empty(0)
+    payload = candidate.payload if hasattr(candidate, "payload") else bytes.fromhex(candidate[2:])
+    matches = (matrix == pack_payload(payload)).sum(axis=1)
+    return (matches + 2) * (100 / ADDRESS_WIDTH)
+
+
+def first_matches(candidates, book, threshold):
+    """Returns, for each fixed-width AddressRecord in `candidates`, the first
+    row of a PackedAddressBook whose Hamming similarity to it is above
+    `threshold` (on the scale of score_many) and below 100, or -1.
+
+    All candidates are matched in one vectorized pass. A row within k
+    differing nibbles of a candidate agrees with it on at least one of k + 1
+    disjoint blocks of nibbles, so the rows are joined with the candidates
+    block by block and only the rows sharing a whole block with a candidate
+    are compared in full.
+    """
+    found = np.full(len(candidates), -1, dtype=np.intp)
+    matrix = book.matrix
+    if not len(candidates) or not len(matrix):
+        return found
+    hamming = (np.arange(PAYLOAD_WIDTH + 1) + 2) * (100 / ADDRESS_WIDTH)
+    enough = np.flatnonzero(hamming > threshold)
+    if not len(enough) or enough[0] == PAYLOAD_WIDTH:
+        return found
+    min_matches = int(enough[0])
+    queries = np.array([pack_payload(candidate.payload) for candidate in candidates])
+
+    blocks = PAYLOAD_WIDTH - min_matches + 1
+    if blocks > PAYLOAD_WIDTH // 2:
+        # Blocks of a single nibble would pair most rows with every
+        # candidate, so each candidate is compared with the whole book
+        for i, query in enumerate(queries):
+            matches = (matrix == query).sum(axis=1)
+            rows = np.flatnonzero((matches >= min_matches) & (matches < PAYLOAD_WIDTH))
+            found[i] = rows[0] if len(rows) else -1
+        return found
+    bounds = np.linspace(0, PAYLOAD_WIDTH, blocks + 1).astype(int)
+    pairs = [_block_pairs(matrix, queries, start, stop) for start, stop in zip(bounds[:-1], bounds[1:])]
+    query_rows = np.concatenate([query_rows for query_rows, _ in pairs])
+    book_rows = np.concatenate([book_rows for _, book_rows in pairs])
+
+    first = np.full(len(candidates), len(matrix), dtype=np.intp)
+    for start in range(0, len(query_rows), PAIRS_PER_CHUNK):
+        chunk = slice(start, start + PAIRS_PER_CHUNK)
+        matches = (matrix[book_rows[chunk]] == queries[query_rows[chunk]]).sum(axis=1)
+        hits = (matches >= min_matches) & (matches < PAYLOAD_WIDTH)
+        np.minimum.at(first, query_rows[chunk][hits], book_rows[chunk][hits])
+    found[first < len(matrix)] = first[first < len(matrix)]
+    return found
+
+
+def _block_pairs(matrix, queries, start, stop):
+    """Returns (query_rows, book_rows) of the pairs that agree on the
+    nibbles start:stop."""
+    stop = min(stop, start + _MAX_BLOCK_WIDTH)
+    shifts = 4 * np.arange(stop - start - 1, -1, -1, dtype=np.int64)
+    book_keys = (matrix[:, start:stop].astype(np.int64) << shifts).sum(axis=1)
+    query_keys = (queries[:, start:stop].astype(np.int64) << shifts).sum(axis=1)
+
+    if stop - start <= _MAX_TABLE_WIDTH:
+        # Narrow keys are looked up in a table instead of searched for
+        table = np.zeros(1 << 4 * (stop - start), dtype=bool)
+        table[query_keys] = True
+        book_rows = np.flatnonzero(table[book_keys])
+    else:
+        book_rows = np.arange(len(book_keys))
+    book_keys = book_keys[book_rows]
+
+    order = np.argsort(query_keys, kind="stable")
+    sorted_keys = query_keys[order]
+    low = np.searchsorted(sorted_keys, book_keys, side="left")
+    counts = np.searchsorted(sorted_keys, book_keys, side="right") - low
+    shared = np.flatnonzero(counts)
+    book_rows, low, counts = book_rows[shared], low[shared], counts[shared]
+    # Every book row pairs with the run of candidates holding its key
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    return order[np.repeat(low, counts) + offsets], np.repeat(book_rows, counts)
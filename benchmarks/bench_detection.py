@@ -0,0 +1,379 @@
+"""Benchmarks for is_suspicious, is_valid_address and load_addresses.
+
+    python -m benchmarks.bench_detection [--quick] [--output results.json]
+    python -m benchmarks.bench_detection --compare base.json head.json
+
+Sweeps address book and history sizes, and for every combination measures
+per-check latency (p50/p99), throughput, peak memory while building the
+structures, and detection accuracy on synthetic poisoning attacks. For every
+book size it also compares the edit distance range query of the index with
+scoring every record and times checking every address of a pasted table,
+and it times blocklist lookups. Results are written as JSON so two commits
+can be compared.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import address_scanner
+import blocklist
+import clip_monitor
+from address_index import IndexedAddressBook
+from address_record import make_record
+from similarity import calculate_dynamic_threshold, similarity_score
+from history import ClipboardHistory
+from benchmarks import poisoning
+
+BOOK_SIZES = [10, 100, 1000, 10000, 100000, 1000000]
+HISTORY_SIZES = [0, 1000, 10000, 100000]
+QUICK_BOOK_SIZES = [10, 1000, 10000]
+QUICK_HISTORY_SIZES = [0, 1000]
+BLOCKLIST_SIZE = 1000000
+QUICK_BLOCKLIST_SIZE = 100000
+
+# Latency regressions above this ratio fail a comparison
+REGRESSION_RATIO = 1.2
+
+# Startup target: loading a TARGET_BOOK_SIZE book from its snapshot takes at
+# most WARM_START_TARGET seconds. Measured at about 1.3 s warm against 2.4 s
+# cold from SQLite on the (slow, single-core) reference VM.
+TARGET_BOOK_SIZE = 100000
+WARM_START_TARGET = 1.5
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    position = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[position]
+
+
+def latency_summary(samples_ns):
+    samples = sorted(samples_ns)
+    total = sum(samples)
+    return {
+        "p50_us": percentile(samples, 0.50) / 1000,
+        "p99_us": percentile(samples, 0.99) / 1000,
+        "mean_us": total / len(samples) / 1000,
+        "throughput_per_s": len(samples) / (total / 1e9) if total else None,
+    }
+
+
+def build_state(rng, book_size, history_size):
+    """Builds the trusted book and history, returning them with the build
+    time and peak traced memory."""
+    book_entries = poisoning.address_book(rng, book_size)
+    history_entries = [poisoning.random_evm_address(rng) for _ in range(history_size)]
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    book = IndexedAddressBook(book_entries)
+    history = ClipboardHistory()
+    for address in history_entries:
+        history.add(address)
+    build_seconds = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return book, history, build_seconds, peak
+
+
+def bench_checks(rng, book, history, queries):
+    """Times is_suspicious on every query and scores the verdicts."""
+    clip_monitor.trusted_addresses = book
+    clip_monitor.previously_copied_addresses = history
+    victims = [record.address for record in book.index] + list(history)
+
+    samples = []
+    # BTC lookalikes cannot keep the victim's suffix (see poisoning), so
+    # their rates are reported apart from the EVM ones
+    outcomes = {kind: [0, 0] for kind in ("lookalike", "typo", "benign", "btc_lookalike", "btc_typo")}
+    with contextlib.redirect_stdout(io.StringIO()):
+        for address, kind in poisoning.attack_queries(rng, victims, queries):
+            started = time.perf_counter_ns()
+            flagged = clip_monitor.is_suspicious(address)
+            samples.append(time.perf_counter_ns() - started)
+            if not address.startswith("0x"):
+                kind = "btc_" + kind
+            outcomes[kind][0] += bool(flagged)
+            outcomes[kind][1] += 1
+
+    accuracy = {
+        f"{kind}_flagged_rate": flagged / total if total else None
+        for kind, (flagged, total) in outcomes.items()
+    }
+    return latency_summary(samples), accuracy
+
+
+def bench_range(rng, book, queries):
+    """Times the q-gram range query of the book index against scoring every
+    record, and checks that both find the same records."""
+    victims = [record.address for record in book.index]
+    index_samples, brute_samples = [], []
+    identical = True
+    book.index.similar(make_record(victims[0]), 100.0)  # Builds the postings outside the timings
+    for address, _ in poisoning.attack_queries(rng, victims, queries):
+        record = make_record(address)
+        threshold = calculate_dynamic_threshold(address)
+        started = time.perf_counter_ns()
+        found = book.index.similar(record, threshold)
+        index_samples.append(time.perf_counter_ns() - started)
+        started = time.perf_counter_ns()
+        expected = [other for other in book.index if other.chain == record.chain and other.key != record.key
+                    and similarity_score(record.key, other.key, threshold) > threshold]
+        brute_samples.append(time.perf_counter_ns() - started)
+        identical &= [other.key for other in found] == [other.key for other in expected]
+    brute = latency_summary(brute_samples)
+    return {**latency_summary(index_samples), "brute_force_p50_us": brute["p50_us"],
+            "brute_force_p99_us": brute["p99_us"], "identical_results": identical}
+
+
+def bench_blocklist(rng, size, queries):
+    """Imports `size` addresses into a blocklist and times lookups of listed
+    and unlisted payloads, comparing its memory with a set of the strings."""
+    addresses = [poisoning.random_evm_address(rng) for _ in range(size)]
+    tracemalloc.start()
+    as_set = set(addresses)
+    set_bytes, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    set_bytes += sum(map(sys.getsizeof, as_set))
+    del as_set
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "blocklist.bin")
+        started = time.perf_counter()
+        payloads, _ = blocklist.read_addresses(addresses)
+        blocklist.write_blocklist(path, payloads)
+        import_seconds = time.perf_counter() - started
+
+        tracemalloc.start()
+        listed = blocklist.Blocklist(path)
+        open_bytes, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        hits = [blocklist.blocklist_payload(address) for address in rng.sample(addresses, queries)]
+        misses = [blocklist.blocklist_payload(poisoning.random_evm_address(rng)) for _ in range(queries)]
+        samples = {}
+        for kind, lookups in (("hit", hits), ("miss", misses)):
+            samples[kind] = []
+            for payload in lookups:
+                started = time.perf_counter_ns()
+                payload in listed
+                samples[kind].append(time.perf_counter_ns() - started)
+        file_bytes = os.path.getsize(path)
+        listed.close()
+    hit, miss = latency_summary(samples["hit"]), latency_summary(samples["miss"])
+    return {"import_seconds": import_seconds, "p50_us": hit["p50_us"], "p99_us": hit["p99_us"],
+            "miss_p50_us": miss["p50_us"], "miss_p99_us": miss["p99_us"], "file_bytes": file_bytes,
+            "heap_bytes": open_bytes, "python_set_bytes": set_bytes}
+
+
+def bench_scan(rng, rows=50000):
+    """Times address extraction and the change digest on a CSV export of
+    `rows` transactions, which is larger than the scan cap."""
+    lines = ["hash,from,to,value"]
+    for _ in range(rows):
+        lines.append(f"0x{rng.getrandbits(256):064x},{poisoning.random_evm_address(rng)},"
+                     f"{poisoning.random_btc_address(rng)},{rng.random() * 10:.6f}")
+    text = "\n".join(lines)
+    started = time.perf_counter()
+    found = address_scanner.extract_addresses(text)
+    extract_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    address_scanner.content_digest(text)
+    digest_seconds = time.perf_counter() - started
+    return {"payload_chars": len(text), "addresses": len(found), "seconds": extract_seconds,
+            "digest_seconds": digest_seconds}
+
+
+def bench_scan_check(rng, book, history, rounds=5):
+    """Times extracting and checking the addresses of a CSV export holding
+    SCAN_MAX_ADDRESSES addresses, some of them lookalikes of book entries,
+    against `book` and `history`."""
+    clip_monitor.trusted_addresses = book
+    clip_monitor.previously_copied_addresses = history
+    victims = [record.address for record in book.index]
+    for index in (book.index, history.index):
+        index.similar(make_record(victims[0]), 100.0)  # Builds the postings outside the timings
+    samples = []
+    flagged = 0
+    for _ in range(rounds):
+        rows = [address for address, _ in poisoning.attack_queries(rng, victims, address_scanner.SCAN_MAX_ADDRESSES)]
+        text = "n,address,value\n" + "\n".join(f"{i},{address},{rng.random() * 5:.4f}" for i, address in enumerate(rows))
+        clip_monitor.verdict_cache.clear()
+        with contextlib.redirect_stdout(io.StringIO()):
+            started = time.perf_counter_ns()
+            verdicts = clip_monitor.check_addresses(address_scanner.extract_addresses(text))
+            samples.append(time.perf_counter_ns() - started)
+        flagged += sum(verdict.suspicious for verdict in verdicts)
+    latency = latency_summary(samples)
+    return {"addresses": len(verdicts), "p50_us": latency["p50_us"], "p99_us": latency["p99_us"],
+            "flagged_rate": flagged / (rounds * len(verdicts)) if verdicts else None}
+
+
+def bench_validation(rng, count):
+    addresses = [poisoning.random_evm_address(rng) for _ in range(count // 2)]
+    addresses += [poisoning.random_btc_address(rng) for _ in range(count - len(addresses))]
+    samples = []
+    for address in addresses:
+        started = time.perf_counter_ns()
+        clip_monitor.is_valid_address(address)
+        samples.append(time.perf_counter_ns() - started)
+    return latency_summary(samples)
+
+
+def bench_load(rng, book_size):
+    """Times load_addresses on a database holding `book_size` addresses,
+    first from the store (cold) and then from the snapshot it wrote (warm),
+    and how long after the warm load the q-gram postings are ready."""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "book.db")
+        with contextlib.redirect_stdout(io.StringIO()):
+            clip_monitor.load_addresses(path)
+            clip_monitor.save_addresses(poisoning.address_book(rng, book_size))
+            clip_monitor.address_store.close()
+            clip_monitor.snapshot_writer.join()
+            clip_monitor.index_builder.join()
+            clip_monitor.trusted_addresses = None  # Frees the old book outside the timed load
+            started = time.perf_counter()
+            clip_monitor.load_addresses(path)
+            seconds = time.perf_counter() - started
+            clip_monitor.address_store.close()
+            clip_monitor.snapshot_writer.join()
+            clip_monitor.index_builder.join()
+            clip_monitor.trusted_addresses = None
+            started = time.perf_counter()
+            clip_monitor.load_addresses(path)
+            warm_seconds = time.perf_counter() - started
+            clip_monitor.index_builder.join()
+            ready_seconds = time.perf_counter() - started
+            clip_monitor.address_store.close()
+    result = {"seconds": seconds, "warm_seconds": warm_seconds, "warm_ready_seconds": ready_seconds}
+    if book_size >= TARGET_BOOK_SIZE:
+        result["warm_target_met"] = warm_seconds * TARGET_BOOK_SIZE / book_size <= WARM_START_TARGET
+    return result
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(book_sizes, history_sizes, queries, seed, blocklist_size=BLOCKLIST_SIZE):
+    results = []
+    for book_size in book_sizes:
+        for history_size in history_sizes:
+            rng = random.Random(f"{seed}-{book_size}-{history_size}")
+            book, history, build_seconds, peak = build_state(rng, book_size, history_size)
+            latency, accuracy = bench_checks(rng, book, history, queries)
+            case = {
+                "case": f"check/book={book_size}/history={history_size}",
+                "book_size": book_size,
+                "history_size": history_size,
+                "build_seconds": build_seconds,
+                "build_peak_bytes": peak,
+                **latency,
+                **accuracy,
+            }
+            results.append(case)
+            print(f"{case['case']}: p50 {case['p50_us']:.1f} µs, p99 {case['p99_us']:.1f} µs, "
+                  f"lookalikes flagged {case['lookalike_flagged_rate']:.0%}, "
+                  f"benign flagged {case['benign_flagged_rate']:.0%}", file=sys.stderr)
+        if book_size:
+            case = {"case": f"range/book={book_size}", "book_size": book_size, **bench_range(rng, book, queries)}
+            results.append(case)
+            print(f"{case['case']}: p50 {case['p50_us']:.1f} µs, brute force p50 {case['brute_force_p50_us']:.1f} µs, "
+                  f"identical {case['identical_results']}", file=sys.stderr)
+            case = {"case": f"scan-check/book={book_size}", "book_size": book_size,
+                    **bench_scan_check(rng, book, history)}
+            results.append(case)
+            print(f"{case['case']}: {case['addresses']} addresses in {case['p50_us'] / 1000:.1f} ms (p50)",
+                  file=sys.stderr)
+
+    rng = random.Random(seed)
+    results.append({"case": "validate", **bench_validation(rng, queries)})
+    results.append({"case": "scan", **bench_scan(rng)})
+    case = {"case": f"blocklist/size={blocklist_size}", **bench_blocklist(rng, blocklist_size, queries)}
+    results.append(case)
+    print(f"{case['case']}: hit p50 {case['p50_us']:.1f} µs, miss p50 {case['miss_p50_us']:.1f} µs, "
+          f"{case['file_bytes'] / 2**20:.1f} MiB mapped vs {case['python_set_bytes'] / 2**20:.1f} MiB as a set",
+          file=sys.stderr)
+    for book_size in book_sizes:
+        results.append({"case": f"load/book={book_size}", "book_size": book_size, **bench_load(rng, book_size)})
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "seed": seed,
+            "queries": queries,
+            "scoring_workers": clip_monitor.scoring_pool.workers if clip_monitor.scoring_pool else None,
+        },
+        "results": results,
+    }
+
+
+def compare(base_path, head_path):
+    """Prints the latency change of every case present in both files and
+    returns 1 if any p50 got slower than REGRESSION_RATIO."""
+    with open(base_path) as f:
+        base = {case["case"]: case for case in json.load(f)["results"]}
+    with open(head_path) as f:
+        head = {case["case"]: case for case in json.load(f)["results"]}
+
+    regressed = False
+    for name, case in head.items():
+        before = base.get(name)
+        metric = "p50_us" if "p50_us" in case else "seconds"
+        if not before or not before.get(metric) or case.get(metric) is None:
+            continue
+        ratio = case[metric] / before[metric]
+        marker = "❌" if ratio > REGRESSION_RATIO else "✅"
+        regressed |= ratio > REGRESSION_RATIO
+        print(f"{marker} {name}: {metric} {before[metric]:.4g} -> {case[metric]:.4g} ({ratio:.2f}x)")
+    return 1 if regressed else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench_detection", description=__doc__.splitlines()[0])
+    parser.add_argument("--quick", action="store_true", help="small sweep for a fast check")
+    parser.add_argument("--book-sizes", type=int, nargs="+", help="address book sizes to sweep")
+    parser.add_argument("--history-sizes", type=int, nargs="+", help="history sizes to sweep")
+    parser.add_argument("--queries", type=int, default=300, help="checks per case (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=1, help="random seed (default: %(default)s)")
+    parser.add_argument("--output", default="-", help="result file, '-' for stdout (default)")
+    parser.add_argument("--parallel", action="store_true", help="enable parallel Hamming scoring of large books")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "HEAD"), help="compare two result files")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        return compare(*args.compare)
+
+    if args.parallel:
+        clip_monitor.enable_parallel_scoring()
+    book_sizes = args.book_sizes or (QUICK_BOOK_SIZES if args.quick else BOOK_SIZES)
+    history_sizes = args.history_sizes or (QUICK_HISTORY_SIZES if args.quick else HISTORY_SIZES)
+    report = run(book_sizes, history_sizes, args.queries, args.seed,
+                 QUICK_BLOCKLIST_SIZE if args.quick else BLOCKLIST_SIZE)
+
+    if args.output == "-":
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,365 @@
+"""Clipboard traces: recording real sessions and replaying them.
+
+    python -m benchmarks.clipboard_trace record TRACE [--redact] [--duration SECONDS]
+    python -m benchmarks.clipboard_trace generate TRACE [--changes 500] [--seed 1]
+    python -m benchmarks.clipboard_trace replay TRACE [--speed 10] [--book FILE] [--scan-mode]
+                                                      [--output results.json]
+
+A trace is a JSON lines file: a header {"format": 1, "redacted": ...} and
+then one {"t": seconds since the start, "text": clipboard text} per change.
+
+`record` writes the clipboard changes of a real session. With --redact every
+address is replaced by a stand-in of the same format and all other text by
+"x", keeping its length and line breaks (see Redactor). `generate` writes a
+synthetic trace of bursty copying: runs of quick copies, lookalikes of
+earlier copies and pasted tables, separated by pauses.
+
+`replay` feeds a trace through monitor_clipboard with a FakeClipboardSource,
+at recorded speed (--speed 1), accelerated (--speed N) or back to back
+(--speed 0, each change as soon as the monitor handled the last one), and
+reports:
+
+- the latency from each clipboard change to the end of its check, and to
+  the callback for alerts (where main.py hands the alert to the GUI)
+- changes that were coalesced (replaced before the monitor read them),
+  skipped (read but empty or equal to the last clipboard) and dropped (read
+  and new but never checked)
+- the CPU time of the monitor thread and of the whole process
+"""
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+
+import clip_monitor
+from address_scanner import ADDRESS_PATTERN
+from benchmarks import poisoning
+from benchmarks.bench_detection import latency_summary
+from chains import BECH32_CHARSET, BTC_BECH32, BTC_P2PKH, BTC_P2SH, EVM, SOLANA, TRON, validate_address
+from clipboard_sources import FakeClipboardSource, default_clipboard_source
+from history import ClipboardHistory
+
+TRACE_FORMAT = 1
+
+# Version bytes of the base58check formats
+_VERSIONS = {BTC_P2PKH: 0x00, BTC_P2SH: 0x05, TRON: 0x41}
+
+_NOT_SPACE = re.compile(r"\S")
+
+# Hashes tried per address for a stand-in of the same length
+_STAND_IN_ATTEMPTS = 1024
+
+
+class Redactor:
+    """Replaces the addresses in clipboard text with stand-ins.
+
+    EVM addresses are mapped position by position through keyed
+    permutations of the hex digits, so two addresses that share a prefix or
+    suffix or differ in a few positions still do afterwards, and lookalikes
+    stay lookalikes. Other addresses become a valid address of the same
+    format, length and (for bech32) witness version, derived from a keyed
+    hash. The key is random per Redactor, so the stand-ins cannot be traced
+    back and mean nothing outside one trace.
+    """
+
+    def __init__(self, key=None):
+        self.key = key or os.urandom(16)
+        rng = random.Random(self.key)
+        digits = poisoning.HEX_DIGITS
+        self._permutations = [dict(zip(digits, rng.sample(digits, len(digits)))) for _ in range(40)]
+
+    def redact_address(self, address):
+        """Returns the stand-in of a valid address."""
+        chain_format, payload = validate_address(address)
+        if chain_format is EVM:
+            return "0x" + "".join(permutation[char] for permutation, char in
+                                  zip(self._permutations, address[2:].lower()))
+        # Base58 encodings of equally long payloads differ in length now and
+        # then, so a few hashes are tried for a stand-in of the same length
+        for attempt in range(_STAND_IN_ATTEMPTS):
+            digest = hashlib.blake2b(f"{attempt}:{address}".encode("ascii"), key=self.key).digest()
+            if chain_format is SOLANA:
+                stand_in = poisoning.base58_encode(digest[:32])
+            elif chain_format is BTC_BECH32:
+                # Same witness version and program length
+                stand_in = poisoning.bech32_encode(digest[:len(payload)], BECH32_CHARSET.index(address[3].lower()))
+            else:
+                stand_in = poisoning.base58check_encode(bytes([_VERSIONS[chain_format]]) + digest[:20])
+            if len(stand_in) == len(address):
+                break
+        return stand_in
+
+    def redact(self, text):
+        parts = []
+        position = 0
+        for match in ADDRESS_PATTERN.finditer(text):
+            address = match.group()
+            if validate_address(address)[0] is None:
+                continue
+            parts.append(_NOT_SPACE.sub("x", text[position:match.start()]))
+            parts.append(self.redact_address(address))
+            position = match.end()
+        parts.append(_NOT_SPACE.sub("x", text[position:]))
+        return "".join(parts)
+
+
+def read_trace(path):
+    """Returns the (t, text) changes of a trace file."""
+    with open(path) as f:
+        header = json.loads(f.readline() or "{}")
+        if header.get("format") != TRACE_FORMAT:
+            raise ValueError(f"{path} is not a clipboard trace of format {TRACE_FORMAT}")
+        return [(change["t"], change["text"]) for change in map(json.loads, f)]
+
+
+def write_trace(path, changes, redacted=False):
+    with open(path, "w") as f:
+        f.write(json.dumps({"format": TRACE_FORMAT, "redacted": redacted}) + "\n")
+        for t, text in changes:
+            f.write(json.dumps({"t": round(t, 6), "text": text}) + "\n")
+
+
+def record(path, source=None, redact=False, duration=None):
+    """Writes the clipboard changes of this session to `path` until
+    interrupted or `duration` seconds have passed. Returns the number of
+    changes recorded."""
+    source = source or default_clipboard_source()
+    redactor = Redactor() if redact else None
+    started = time.monotonic()
+    previous = None
+    count = 0
+    with open(path, "w") as f:
+        f.write(json.dumps({"format": TRACE_FORMAT, "redacted": redact}) + "\n")
+        try:
+            while duration is None or time.monotonic() - started < duration:
+                if not source.wait_for_change(timeout=1.0):
+                    continue
+                text = source.read()
+                if not isinstance(text, str) or text == previous:
+                    continue
+                previous = text
+                elapsed = time.monotonic() - started
+                f.write(json.dumps({"t": round(elapsed, 6), "text": redactor.redact(text) if redactor else text}) + "\n")
+                f.flush()
+                count += 1
+        except KeyboardInterrupt:
+            pass
+        finally:
+            source.close()
+    return count
+
+
+def synthetic_trace(rng, changes=500):
+    """Returns a bursty trace of `changes` clipboard changes: bursts of 3-20
+    copies 20-300 ms apart, separated by pauses of 1-20 s. Copies are fresh
+    addresses, repeats and lookalikes of earlier copies, plain text and
+    small tables of addresses."""
+    copied = [poisoning.random_evm_address(rng)]
+    trace = []
+    t = 0.0
+    while len(trace) < changes:
+        for _ in range(min(rng.randint(3, 20), changes - len(trace))):
+            t += rng.uniform(0.02, 0.3)
+            kind = rng.random()
+            if kind < 0.4:
+                text = poisoning.random_evm_address(rng) if rng.random() < 0.8 else poisoning.random_btc_address(rng)
+                copied.append(text)
+            elif kind < 0.6:
+                text = rng.choice(copied)
+            elif kind < 0.7:
+                length = rng.choice((4, 6, 10))
+                text = poisoning.lookalike(rng.choice(copied), rng, length, length)
+            elif kind < 0.9:
+                text = " ".join(rng.choice(("send", "to", "the", "invoice", "ok", "thanks")) for _ in range(rng.randint(1, 30)))
+            else:
+                rows = [f"{i},{rng.choice(copied)},{rng.random() * 5:.4f}" for i in range(rng.randint(5, 50))]
+                text = "n,address,value\n" + "\n".join(rows)
+            trace.append((t, text))
+        t += rng.uniform(1.0, 20.0)
+    return trace
+
+
+class _TracingSource(FakeClipboardSource):
+    """FakeClipboardSource that remembers which change each read returned
+    and which change the monitor had handled when it waited again."""
+
+    def __init__(self):
+        super().__init__("")
+        self.read_change = 0
+        self.idle_change = None
+        self.reads = []
+
+    def read(self):
+        with self._condition:
+            self.read_change = self._changes
+            self.reads.append(self._changes)
+            return super().read()
+
+    def wait_for_change(self, timeout=None):
+        with self._condition:
+            self.idle_change = self.read_change
+            self._condition.notify_all()
+        return super().wait_for_change(timeout)
+
+    def wait_until_idle(self, change, timeout):
+        with self._condition:
+            return self._condition.wait_for(lambda: self.idle_change == change, timeout)
+
+
+def replay(changes, speed=1.0, drain_timeout=30.0):
+    """Feeds `changes` (a list of (t, text)) through monitor_clipboard
+    against the loaded address book and a fresh history, and returns the
+    report described in the module docstring."""
+    source = _TracingSource()
+    active = threading.Event()
+    active.set()
+    set_at = [None] * (len(changes) + 1)
+    checked_at = {}
+    alerted_at = {}
+    cpu = {}
+    original_check = clip_monitor.check_clipboard
+    original_copy = clip_monitor.pyperclip.copy
+    original_history = clip_monitor.previously_copied_addresses
+
+    def check_clipboard(clipboard, callback=None, last_valid_address=None):
+        change = source.read_change
+        try:
+            return original_check(clipboard, callback, last_valid_address)
+        finally:
+            checked_at[change] = time.perf_counter()
+
+    def callback(message, is_warning=False, suspicious_address=None, original_address=None, verdict=None,
+                 alerts=None):
+        alerted_at.setdefault(source.read_change, time.perf_counter())
+
+    def monitor():
+        started = time.thread_time()
+        clip_monitor.monitor_clipboard(callback, source, active)
+        cpu["monitor"] = time.thread_time() - started
+
+    clip_monitor.check_clipboard = check_clipboard
+    # Clearing the clipboard after an alert would be a change of its own
+    clip_monitor.pyperclip.copy = lambda text: None
+    clip_monitor.previously_copied_addresses = ClipboardHistory(
+        max_entries=clip_monitor.HISTORY_MAX_ENTRIES,
+        max_age=clip_monitor.HISTORY_MAX_AGE,
+        max_bytes=clip_monitor.HISTORY_MAX_BYTES,
+    )
+    clip_monitor.verdict_cache.clear()
+    thread = threading.Thread(target=monitor, name="clipshield-replay-monitor")
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            process_started = time.process_time()
+            wall_started = time.perf_counter()
+            thread.start()
+            source.wait_until_idle(0, drain_timeout)
+            origin = time.perf_counter()
+            for change, (t, text) in enumerate(changes, 1):
+                if speed:
+                    delay = origin + t / speed - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                else:
+                    # Back to back: each change as soon as the last one was handled
+                    source.wait_until_idle(change - 1, drain_timeout)
+                set_at[change] = time.perf_counter()
+                source.set(text)
+            drained = source.wait_until_idle(len(changes), drain_timeout)
+            active.clear()
+            source.wake()
+            thread.join()
+            wall_seconds = time.perf_counter() - wall_started
+            process_cpu = time.process_time() - process_started
+    finally:
+        clip_monitor.check_clipboard = original_check
+        clip_monitor.pyperclip.copy = original_copy
+        clip_monitor.previously_copied_addresses = original_history
+
+    read = set(source.reads)
+    texts = [""] + [text for _, text in changes]
+    skipped = dropped = 0
+    previous_read = 0
+    for change in sorted(read - {0}):
+        if change not in checked_at:
+            if not texts[change] or texts[change] == texts[previous_read]:
+                skipped += 1
+            else:
+                dropped += 1
+        previous_read = change
+
+    check_latencies = [(checked_at[change] - set_at[change]) * 1e9 for change in checked_at if change]
+    alert_latencies = [(alerted_at[change] - set_at[change]) * 1e9 for change in alerted_at if change]
+    return {
+        "changes": len(changes),
+        "speed": speed,
+        "checked": len(check_latencies),
+        "alerts": len(alert_latencies),
+        "coalesced": len(changes) - len(read - {0}),
+        "skipped": skipped,
+        "dropped": dropped,
+        "drained": drained,
+        "check_latency": latency_summary(check_latencies) if check_latencies else None,
+        "alert_latency": latency_summary(alert_latencies) if alert_latencies else None,
+        "monitor_cpu_seconds": cpu.get("monitor"),
+        "process_cpu_seconds": process_cpu,
+        "wall_seconds": wall_seconds,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.clipboard_trace", description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    recorder = commands.add_parser("record", help="record the clipboard changes of this session")
+    recorder.add_argument("trace")
+    recorder.add_argument("--redact", action="store_true", help="replace addresses and text with stand-ins")
+    recorder.add_argument("--duration", type=float, help="stop after this many seconds (default: Ctrl+C)")
+    generator = commands.add_parser("generate", help="write a synthetic bursty trace")
+    generator.add_argument("trace")
+    generator.add_argument("--changes", type=int, default=500, help="clipboard changes (default: %(default)s)")
+    generator.add_argument("--seed", type=int, default=1, help="random seed (default: %(default)s)")
+    player = commands.add_parser("replay", help="replay a trace through the monitor")
+    player.add_argument("trace")
+    player.add_argument("--speed", type=float, default=1.0,
+                        help="speed-up over the recorded timing, 0 for no pauses (default: %(default)s)")
+    player.add_argument("--book", help="address book database or .json file (default: an empty book)")
+    player.add_argument("--scan-mode", action="store_true", help="check every address in copied text")
+    player.add_argument("--output", default="-", help="result file, '-' for stdout (default)")
+    args = parser.parse_args(argv)
+
+    if args.command == "record":
+        print("📋 Recording clipboard changes, Ctrl+C to stop.", file=sys.stderr)
+        count = record(args.trace, redact=args.redact, duration=args.duration)
+        print(f"📋 Recorded {count} clipboard changes to {args.trace}.", file=sys.stderr)
+        return 0
+    if args.command == "generate":
+        write_trace(args.trace, synthetic_trace(random.Random(args.seed), args.changes))
+        return 0
+
+    if args.book:
+        with contextlib.redirect_stdout(sys.stderr):
+            clip_monitor.load_addresses(args.book)
+    clip_monitor.scan_mode = args.scan_mode
+    report = replay(read_trace(args.trace), args.speed)
+    check = report["check_latency"] or {}
+    print(f"▶️ {report['changes']} changes: {report['checked']} checked, {report['alerts']} alerts, "
+          f"{report['coalesced']} coalesced, {report['skipped']} skipped, {report['dropped']} dropped; "
+          f"check p50 {check.get('p50_us', 0):.0f} µs, p99 {check.get('p99_us', 0):.0f} µs; "
+          f"monitor CPU {report['monitor_cpu_seconds'] or 0:.2f} s", file=sys.stderr)
+    if args.output == "-":
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    return 1 if report["dropped"] or not report["drained"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
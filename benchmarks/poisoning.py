@@ -0,0 +1,138 @@
+"""Synthetic address-poisoning data for the benchmarks.
+
+Attackers generate vanity addresses that share the first and last few
+characters of a victim's address, because those are the characters wallets
+show. `lookalike` produces such addresses; `random_evm_address` and
+`random_btc_address` produce unrelated ones.
+
+Every generated BTC address has a valid base58check checksum, as a real
+vanity address would. The checksum is the last five or six characters of a
+P2PKH address, so BTC lookalikes and typos keep the victim's prefix but not
+its suffix; a vanity search matching both is beyond a benchmark's budget.
+"""
+import hashlib
+
+from chains import BASE58_ALPHABET, BECH32_CHARSET, _BECH32_CONST, _BECH32M_CONST, _bech32_polymod, _convert_bits
+
+HEX_DIGITS = "0123456789abcdef"
+
+
+def random_evm_address(rng):
+    return "0x" + "".join(rng.choice(HEX_DIGITS) for _ in range(40))
+
+
+def base58_encode(data):
+    value = int.from_bytes(data, "big")
+    encoded = ""
+    while value:
+        value, digit = divmod(value, 58)
+        encoded = BASE58_ALPHABET[digit] + encoded
+    leading_zeros = len(data) - len(data.lstrip(b"\0"))
+    return "1" * leading_zeros + encoded
+
+
+def base58check_encode(payload):
+    return base58_encode(payload + hashlib.sha256(hashlib.sha256(payload).digest()).digest()[:4])
+
+
+def base58_value(text):
+    """Returns the integer a base58 string spells, ignoring leading zeros."""
+    value = 0
+    for char in text:
+        value = value * 58 + BASE58_ALPHABET.index(char)
+    return value
+
+
+def reencode_btc(text):
+    """Returns the P2PKH address for the hash160 that the base58 string
+    `text` spells, with a valid checksum, or None if it spells none."""
+    if not text.startswith("1") or text.startswith("11"):
+        return None
+    hash160 = base58_value(text) >> 32
+    if hash160 >> 160:
+        return None
+    return base58check_encode(b"\0" + hash160.to_bytes(20, "big"))
+
+
+def bech32_encode(program, witness_version=0):
+    """A segwit address for a witness program: bech32 for version 0,
+    bech32m for later versions."""
+    # _convert_bits does not pad; a zero byte supplies the padding bits
+    values = [witness_version] + list(_convert_bits(program + b"\0", 8, 5))[:(len(program) * 8 + 4) // 5]
+    hrp = [ord(char) >> 5 for char in "bc"] + [0] + [ord(char) & 31 for char in "bc"]
+    constant = _BECH32_CONST if witness_version == 0 else _BECH32M_CONST
+    checksum = _bech32_polymod(hrp + values + [0] * 6) ^ constant
+    values += [(checksum >> 5 * (5 - i)) & 31 for i in range(6)]
+    return "bc1" + "".join(BECH32_CHARSET[value] for value in values)
+
+
+def random_btc_address(rng):
+    """A valid P2PKH address for a random hash160."""
+    return base58check_encode(b"\0" + bytes(rng.getrandbits(8) for _ in range(20)))
+
+
+def lookalike(victim, rng, prefix_length=4, suffix_length=4):
+    """Returns an address matching the first `prefix_length` and last
+    `suffix_length` characters of `victim` (not counting "0x"), with a
+    random middle that differs from the victim's.
+
+    BTC lookalikes are re-encoded with a valid checksum, which replaces
+    their last five or six characters.
+    """
+    if victim.startswith("0x"):
+        head, body, alphabet = "0x", victim[2:], HEX_DIGITS
+    else:
+        head, body, alphabet = "", victim, BASE58_ALPHABET
+    middle_length = len(body) - prefix_length - suffix_length
+    while True:
+        middle = "".join(rng.choice(alphabet) for _ in range(middle_length))
+        if middle == body[prefix_length:len(body) - suffix_length]:
+            continue
+        address = head + body[:prefix_length] + middle + body[len(body) - suffix_length:]
+        if not head:
+            address = reencode_btc(address)
+        if address is not None and address != victim:
+            return address
+
+
+def typo(victim, rng, edits=1):
+    """Returns `victim` with a few characters replaced. BTC typos are
+    re-encoded with a valid checksum, as lookalike does."""
+    head = "0x" if victim.startswith("0x") else ""
+    alphabet = HEX_DIGITS if head else BASE58_ALPHABET
+    while True:
+        chars = list(victim[len(head):])
+        for position in rng.sample(range(len(chars)), edits):
+            chars[position] = rng.choice(alphabet.replace(chars[position], ""))
+        address = head + "".join(chars)
+        if not head:
+            address = reencode_btc(address)
+        if address is not None and address != victim:
+            return address
+
+
+def address_book(rng, size, btc_share=0.1):
+    """Returns `size` distinct random addresses, about `btc_share` of them BTC."""
+    book = {}
+    while len(book) < size:
+        address = random_btc_address(rng) if rng.random() < btc_share else random_evm_address(rng)
+        book[address] = f"wallet {len(book)}"
+    return book
+
+
+def attack_queries(rng, victims, count, match_lengths=(4, 6, 10)):
+    """Returns `count` (address, kind) pairs, where kind is "lookalike"
+    (vanity match of a random victim's first and last N characters), "typo"
+    (a victim with one to three characters replaced) or "benign"."""
+    queries = []
+    for i in range(count):
+        kind = ("lookalike", "typo", "benign")[i % 3] if victims else "benign"
+        if kind == "lookalike":
+            length = rng.choice(match_lengths)
+            address = lookalike(rng.choice(victims), rng, length, length)
+        elif kind == "typo":
+            address = typo(rng.choice(victims), rng, rng.randint(1, 3))
+        else:
+            address = random_evm_address(rng)
+        queries.append((address, kind))
+    return queries
@@ -0,0 +1,173 @@
+"""Offline blocklist of addresses known to belong to poisoning campaigns.
+
+    python -m clip_monitor blocklist OUTPUT INPUT [INPUT ...]
+
+Imports address lists (one address per line; anything after the first comma
+or whitespace and lines starting with "#" are ignored) into a compact file
+that the monitor memory-maps. Addresses are stored as their decoded 20-byte
+payload (the key hash of EVM, Bitcoin and Tron addresses and the witness
+program of P2WPKH addresses), sorted, behind a Bloom filter. A lookup checks
+a handful of filter bits and, only when they are all set, binary searches
+the payloads, so most lookups touch a few bytes of the mapping.
+
+Layout, little-endian:
+
+    header      magic, format version, payload count, filter bits, hash count
+    filter      filter bits / 8 bytes
+    payloads    count x 20 bytes, sorted
+"""
+import argparse
+import contextlib
+import math
+import mmap
+import os
+import struct
+import sys
+
+import numpy as np
+
+from chains import EVM, detect_format
+
+MAGIC = b"CLIPBLK\0"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<8sIQQI")
+PAYLOAD_SIZE = 20
+
+# Filter bits per address, before rounding the filter up to a power of two;
+# 10 bits give under 1% false positives
+BITS_PER_ENTRY = 10
+
+
+def blocklist_payload(address):
+    """Returns the payload an address is blocklisted under, or None if it is
+    not a valid address with a 20-byte payload."""
+    address = address.strip()
+    chain_format = detect_format(address)
+    if chain_format is None:
+        return None
+    if chain_format is EVM:
+        # The case of an EVM address does not change its payload
+        address = address.lower()
+    payload = chain_format.decode(address)
+    return payload if payload is not None and len(payload) == PAYLOAD_SIZE else None
+
+
+def _filter_hashes(payload):
+    # Payloads are hash outputs, so their bytes serve as the hash values
+    return int.from_bytes(payload[:8], "little"), int.from_bytes(payload[8:16], "little") | 1
+
+
+def write_blocklist(path, payloads):
+    """Writes the blocklist of `payloads` (an iterable of 20-byte strings) to
+    `path` atomically and returns the number of distinct payloads."""
+    matrix = np.frombuffer(b"".join(payloads), dtype=np.uint8).reshape(-1, PAYLOAD_SIZE)
+    matrix = matrix[np.lexsort(matrix.T[::-1])]
+    if len(matrix):
+        distinct = np.ones(len(matrix), dtype=bool)
+        distinct[1:] = (matrix[1:] != matrix[:-1]).any(axis=1)
+        matrix = matrix[distinct]
+    count = len(matrix)
+
+    bits = max(64, 1 << math.ceil(math.log2(max(count, 1) * BITS_PER_ENTRY)))
+    hashes = max(1, round(math.log(2) * bits / max(count, 1)))
+    hashes = min(hashes, 16)
+    first = np.ascontiguousarray(matrix[:, :8]).view("<u8").ravel()
+    step = np.ascontiguousarray(matrix[:, 8:16]).view("<u8").ravel() | np.uint64(1)
+    bloom = np.zeros(bits // 8, dtype=np.uint8)
+    for i in range(hashes):
+        # uint64 arithmetic wraps like the masked Python ints of a lookup
+        positions = (first + np.uint64(i) * step) & np.uint64(bits - 1)
+        np.bitwise_or.at(bloom, positions >> np.uint64(3), (1 << (positions & np.uint64(7))).astype(np.uint8))
+
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, count, bits, hashes))
+        f.write(bloom.tobytes())
+        f.write(matrix.tobytes())
+    os.replace(temporary, path)
+    return count
+
+
+def read_addresses(lines):
+    """Returns (payloads, skipped): the payloads of the addresses in `lines`
+    and the number of lines holding no usable address."""
+    payloads, skipped = [], 0
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        payload = blocklist_payload(line.replace(",", " ").split()[0])
+        if payload is None:
+            skipped += 1
+        else:
+            payloads.append(payload)
+    return payloads, skipped
+
+
+class Blocklist:
+    """A memory-mapped blocklist file. `payload in blocklist` is an exact
+    lookup of a 20-byte payload."""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self._mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._mapped) < HEADER.size:
+            raise ValueError(f"{path} is not a blocklist")
+        magic, version, self._count, self._bits, self._hashes = HEADER.unpack_from(self._mapped)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"{path} is not a blocklist of format {FORMAT_VERSION}")
+        self._payloads = HEADER.size + self._bits // 8
+        if len(self._mapped) != self._payloads + self._count * PAYLOAD_SIZE:
+            raise ValueError(f"{path} is truncated")
+        self.path = path
+
+    def __len__(self):
+        return self._count
+
+    def __contains__(self, payload):
+        if len(payload) != PAYLOAD_SIZE:
+            return False
+        mapped = self._mapped
+        first, step = _filter_hashes(payload)
+        mask = self._bits - 1
+        for i in range(self._hashes):
+            position = (first + i * step) & mask
+            if not mapped[HEADER.size + (position >> 3)] >> (position & 7) & 1:
+                return False
+
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            start = self._payloads + middle * PAYLOAD_SIZE
+            if mapped[start:start + PAYLOAD_SIZE] < payload:
+                low = middle + 1
+            else:
+                high = middle
+        start = self._payloads + low * PAYLOAD_SIZE
+        return low < self._count and mapped[start:start + PAYLOAD_SIZE] == payload
+
+    def contains_address(self, address):
+        payload = blocklist_payload(address)
+        return payload is not None and payload in self
+
+    def close(self):
+        self._mapped.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m clip_monitor blocklist",
+                                     description="Import address lists into a blocklist file.")
+    parser.add_argument("output", help="blocklist file to write")
+    parser.add_argument("inputs", nargs="+", help="address list files, '-' for stdin")
+    args = parser.parse_args(argv)
+
+    payloads, skipped = [], 0
+    for name in args.inputs:
+        with contextlib.ExitStack() as stack:
+            lines = sys.stdin if name == "-" else stack.enter_context(open(name, "r"))
+            found, missed = read_addresses(lines)
+        payloads.extend(found)
+        skipped += missed
+    count = write_blocklist(args.output, payloads)
+    print(f"🚫 Blocklist {args.output}: {count} addresses ({skipped} lines without a usable address skipped).")
+    return 0
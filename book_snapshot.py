@@ -0,0 +1,164 @@
+"""Binary snapshot of a prepared address book, for fast startup.
+
+Loading from the store decodes and validates every address before indexing
+it. A snapshot keeps the result: the canonical address, label, chain family
+and payload of every record, and the nibble matrix of the PackedAddressBook.
+At startup the snapshot is memory-mapped and the matrix is used in place,
+so no address is decoded or validated again. The records themselves are
+still built from the strings section and added to a new AddressIndex with
+AddressIndex.extend; the prefix, suffix and q-gram structures are not part
+of the snapshot.
+
+A snapshot records the token of the store it was built from
+(AddressStore.generation(), or the size and mtime of a JSON file) and a
+CRC32 of its contents, and is ignored when either does not match.
+load_addresses then loads the store and writes a fresh snapshot in a
+background thread.
+
+Layout, little-endian:
+
+    header            magic, format version, token length, record count,
+                      packed rows, payload bytes, strings length, CRC32 of
+                      everything after the header
+    token             UTF-8
+    matrix            packed rows x 40 nibbles
+    payload lengths   one byte per record, NO_PAYLOAD for None
+    payloads          concatenated
+    strings           JSON list of [address, label, chain], packed records first
+"""
+import json
+import mmap
+import os
+import struct
+import threading
+import zlib
+
+import numpy as np
+
+from address_index import IndexedAddressBook, paused_gc
+from address_record import AddressRecord
+from batch_scoring import PAYLOAD_WIDTH
+
+MAGIC = b"CLIPSNAP"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<8sIIIIQQI")
+NO_PAYLOAD = 255
+
+
+def snapshot_path(book_path):
+    return book_path + ".snapshot"
+
+
+def json_token(path):
+    """Returns the source token of a JSON address file."""
+    stat = os.stat(path)
+    return f"json:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def write_snapshot(path, book, token):
+    """Writes the snapshot of an IndexedAddressBook to `path` atomically."""
+    packed = book.index.packed
+    packed_records = list(packed.records)
+    matrix = np.ascontiguousarray(packed.matrix[:len(packed_records)])
+    packed_keys = {record.key for record in packed_records}
+    records = packed_records + [record for record in book.index if record.key not in packed_keys]
+
+    lengths = bytes(NO_PAYLOAD if record.payload is None else len(record.payload) for record in records)
+    payloads = b"".join(record.payload for record in records if record.payload is not None)
+    strings = json.dumps([[record.address, record.label, record.chain] for record in records]).encode("utf-8")
+    encoded_token = token.encode("utf-8")
+
+    body = [encoded_token, matrix.tobytes(), lengths, payloads, strings]
+    crc = 0
+    for part in body:
+        crc = zlib.crc32(part, crc)
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, len(encoded_token), len(records), len(packed_records),
+                         len(payloads), len(strings), crc)
+
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(header)
+        for part in body:
+            f.write(part)
+    os.replace(temporary, path)
+
+
+def is_current(path, token):
+    """Returns whether the snapshot at `path` was built from the store at
+    `token`, reading only its header. The CRC is checked by read_snapshot."""
+    try:
+        with open(path, "rb") as f:
+            header = f.read(HEADER.size)
+            if len(header) < HEADER.size:
+                return False
+            magic, version, token_length = HEADER.unpack(header)[:3]
+            return (magic == MAGIC and version == FORMAT_VERSION
+                    and f.read(token_length) == token.encode("utf-8"))
+    except OSError:
+        return False
+
+
+def read_snapshot(path, token):
+    """Returns the IndexedAddressBook stored in the snapshot at `path`, or
+    None if there is none or it was not built from the store at `token`.
+    The records are indexed again, which is most of the time this takes."""
+    try:
+        with open(path, "rb") as f:
+            # A private copy-on-write mapping, so the matrix can be adopted
+            # by the PackedAddressBook and still grow or change in memory
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+    except (OSError, ValueError):
+        return None
+    if len(mapped) < HEADER.size:
+        return None
+
+    magic, version, token_length, count, rows, payload_bytes, strings_length, crc = HEADER.unpack_from(mapped)
+    if magic != MAGIC or version != FORMAT_VERSION:
+        return None
+    offset = HEADER.size
+    if mapped[offset:offset + token_length] != token.encode("utf-8"):
+        return None
+
+    matrix_offset = offset + token_length
+    lengths_offset = matrix_offset + rows * PAYLOAD_WIDTH
+    payloads_offset = lengths_offset + count
+    strings_offset = payloads_offset + payload_bytes
+    if len(mapped) != strings_offset + strings_length:
+        return None
+    with memoryview(mapped) as view, view[offset:] as body:
+        if zlib.crc32(body) != crc:
+            return None
+
+    matrix = np.frombuffer(mapped, dtype=np.uint8, count=rows * PAYLOAD_WIDTH, offset=matrix_offset)
+    matrix = matrix.reshape(rows, PAYLOAD_WIDTH)
+    lengths = mapped[lengths_offset:payloads_offset]
+    payloads = mapped[payloads_offset:strings_offset]
+    strings = json.loads(mapped[strings_offset:strings_offset + strings_length])
+
+    book = IndexedAddressBook()
+    with paused_gc():
+        records = []
+        position = 0
+        for (address, label, chain), length in zip(strings, lengths):
+            payload = None
+            if length != NO_PAYLOAD:
+                payload = payloads[position:position + length]
+                position += length
+            records.append(AddressRecord(address, address.lower(), chain, payload, label))
+        book.index.packed.adopt(records[:rows], matrix)
+        book.index.extend(records)
+    return book
+
+
+def write_in_background(path, book, token):
+    """Writes a snapshot in a thread and returns the thread. Errors are
+    reported but never raised, since the snapshot is only a cache."""
+    def write():
+        try:
+            write_snapshot(path, book, token)
+        except Exception as e:
+            print(f"❌ Could not write address book snapshot {path}: {e}")
+
+    thread = threading.Thread(target=write, name="clipshield-snapshot")
+    thread.start()
+    return thread
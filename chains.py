@@ -0,0 +1,236 @@
+"""Chain registry: detects an address format and validates it.
+
+`detect_format` picks the one candidate format from the first character and
+the length of an address, without running any regex or checksum. The
+format's `decode` then validates the address and returns its payload bytes.
+
+Every format belongs to a family. Addresses are only compared with
+addresses of the same family, because a lookalike has to use the same
+alphabet and length as the address it imitates.
+"""
+import hashlib
+
+BASE58_ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+_BASE58_VALUES = {char: value for value, char in enumerate(BASE58_ALPHABET)}
+
+BECH32_CHARSET = "qpzry9x8gf2tvdw0s3jn54khce6mua7l"
+_BECH32_VALUES = {char: value for value, char in enumerate(BECH32_CHARSET)}
+_BECH32_CONST = 1
+_BECH32M_CONST = 0x2BC830A3
+
+_HEX_DIGITS = frozenset("0123456789abcdefABCDEF")
+
+
+def base58_decode(text):
+    """Decodes a base58 string, or returns None if it is not valid base58."""
+    value = 0
+    for char in text:
+        digit = _BASE58_VALUES.get(char)
+        if digit is None:
+            return None
+        value = value * 58 + digit
+    leading_zeros = len(text) - len(text.lstrip("1"))
+    return b"\0" * leading_zeros + value.to_bytes((value.bit_length() + 7) // 8, "big")
+
+
+def base58check_decode(text):
+    """Decodes a base58check string to version byte + payload, or None if
+    the checksum does not match."""
+    data = base58_decode(text)
+    if data is None or len(data) < 5:
+        return None
+    body, checksum = data[:-4], data[-4:]
+    if hashlib.sha256(hashlib.sha256(body).digest()).digest()[:4] != checksum:
+        return None
+    return body
+
+
+# Keccak-256 (the pre-standard SHA-3 padding Ethereum uses), for EIP-55
+
+_KECCAK_ROUND_CONSTANTS = [
+    0x0000000000000001, 0x0000000000008082, 0x800000000000808A, 0x8000000080008000,
+    0x000000000000808B, 0x0000000080000001, 0x8000000080008081, 0x8000000000008009,
+    0x000000000000008A, 0x0000000000000088, 0x0000000080008009, 0x000000008000000A,
+    0x000000008000808B, 0x800000000000008B, 0x8000000000008089, 0x8000000000008003,
+    0x8000000000008002, 0x8000000000000080, 0x000000000000800A, 0x800000008000000A,
+    0x8000000080008081, 0x8000000000008080, 0x0000000080000001, 0x8000000080008008,
+]
+_KECCAK_ROTATIONS = [
+    [0, 36, 3, 41, 18], [1, 44, 10, 45, 2], [62, 6, 43, 15, 61], [28, 55, 25, 21, 56], [27, 20, 39, 8, 14],
+]
+_MASK64 = (1 << 64) - 1
+
+
+def _keccak_f(lanes):
+    for round_constant in _KECCAK_ROUND_CONSTANTS:
+        c = [lanes[x][0] ^ lanes[x][1] ^ lanes[x][2] ^ lanes[x][3] ^ lanes[x][4] for x in range(5)]
+        d = [c[(x - 1) % 5] ^ (((c[(x + 1) % 5] << 1) | (c[(x + 1) % 5] >> 63)) & _MASK64) for x in range(5)]
+        lanes = [[lanes[x][y] ^ d[x] for y in range(5)] for x in range(5)]
+        b = [[0] * 5 for _ in range(5)]
+        for x in range(5):
+            for y in range(5):
+                r = _KECCAK_ROTATIONS[x][y]
+                lane = lanes[x][y]
+                b[y][(2 * x + 3 * y) % 5] = ((lane << r) | (lane >> (64 - r))) & _MASK64 if r else lane
+        lanes = [[b[x][y] ^ (~b[(x + 1) % 5][y] & b[(x + 2) % 5][y]) for y in range(5)] for x in range(5)]
+        lanes[0][0] ^= round_constant
+    return lanes
+
+
+def keccak256(data):
+    rate = 136
+    padded = bytearray(data) + b"\x01" + b"\0" * ((-len(data) - 1) % rate)
+    padded[-1] |= 0x80
+    lanes = [[0] * 5 for _ in range(5)]
+    for offset in range(0, len(padded), rate):
+        block = padded[offset:offset + rate]
+        for i in range(rate // 8):
+            lanes[i % 5][i // 5] ^= int.from_bytes(block[8 * i:8 * i + 8], "little")
+        lanes = _keccak_f(lanes)
+    return b"".join(lanes[i % 5][i // 5].to_bytes(8, "little") for i in range(4))
+
+
+def _bech32_polymod(values):
+    generators = [0x3B6A57B2, 0x26508E6D, 0x1EA119FA, 0x3D4233DD, 0x2A1462B3]
+    checksum = 1
+    for value in values:
+        top = checksum >> 25
+        checksum = (checksum & 0x1FFFFFF) << 5 ^ value
+        for i in range(5):
+            checksum ^= generators[i] if (top >> i) & 1 else 0
+    return checksum
+
+
+def _convert_bits(data, from_bits, to_bits):
+    accumulator, bits, result = 0, 0, bytearray()
+    for value in data:
+        accumulator = (accumulator << from_bits) | value
+        bits += from_bits
+        while bits >= to_bits:
+            bits -= to_bits
+            result.append((accumulator >> bits) & ((1 << to_bits) - 1))
+    if bits >= from_bits or (accumulator << (to_bits - bits)) & ((1 << to_bits) - 1):
+        return None
+    return bytes(result)
+
+
+class ChainFormat:
+    """One address format: its name, family and decoder."""
+
+    __slots__ = ("name", "family", "decode")
+
+    def __init__(self, name, family, decode):
+        self.name = name
+        self.family = family
+        self.decode = decode
+
+    def __repr__(self):
+        return f"ChainFormat({self.name!r})"
+
+
+def _decode_evm(address):
+    body = address[2:]
+    if not all(char in _HEX_DIGITS for char in body):
+        return None
+    if body != body.lower() and body != body.upper():
+        # Mixed case carries an EIP-55 checksum
+        digest = keccak256(body.lower().encode("ascii")).hex()
+        for char, nibble in zip(body, digest):
+            if char.isalpha() and char.isupper() != (int(nibble, 16) >= 8):
+                return None
+    return bytes.fromhex(body)
+
+
+def _decode_base58check(version, size):
+    def decode(address):
+        body = base58check_decode(address)
+        if body is None or len(body) != size + 1 or body[0] != version:
+            return None
+        return body[1:]
+    return decode
+
+
+def _decode_bech32(address):
+    if address != address.lower() and address != address.upper():
+        return None
+    address = address.lower()
+    separator = address.rfind("1")
+    hrp, data = address[:separator], address[separator + 1:]
+    if hrp != "bc" or len(data) < 7:
+        return None
+    values = [_BECH32_VALUES.get(char) for char in data]
+    if None in values:
+        return None
+    checksum = _bech32_polymod([ord(c) >> 5 for c in hrp] + [0] + [ord(c) & 31 for c in hrp] + values)
+    witness_version = values[0]
+    if checksum != (_BECH32_CONST if witness_version == 0 else _BECH32M_CONST) or witness_version > 16:
+        return None
+    program = _convert_bits(values[1:-6], 5, 8)
+    if program is None or not 2 <= len(program) <= 40:
+        return None
+    if witness_version == 0 and len(program) not in (20, 32):
+        return None
+    return program
+
+
+def _decode_solana(address):
+    data = base58_decode(address)
+    return data if data is not None and len(data) == 32 else None
+
+
+EVM = ChainFormat("evm", "evm", _decode_evm)
+BTC_P2PKH = ChainFormat("btc-p2pkh", "btc", _decode_base58check(0x00, 20))
+BTC_P2SH = ChainFormat("btc-p2sh", "btc", _decode_base58check(0x05, 20))
+BTC_BECH32 = ChainFormat("btc-bech32", "bech32", _decode_bech32)
+TRON = ChainFormat("tron", "tron", _decode_base58check(0x41, 20))
+SOLANA = ChainFormat("solana", "solana", _decode_solana)
+
+FORMATS = (EVM, BTC_P2PKH, BTC_P2SH, BTC_BECH32, TRON, SOLANA)
+
+
+# Base58check formats by first character, with their length range
+_BASE58CHECK_SHAPES = {
+    "1": (BTC_P2PKH, 26, 34),
+    "3": (BTC_P2SH, 26, 35),
+    "T": (TRON, 34, 34),
+}
+
+
+def detect_format(address):
+    """Returns the only format an address can have given its first
+    character and length, or None. Does not validate the address."""
+    length = len(address)
+    first = address[:1]
+    if first == "0":
+        return EVM if length == 42 and address[1] in "xX" else None
+    if first in "bB" and address[:3].lower() == "bc1":
+        return BTC_BECH32 if 14 <= length <= 74 else None
+
+    solana_shaped = first in _BASE58_VALUES and 32 <= length <= 44
+    shape = _BASE58CHECK_SHAPES.get(first)
+    if shape is not None and shape[1] <= length <= shape[2]:
+        if solana_shaped:
+            # Both shapes fit; only a Solana address decodes to 32 bytes
+            data = base58_decode(address)
+            if data is not None and len(data) == 32:
+                return SOLANA
+        return shape[0]
+    return SOLANA if solana_shaped else None
+
+
+def validate_address(address):
+    """Returns (format, payload) for a valid address, or (None, None)."""
+    chain_format = detect_format(address)
+    if chain_format is None:
+        return None, None
+    payload = chain_format.decode(address)
+    if payload is None:
+        return None, None
+    return chain_format, payload
+
+
+def address_family(address):
+    """Returns the family of an address from its shape alone, so addresses
+    stored in lowercase by older versions still land in their partition."""
+    chain_format = detect_format(address)
+    return chain_format.family if chain_format is not None else "unknown"
@@ -1,75 +1,285 @@
 import pyperclip
-import time
-import re
+import atexit
 import threading
-import json
 import os
-from similarity import similarity_score, hamming_similarity, calculate_dynamic_threshold
+import sys
+from similarity import similarity_score, calculate_dynamic_threshold
+from address_index import IndexedAddressBook
+from address_record import AddressRecord, make_record
+from chains import validate_address
+from batch_scoring import first_matches, score_many
+from parallel_scoring import ScoringPool
+from history import ClipboardHistory
+from clipboard_sources import default_clipboard_source
+from address_store import AddressStore, read_json_addresses
+from verdict import Verdict, match_verdict
+from verdict_cache import VerdictCache, fingerprint
+from blocklist import Blocklist, PAYLOAD_SIZE
+from address_scanner import MAX_ADDRESS_LENGTH, content_digest, extract_addresses
+import metrics
+import book_snapshot
+
+# Limits of the clipboard history (None disables a limit)
+HISTORY_MAX_ENTRIES = 10000
+HISTORY_MAX_AGE = 7 * 24 * 60 * 60  # seconds
+HISTORY_MAX_BYTES = 8 * 1024 * 1024
 
 # Stores previously copied addresses
-previously_copied_addresses = []
+previously_copied_addresses = ClipboardHistory(
+    max_entries=HISTORY_MAX_ENTRIES,
+    max_age=HISTORY_MAX_AGE,
+    max_bytes=HISTORY_MAX_BYTES
+)
 
 # Stores trusted addresses manually added by the user
-trusted_addresses = []
+trusted_addresses = IndexedAddressBook()
 
-# File to store trusted addresses and wallet addresses
+# Database storing trusted addresses and wallet addresses
+DB_FILE = "addresses_data.db"
+
+# JSON file used by earlier versions, migrated into DB_FILE on first load
 DATA_FILE = "addresses_data.json"
 
-# Ethereum address pattern
-ETH_ADDRESS_REGEX = re.compile(r"^0x[a-fA-F0-9]{40}$")
-# Bitcoin address pattern (for legacy, P2PKH)
-BTC_ADDRESS_REGEX = re.compile(r"^(1[a-km-zA-HJ-NP-Z0-9]{25,34})$")
-# Binance Smart Chain (BSC) address pattern
-BSC_ADDRESS_REGEX = ETH_ADDRESS_REGEX
+# Persistent store behind trusted_addresses, opened by load_addresses
+address_store = None
+
+# Thread writing the address book snapshot after a load from the store
+snapshot_writer = None
+# Thread building the q-gram postings of the book load_addresses returned
+index_builder = None
+# (snapshot path, store token) of that book, None when the store has no token
+loaded_snapshot = None
+
+# Recent verdicts of is_suspicious; CLIPSHIELD_VERDICT_CACHE names a file
+# that keeps them across restarts
+VERDICT_CACHE_SIZE = 4096
+verdict_cache = VerdictCache(VERDICT_CACHE_SIZE)
+
+# Worker pool for very large address books, started by enable_parallel_scoring
+scoring_pool = None
+
+# Fewest fixed-width records check_addresses matches with one first_matches
+# block join instead of one Hamming pass each
+FIRST_MATCHES_MIN_RECORDS = 4
+
+# Known poisoning addresses (a blocklist.Blocklist), opened by load_blocklist;
+# CLIPSHIELD_BLOCKLIST names the file at startup
+blocklist = None
+
+# Check every address found in copied text, not only a copied address on its
+# own; CLIPSHIELD_SCAN_MODE=1 turns it on at startup
+scan_mode = False
 
 def is_valid_address(address):
-    """Checks if the address is valid for any supported blockchain format."""
-    return (
-        bool(ETH_ADDRESS_REGEX.match(address)) or
-        bool(BTC_ADDRESS_REGEX.match(address)) or
-        bool(BSC_ADDRESS_REGEX.match(address))
-    )
+    """Checks if the address is valid for any supported blockchain format.
 
-def is_suspicious(copied_address):
-    """Checks if the copied address is suspicious."""
-    global previously_copied_addresses, trusted_addresses
+    BSC and the other EVM chains share the Ethereum address format.
+    """
+    chain_format, _ = validate_address(address)
+    return chain_format is not None
 
-    copied_address = copied_address.strip().lower()
+def is_suspicious(copied_address, book=None, history=None):
+    """Checks if the copied address is suspicious.
 
-    # Calculate dynamic threshold based on the copied address
-    dynamic_threshold = calculate_dynamic_threshold(copied_address)
+    `book` and `history` default to trusted_addresses and
+    previously_copied_addresses.
+    """
+    return check_address(copied_address, book, history).suspicious
 
-    if copied_address in trusted_addresses:
-        return False
-     
-    # Compare with trusted addresses
-    for trusted in trusted_addresses:
-        trusted = trusted.lower()  # Convert trusted address to lowercase
-        lev_sim = similarity_score(copied_address, trusted)
-        ham_sim = hamming_similarity(copied_address, trusted)
-        combined_score = (lev_sim + ham_sim) / 2
-        prefix_match = copied_address[:10] == trusted[:10]
-        suffix_match = copied_address[-10:] == trusted[-10:]
-
-        if (lev_sim > dynamic_threshold or ham_sim > dynamic_threshold or combined_score > dynamic_threshold) or prefix_match or suffix_match:
-            print(f"⚠️ Address is similar to a trusted address: {trusted}")
-            pyperclip.copy("") 
-            return True 
+def check_address(copied_address, book=None, history=None):
+    """Scores a copied address (or its AddressRecord) once and returns its
+    Verdict. `book` and `history` default as for is_suspicious."""
+    if book is None:
+        book = trusted_addresses
+    if history is None:
+        history = previously_copied_addresses
 
-    # Compare with previously copied addresses
-    for prev_address in previously_copied_addresses:
-        lev_sim = similarity_score(copied_address, prev_address)
-        ham_sim = hamming_similarity(copied_address, prev_address)
-        combined_score = (lev_sim + ham_sim) / 2
-        prefix_match = copied_address[:10] == prev_address[:10]
-        suffix_match = copied_address[-10:] == prev_address[-10:]
+    # Decode the copied address once; the comparisons below only use the record
+    record = copied_address if isinstance(copied_address, AddressRecord) else make_record(copied_address)
 
-        if (lev_sim > dynamic_threshold or ham_sim > dynamic_threshold or combined_score > dynamic_threshold) or prefix_match or suffix_match:
-            print(f"⚠️ Address is similar to previously copied address")
-            pyperclip.copy("")
-            return True 
+    # Calculate dynamic threshold based on the copied address
+    dynamic_threshold = calculate_dynamic_threshold(record.key)
+
+    # Known poisoning addresses are flagged before any scoring
+    if _blocklisted(record):
+        verdict = Verdict(record.address, dynamic_threshold, source="blocklist")
+        _report(verdict)
+        return verdict
+
+    if record.key in book:
+        return Verdict(record.address, dynamic_threshold)
+
+    # Reuse the verdict while neither the book nor the history has changed
+    versions = (book.index.version, history.index.version)
+    verdict = verdict_cache.get(record.key, versions)
+    if verdict is None:
+        verdict = _score_address(record, book, history, dynamic_threshold)
+        verdict_cache.put(record.key, versions, verdict)
+
+    _report(verdict)
+    return verdict
+
+def check_addresses(records, book=None, history=None):
+    """Returns the Verdicts of many AddressRecords, such as the addresses
+    found in one clipboard, as check_address would for each of them.
+
+    The blocklist, book and verdict cache are looked up for all records
+    first, and the fixed-width records left are matched against each packed
+    book in one pass. Every record is scored against the history as it was
+    before the call, not against the other records.
+    """
+    if book is None:
+        book = trusted_addresses
+    if history is None:
+        history = previously_copied_addresses
+
+    verdicts = [None] * len(records)
+    thresholds = [calculate_dynamic_threshold(record.key) for record in records]
+    versions = (book.index.version, history.index.version)
+    pending = []
+    for i, record in enumerate(records):
+        if _blocklisted(record):
+            verdicts[i] = Verdict(record.address, thresholds[i], source="blocklist")
+        elif record.key in book:
+            verdicts[i] = Verdict(record.address, thresholds[i])
+        else:
+            verdicts[i] = verdict_cache.get(record.key, versions)
+            if verdicts[i] is None:
+                pending.append(i)
+
+    # Score the book before the history, as _score_address does
+    for source, index in (("book", book.index), ("history", history.index)):
+        matches = _find_similar_many([records[i] for i in pending], index, [thresholds[i] for i in pending])
+        unmatched = []
+        for i, match in zip(pending, matches):
+            if match is None:
+                unmatched.append(i)
+            else:
+                verdicts[i] = match_verdict(records[i], match, source, thresholds[i])
+                verdict_cache.put(records[i].key, versions, verdicts[i])
+        pending = unmatched
+    for i in pending:
+        verdicts[i] = Verdict(records[i].address, thresholds[i])
+        verdict_cache.put(records[i].key, versions, verdicts[i])
+
+    for verdict in verdicts:
+        _report(verdict)
+    return verdicts
+
+def _blocklisted(record):
+    return (blocklist is not None and record.payload is not None
+            and len(record.payload) == PAYLOAD_SIZE and record.payload in blocklist)
+
+def _report(verdict):
+    """Prints why a verdict is suspicious."""
+    if verdict.source == "blocklist":
+        print(f"⚠️ Address is on the blocklist of known poisoning addresses: {verdict.address}")
+    elif verdict.source == "book":
+        print(f"⚠️ Address is similar to a trusted address: {verdict.matched_address}")
+    elif verdict.source == "history":
+        print(f"⚠️ Address is similar to previously copied address")
+
+def _score_address(record, book, history, dynamic_threshold):
+    """Returns the Verdict of a record, scoring the book before the history."""
+    # Compare with trusted addresses
+    trusted = _find_similar(record, book.index, dynamic_threshold)
+    if trusted is not None:
+        return match_verdict(record, trusted, "book", dynamic_threshold)
 
-    return False  
+    # Compare with previously copied addresses
+    copied = _find_similar(record, history.index, dynamic_threshold)
+    if copied is not None:
+        return match_verdict(record, copied, "history", dynamic_threshold)
+
+    return Verdict(record.address, dynamic_threshold)
+
+def _find_similar(record, index, dynamic_threshold):
+    """Returns an indexed record that is similar to the copied one, or None."""
+    # Exact prefix/suffix collisions are looked up in the index
+    match = index.exact_match(record)
+    if match is not None:
+        return match
+
+    # Fixed-width addresses get Hamming scores for the whole set in one
+    # vectorized pass
+    if record.chain == "evm" and record.payload is not None and len(index.packed):
+        match = _hamming_match(record, index.packed, dynamic_threshold)
+        if match is not None:
+            return match
+
+    return _search_candidates(record, index, dynamic_threshold)
+
+def _hamming_match(record, packed, dynamic_threshold):
+    """Returns a record of the PackedAddressBook whose Hamming similarity
+    with the record is above the threshold, or None. Scored on scoring_pool
+    when it is enabled."""
+    if scoring_pool is not None:
+        match, hamming = scoring_pool.best_match(record, packed)
+        return match if hamming > dynamic_threshold else None
+    hamming = score_many(record, packed)
+    hits = (hamming > dynamic_threshold) & (hamming < 100)
+    rows = hits.nonzero()[0]
+    return packed.records[rows[0]] if len(rows) else None
+
+def _find_similar_many(records, index, thresholds):
+    """Returns, for each record, an indexed record that is similar to it, or
+    None; the fixed-width records are matched in one vectorized pass."""
+    found = [index.exact_match(record) for record in records]
+
+    # Fixed-width records of one threshold are matched together, in this
+    # process, since the workers of scoring_pool take one query at a time.
+    # A block join costs about as much as scoring FIRST_MATCHES_MIN_RECORDS
+    # records one by one, so smaller groups are scored as check_address does
+    groups = {}
+    for i, record in enumerate(records):
+        if found[i] is None and record.chain == "evm" and record.payload is not None:
+            groups.setdefault(thresholds[i], []).append(i)
+    if len(index.packed):
+        for threshold, group in groups.items():
+            if len(group) < FIRST_MATCHES_MIN_RECORDS:
+                for i in group:
+                    found[i] = _hamming_match(records[i], index.packed, threshold)
+                continue
+            rows = first_matches([records[i] for i in group], index.packed, threshold)
+            for i, row in zip(group, rows.tolist()):
+                if row >= 0:
+                    found[i] = index.packed.records[row]
+
+    for i, record in enumerate(records):
+        if found[i] is None:
+            found[i] = _search_candidates(record, index, thresholds[i])
+    return found
+
+def _search_candidates(record, index, dynamic_threshold):
+    """Returns the first candidate of the q-gram index that is similar to the
+    record, or None."""
+    # Score the addresses the q-gram index cannot rule out. Hamming
+    # similarity never exceeds Levenshtein similarity and the combined score
+    # lies between the two, so only the Levenshtein score has to beat the
+    # threshold, and its computation can stop as soon as it cannot.
+    key = record.key
+    scored = 0
+    for other in index.candidates(record, dynamic_threshold):
+        scored += 1
+        if similarity_score(key, other.key, dynamic_threshold) > dynamic_threshold:
+            metrics.observe("candidates_scored", scored)
+            return other
+    metrics.observe("candidates_scored", scored)
+    return None
+
+def enable_parallel_scoring(workers=None):
+    """Runs the Hamming pass of check_address over large address books on a
+    pool of worker processes (one per CPU unless `workers` is given), and
+    that of check_addresses for fewer than FIRST_MATCHES_MIN_RECORDS
+    addresses. The Levenshtein stage is not parallelized."""
+    global scoring_pool
+    if scoring_pool is None:
+        scoring_pool = ScoringPool(workers)
+    return scoring_pool
+
+def remember_address(address):
+    """Adds a safe address (or its AddressRecord) to the clipboard history."""
+    previously_copied_addresses.add(address)
 
 def show_clipboard_history():
     """Displays previously copied addresses."""
@@ -77,8 +287,13 @@ def show_clipboard_history():
         print("\n📋 Previously Copied Addresses:")
         for addr in previously_copied_addresses:
             print(addr)
+        evictions = previously_copied_addresses.evictions
+        if any(evictions.values()):
+            print(f"ℹ️ Older entries evicted: {evictions['count']} by count, "
+                  f"{evictions['age']} by age, {evictions['memory']} by memory.")
     else:
         print("\nℹ️ No addresses copied yet.")
+    print(f"ℹ️ Verdict cache: {verdict_cache.hits} hits, {verdict_cache.misses} misses.")
 
 def clear_clipboard():
     """Clears clipboard and history."""
@@ -98,8 +313,7 @@ def add_trusted_address():
             print("Enter a trusted address to whitelist: ")
             new_trusted = input().strip()
             if is_valid_address(new_trusted):
-                trusted_addresses.append(new_trusted.lower())
-                save_addresses(trusted_addresses)  # Save after adding
+                add_trusted(new_trusted)  # Saves just this address
                 print(f"✅ Trusted address added: {new_trusted}")
             else:
                 print("❌ Invalid address format. Please try again.")
@@ -107,8 +321,8 @@ def add_trusted_address():
         elif action == "view":
             if trusted_addresses:
                 print("\n📋 Your current trusted addresses:")
-                for i, addr in enumerate(trusted_addresses, 1):
-                    print(f"{i}. {addr}")
+                for i, (addr, label) in enumerate(trusted_addresses.items(), 1):
+                    print(f"{i}. {addr} {label}".rstrip())
             else:
                 print("❌ No trusted addresses available.")
 
@@ -121,8 +335,8 @@ def add_trusted_address():
                 try:
                     address_to_remove = int(input())
                     if 0 < address_to_remove <= len(trusted_addresses):
-                        removed_address = trusted_addresses.pop(address_to_remove - 1)
-                        save_addresses(trusted_addresses)  # Save after removing
+                        removed_address = list(trusted_addresses)[address_to_remove - 1]
+                        remove_trusted(removed_address)  # Deletes just this address
                         print(f"✅ Trusted address removed: {removed_address}")
                     else:
                         print("❌ Invalid number. Please try again.")
@@ -138,66 +352,113 @@ def add_trusted_address():
         else:
             print("❌ Invalid option. Please enter 'add', 'remove', 'view', or 'exit'.")
 
-def monitor_clipboard(callback=None):
-    """Monitors clipboard for similar addresses."""
+def monitor_clipboard(callback=None, source=None, active_event=None):
+    """Monitors clipboard for similar addresses.
+
+    Runs until `active_event` is cleared, or forever when it is None. Call
+    `source.wake()` after clearing the event so a blocked wait returns.
+    """
+    if source is None:
+        source = default_clipboard_source()
+
     try:
-        previous_clipboard = pyperclip.paste() or ""
+        previous_clipboard = source.read() or ""
     except Exception as e:
         print(f"Clipboard access error: {e}")
         previous_clipboard = ""
 
-    current_clipboard = previous_clipboard
     last_valid_address = None
+    # Only a digest of the last clipboard is kept, so a large one is neither
+    # held in memory nor compared in full on every change
+    previous_digest = None
 
     if previous_clipboard and isinstance(previous_clipboard, str):
-        if is_valid_address(previous_clipboard) and previous_clipboard not in previously_copied_addresses:
-            is_suspicious_flag = is_suspicious(previous_clipboard)
-            if is_suspicious_flag:
-                print(f"⚠️ Warning: Similar address detected!")
-                if callback:
-                    callback(
-                        "⚠️ Warning: Similar address detected!",
-                        is_warning=True,
-                        suspicious_address=previous_clipboard,
-                        original_address=last_valid_address
-                    )
-            else:
-                print(f"✅ Address is safe: {previous_clipboard}")
-                previously_copied_addresses.append(previous_clipboard)
-                last_valid_address = previous_clipboard 
+        previous_digest = content_digest(previous_clipboard)
+        last_valid_address = check_clipboard(previous_clipboard, callback, last_valid_address)
+    previous_clipboard = None
+
+    while active_event is None or active_event.is_set():
+        if not source.wait_for_change():
+            continue
 
-    while True:
         try:
-            current_clipboard = pyperclip.paste()
+            started = metrics.now()
+            current_clipboard = source.read()
+            metrics.observe_since("clipboard_read_seconds", started)
         except Exception as e:
             print(f"Clipboard access error: {e}")
-            time.sleep(1)
+            metrics.inc("clipboard_errors_total")
             continue
 
         if not current_clipboard or not isinstance(current_clipboard, str):
-            time.sleep(1)
             continue
 
-        if current_clipboard != previous_clipboard:
-            previous_clipboard = current_clipboard
-
-            if is_valid_address(current_clipboard) and current_clipboard not in previously_copied_addresses:
-                is_suspicious_flag = is_suspicious(current_clipboard)
-                if is_suspicious_flag:
-                    print(f"⚠️ Warning: Similar address detected!")
-                    if callback:
-                        callback(
-                            "⚠️ Warning: Similar address detected!",
-                            is_warning=True,
-                            suspicious_address=current_clipboard,
-                            original_address=last_valid_address
-                        )
-                else:
-                    print(f"✅ Address is safe: {current_clipboard}")
-                    previously_copied_addresses.append(current_clipboard)
-                    last_valid_address = current_clipboard
-
-        time.sleep(1)
+        digest = content_digest(current_clipboard)
+        if digest != previous_digest:
+            previous_digest = digest
+            last_valid_address = check_clipboard(current_clipboard, callback, last_valid_address)
+
+def check_clipboard(clipboard, callback=None, last_valid_address=None):
+    """Checks a new clipboard value and returns the last safe address. In
+    scan mode, every address in a clipboard holding more than an address
+    is checked, and the callback is called once for all the suspicious
+    ones."""
+    changed_at = metrics.now()
+    # Validating builds the record, so the address is decoded only once
+    record = make_record(clipboard) if len(clipboard) <= MAX_ADDRESS_LENGTH else None
+    if record is not None and record.payload is not None:
+        found = [record]
+    elif scan_mode:
+        # Addresses copied before were safe then and are not checked again
+        found = [scanned for scanned in extract_addresses(clipboard)
+                 if scanned.address not in previously_copied_addresses]
+    else:
+        found = []
+    metrics.observe_since("validation_seconds", changed_at)
+    if not found:
+        return last_valid_address
+
+    started = metrics.now()
+    copied = found[0] is record
+    if copied:
+        if clipboard in previously_copied_addresses:
+            return last_valid_address
+        addresses, verdicts = [clipboard], [check_address(record)]
+    else:
+        addresses, verdicts = [scanned.address for scanned in found], check_addresses(found)
+    metrics.observe_since("scoring_seconds", started)
+
+    alerts = []
+    for address, verdict in zip(addresses, verdicts):
+        if verdict.suspicious:
+            print(f"⚠️ Warning: Similar address detected! ({verdict.evidence()})")
+            metrics.inc("alerts_total")
+            alerts.append((address, verdict))
+        else:
+            print(f"✅ Address is safe: {address}")
+
+    if alerts:
+        pyperclip.copy("")
+        if callback:
+            # One callback per clipboard read, naming the first suspicious
+            # address and listing all of them in `alerts`
+            address, verdict = alerts[0]
+            metrics.observe_since("callback_seconds", changed_at)
+            callback(
+                "⚠️ Warning: Similar address detected!",
+                is_warning=True,
+                suspicious_address=address,
+                original_address=last_valid_address,
+                verdict=verdict,
+                alerts=alerts
+            )
+
+    # Only a copied address is remembered; the addresses of a pasted table
+    # would evict the history and invalidate every cached verdict
+    if copied and not verdicts[0].suspicious:
+        remember_address(record)
+        last_valid_address = clipboard
+    return last_valid_address
 
 def handle_suspicious_clipboard(copied_address, is_warning):
     if is_warning:
@@ -205,38 +466,134 @@ def handle_suspicious_clipboard(copied_address, is_warning):
     else:
         print(f"✅ Address is safe: {copied_address}")
 
-def load_addresses():
-    """Load trusted from the JSON file."""
-    global trusted_addresses
+def load_addresses(path=None):
+    """Load trusted addresses from the database (DB_FILE unless `path` is given).
 
-    if os.path.exists(DATA_FILE):
-        try:
-            with open(DATA_FILE, "r") as f:
-                data = json.load(f)
-                
-                # Ensure trusted_addresses is a dictionary
-                trusted_addresses = data.get("trusted_addresses", {})
-                
-                # Check if trusted_addresses is a dictionary
-                if not isinstance(trusted_addresses, dict):
-                    print("❌ Error: trusted_addresses is not a dictionary.")
-                    trusted_addresses = {}  # Reset to an empty dictionary if the format is incorrect
-
-                print("🔄 Loaded saved addresses.")
-        except Exception as e:
-            print(f"❌ Error loading addresses: {e}")
-            trusted_addresses = {}
-    else:
-        trusted_addresses = {}
+    A `path` ending in .json is read as a JSON address file instead. The
+    prepared book is taken from the snapshot next to the file when the
+    snapshot is current; otherwise the book is loaded from the file and a
+    new snapshot is written in the background. Either way the q-gram
+    postings are built in the background too, ahead of the first check.
+    """
+    global trusted_addresses, address_store, snapshot_writer, index_builder, loaded_snapshot
+
+    path = path or DB_FILE
+    try:
+        if path.endswith(".json"):
+            token = book_snapshot.json_token(path) if os.path.exists(path) else None
+        else:
+            if address_store is not None:
+                address_store.close()
+            address_store = AddressStore(path, legacy_json=DATA_FILE if path == DB_FILE else None)
+            token = address_store.generation()
+
+        snapshot = book_snapshot.snapshot_path(path)
+        loaded_snapshot = (snapshot, token) if token else None
+        book = book_snapshot.read_snapshot(snapshot, token) if token else None
+        if book is None:
+            if path.endswith(".json"):
+                entries = read_json_addresses(path) if token else {}
+            else:
+                entries = address_store.labels()
+            book = IndexedAddressBook(entries)
+            if token:
+                snapshot_writer = book_snapshot.write_in_background(snapshot, book, token)
+
+        index_builder = threading.Thread(target=book.index.prepare, name="clipshield-index", daemon=True)
+        index_builder.start()
+        trusted_addresses = book
+        print("🔄 Loaded saved addresses.")
+    except Exception as e:
+        print(f"❌ Error loading addresses: {e}")
+        trusted_addresses = IndexedAddressBook()
+        loaded_snapshot = None
 
     return trusted_addresses
 
+def _store():
+    global address_store
+    if address_store is None:
+        address_store = AddressStore(DB_FILE, legacy_json=DATA_FILE)
+    return address_store
+
+def add_trusted(address, label=""):
+    """Adds a trusted address, or relabels it, and saves just that record."""
+    record = make_record(address, label)
+    trusted_addresses.index.add(record)
+    _store().upsert(record.address, label, record.chain)
+
+def remove_trusted(address):
+    """Removes a trusted address and deletes just that record."""
+    record = trusted_addresses.record(address)
+    if record is None:
+        raise KeyError(address)
+    trusted_addresses.index.remove(record.key)
+    _store().delete(record.address)
+
 def save_addresses(trusted):
-    data = {
-        "trusted_addresses": trusted
-    }
-    with open(DATA_FILE, "w") as f:
-        json.dump(data, f, indent=4)
+    """Replaces the whole stored address book in one transaction."""
+    _store().replace_all(trusted)
+
+def load_verdict_cache(path, book=None, history=None):
+    """Loads verdicts saved by save_verdict_cache if the book is unchanged
+    and nothing has been copied yet. Returns how many were loaded."""
+    book = trusted_addresses if book is None else book
+    history = previously_copied_addresses if history is None else history
+    if len(history.index):
+        return 0
+    versions = (book.index.version, history.index.version)
+    return verdict_cache.load(path, versions, fingerprint(book.index))
+
+def save_verdict_cache(path, book=None):
+    """Saves the cached verdicts that remain valid after a restart."""
+    book = trusted_addresses if book is None else book
+    try:
+        verdict_cache.save(path, book.index.version, fingerprint(book.index))
+    except OSError as e:
+        print(f"❌ Could not save verdicts to {path}: {e}")
+
+def configure_verdict_cache_from_env():
+    """Loads the verdict cache file named by CLIPSHIELD_VERDICT_CACHE and
+    saves it again at exit."""
+    path = os.environ.get("CLIPSHIELD_VERDICT_CACHE")
+    if not path:
+        return None
+    try:
+        loaded = load_verdict_cache(path)
+        print(f"🗃️ Loaded {loaded} cached verdicts.")
+    except (OSError, ValueError) as e:
+        print(f"❌ Could not load verdicts from {path}: {e}")
+    atexit.register(save_verdict_cache, path)
+    return path
+
+def load_blocklist(path):
+    """Opens the blocklist file at `path` and uses it in check_address."""
+    global blocklist
+    opened = Blocklist(path)
+    if blocklist is not None:
+        blocklist.close()
+    blocklist = opened
+    return blocklist
+
+def configure_scan_mode_from_env():
+    """Turns on scan mode if CLIPSHIELD_SCAN_MODE is set to 1."""
+    global scan_mode
+    if os.environ.get("CLIPSHIELD_SCAN_MODE") == "1":
+        scan_mode = True
+        print("🔎 Scan mode: every address in copied text is checked.")
+    return scan_mode
+
+def configure_blocklist_from_env():
+    """Loads the blocklist file named by CLIPSHIELD_BLOCKLIST."""
+    path = os.environ.get("CLIPSHIELD_BLOCKLIST")
+    if not path:
+        return None
+    try:
+        load_blocklist(path)
+        print(f"🚫 Loaded blocklist of {len(blocklist)} known poisoning addresses.")
+    except (OSError, ValueError) as e:
+        print(f"❌ Could not load blocklist {path}: {e}")
+    return path
 
 def user_command_listener():
     """Listens for user commands to interact with the tool."""
@@ -246,6 +603,8 @@ def user_command_listener():
         print("2. View clipboard history")
         print("3. Clear clipboard")
         print("4. Exit")
+        print("5. Toggle latency metrics")
+        print("6. Show latency metrics")
 
         command = input("Enter command: ").strip()
 
@@ -258,13 +617,52 @@ def user_command_listener():
         elif command == "4":
             print("\n🔹 Exiting the program.")
             break
+        elif command == "5":
+            if metrics.enabled:
+                metrics.disable()
+                print("📈 Latency metrics disabled.")
+            else:
+                metrics.enable()
+                print("📈 Latency metrics enabled.")
+        elif command == "6":
+            if metrics.enabled:
+                print(metrics.render())
+            else:
+                print("📈 Latency metrics are disabled; enable them with command 5.")
         else:
             print("❌ Invalid command, please try again.")
 
 
 if __name__ == "__main__":
+    # Headless mode: python -m clip_monitor screen ...
+    if len(sys.argv) > 1 and sys.argv[1] == "screen":
+        from screening import main as screen_main
+        sys.exit(screen_main(sys.argv[2:]))
+
+    # Detection service: python -m clip_monitor serve ...
+    if len(sys.argv) > 1 and sys.argv[1] == "serve":
+        from detection_service import main as serve_main
+        sys.exit(serve_main(sys.argv[2:]))
+
+    # Blocklist import: python -m clip_monitor blocklist OUTPUT INPUT...
+    if len(sys.argv) > 1 and sys.argv[1] == "blocklist":
+        from blocklist import main as blocklist_main
+        sys.exit(blocklist_main(sys.argv[2:]))
+
+    # Start exporting metrics if CLIPSHIELD_METRICS_PORT/FILE is set
+    metrics.configure_from_env()
+
     # Load existing addresses
     trusted_addresses = load_addresses()
+
+    # Reuse verdicts from the last run if CLIPSHIELD_VERDICT_CACHE is set
+    configure_verdict_cache_from_env()
+
+    # Flag known poisoning addresses if CLIPSHIELD_BLOCKLIST is set
+    configure_blocklist_from_env()
+
+    # Check addresses inside copied text if CLIPSHIELD_SCAN_MODE=1
+    configure_scan_mode_from_env()
     
     # Start monitoring in a background thread
     clipboard_monitor_thread = threading.Thread(target=monitor_clipboard)
@@ -0,0 +1,203 @@
+import os
+import select
+import sys
+import threading
+import time
+
+import pyperclip
+
+
+class ClipboardSource:
+    """Interface of the clipboard backends used by monitor_clipboard.
+
+    `wait_for_change` blocks until the clipboard may have changed and returns
+    True, or returns False when it timed out or was interrupted by `wake`.
+    `read` returns the current clipboard text.
+    """
+
+    def read(self):
+        raise NotImplementedError
+
+    def wait_for_change(self, timeout=None):
+        raise NotImplementedError
+
+    def wake(self):
+        """Interrupts a blocked wait_for_change from another thread."""
+
+    def close(self):
+        """Releases the resources held by the source."""
+
+
+class PollingClipboardSource(ClipboardSource):
+    """Reads the clipboard through pyperclip every `interval` seconds."""
+
+    def __init__(self, interval=1.0):
+        self.interval = interval
+        self._woken = threading.Event()
+
+    def read(self):
+        return pyperclip.paste()
+
+    def wait_for_change(self, timeout=None):
+        if timeout is None or timeout > self.interval:
+            timeout = self.interval
+        if self._woken.wait(timeout):
+            self._woken.clear()
+            return False
+        return True
+
+    def wake(self):
+        self._woken.set()
+
+
+class FakeClipboardSource(ClipboardSource):
+    """In-memory clipboard for tests. Every `set` call is one change."""
+
+    def __init__(self, text=""):
+        self._text = text
+        self._changes = 0
+        self._seen = 0
+        self._woken = False
+        self._condition = threading.Condition()
+
+    def set(self, text):
+        with self._condition:
+            self._text = text
+            self._changes += 1
+            self._condition.notify_all()
+
+    def read(self):
+        with self._condition:
+            self._seen = self._changes
+            return self._text
+
+    def wait_for_change(self, timeout=None):
+        with self._condition:
+            self._condition.wait_for(lambda: self._woken or self._changes != self._seen, timeout)
+            if self._woken:
+                self._woken = False
+                return False
+            return self._changes != self._seen
+
+    def wake(self):
+        with self._condition:
+            self._woken = True
+            self._condition.notify_all()
+
+
+class XFixesClipboardSource(ClipboardSource):
+    """X11 backend that is notified of clipboard owner changes by XFixes.
+
+    One display connection is kept open for both the change notifications
+    and the reads, so no helper process is started and an idle clipboard
+    causes no wakeups. Requires python-xlib.
+    """
+
+    def __init__(self, display=None, read_timeout=1.0):
+        from Xlib import X, Xatom, display as xdisplay
+        from Xlib.ext import xfixes
+
+        self._X = X
+        self._xfixes = xfixes
+        self.read_timeout = read_timeout
+        self._display = xdisplay.Display(display)
+        if not self._display.has_extension("XFIXES"):
+            self._display.close()
+            raise RuntimeError("X server does not support XFIXES")
+        self._display.xfixes_query_version()
+
+        self._clipboard = self._display.intern_atom("CLIPBOARD")
+        self._utf8 = self._display.intern_atom("UTF8_STRING")
+        self._incr = self._display.intern_atom("INCR")
+        self._property = self._display.intern_atom("CLIPSHIELD_SELECTION")
+        self._string = Xatom.STRING
+
+        screen = self._display.screen()
+        self._window = screen.root.create_window(0, 0, 1, 1, 0, screen.root_depth)
+        self._display.xfixes_select_selection_input(
+            self._window, self._clipboard, xfixes.XFixesSetSelectionOwnerNotifyMask
+        )
+        self._display.flush()
+
+        self._changed = False
+        self._wake_read, self._wake_write = os.pipe()
+
+    def read(self):
+        X = self._X
+        if self._display.get_selection_owner(self._clipboard) == X.NONE:
+            return ""
+        for target in (self._utf8, self._string):
+            self._window.convert_selection(self._clipboard, target, self._property, X.CurrentTime)
+            self._display.flush()
+            event = self._next_selection_notify()
+            if event is None:
+                raise TimeoutError("Clipboard owner did not answer")
+            if event.property == X.NONE:
+                continue
+            prop = self._window.get_full_property(self._property, X.AnyPropertyType)
+            self._window.delete_property(self._property)
+            if prop is None:
+                return ""
+            if prop.property_type == self._incr:
+                # Large transfers come in chunks; leave those to pyperclip
+                return pyperclip.paste()
+            value = prop.value
+            if isinstance(value, bytes):
+                return value.decode("utf-8" if target == self._utf8 else "latin-1", "replace")
+            return ""
+        return ""
+
+    def wait_for_change(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            self._drain_events()
+            if self._changed:
+                self._changed = False
+                return True
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            ready, _, _ = select.select([self._display.fileno(), self._wake_read], [], [], remaining)
+            if self._wake_read in ready:
+                os.read(self._wake_read, 4096)
+                return False
+            if not ready:
+                return False
+
+    def wake(self):
+        os.write(self._wake_write, b"\0")
+
+    def close(self):
+        self._window.destroy()
+        self._display.close()
+        os.close(self._wake_read)
+        os.close(self._wake_write)
+
+    def _drain_events(self):
+        while self._display.pending_events():
+            self._handle_event(self._display.next_event())
+
+    def _handle_event(self, event):
+        if isinstance(event, self._xfixes.SetSelectionOwnerNotify):
+            self._changed = True
+
+    def _next_selection_notify(self):
+        deadline = time.monotonic() + self.read_timeout
+        while True:
+            while self._display.pending_events():
+                event = self._display.next_event()
+                if event.type == self._X.SelectionNotify and event.selection == self._clipboard:
+                    return event
+                self._handle_event(event)
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            select.select([self._display.fileno()], [], [], remaining)
+
+
+def default_clipboard_source():
+    """Returns the XFixes backend on X11 and the polling backend elsewhere."""
+    if sys.platform.startswith("linux") and os.environ.get("DISPLAY"):
+        try:
+            return XFixesClipboardSource()
+        except Exception as e:
+            print(f"ℹ️ Clipboard change notifications unavailable ({e}), polling instead.")
+    return PollingClipboardSource()
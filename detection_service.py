@@ -0,0 +1,325 @@
+"""Local detection service.
+
+    python -m clip_monitor serve [--port 8765] [--socket PATH] [--book FILE] [--blocklist FILE]
+                                 [--parallel-scoring]
+
+Answers "is this address safe?" over HTTP on 127.0.0.1 or a Unix socket, so
+local tools can ask without loading the address book themselves:
+
+    POST /check        {"address": "0x..."}          -> verdict
+    POST /check_batch  {"addresses": ["0x...", ...]} -> {"results": [verdict, ...]}
+    POST /reload                                     -> reloads the address book
+    GET  /health                                     -> {"status": "ok", "addresses": N, "blocklisted": N,
+                                                         "verdict_cache": {...}}
+
+A verdict is verdict.Verdict.to_dict() plus "valid": the matched address,
+its label, whether it came from the book, the history or the blocklist, and
+the similarity evidence.
+
+Requests that arrive together are coalesced: the pending addresses are
+deduplicated and scored in one pass on a worker thread, so the event loop
+keeps accepting clients. The book is reloaded in the background when the
+database changes (or on /reload and SIGHUP) and swapped in between batches;
+a batch already running keeps the book it started with. Verdicts are cached
+in clip_monitor.verdict_cache, and with CLIPSHIELD_VERDICT_CACHE set they are
+saved at shutdown and reused on the next start if the book is unchanged.
+"""
+import argparse
+import asyncio
+import json
+import os
+import signal
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import clip_monitor
+from address_index import IndexedAddressBook
+from address_record import make_record
+from address_store import AddressStore, read_json_addresses
+from history import ClipboardHistory
+
+DEFAULT_PORT = 8765
+
+# Coalescing window: a batch is scored when it holds MAX_BATCH addresses or
+# BATCH_DELAY seconds after its first address arrived
+MAX_BATCH = 512
+BATCH_DELAY = 0.002
+
+MAX_BODY_BYTES = 1024 * 1024
+MAX_BATCH_REQUEST = 10000
+
+# Seconds between checks for address book changes
+WATCH_INTERVAL = 2.0
+
+
+class DetectionService:
+    def __init__(self, book_path):
+        self.book_path = book_path
+        self.book = IndexedAddressBook()
+        # The service has no clipboard, so it never has a copy history
+        self.history = ClipboardHistory()
+        self._store = None
+        self._book_version = None
+        self._queue = None
+        self._reload_lock = None
+        self._scorer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="clipshield-score")
+        self._loader = ThreadPoolExecutor(max_workers=1, thread_name_prefix="clipshield-load")
+
+    # Address book
+
+    def _read_book(self):
+        if self.book_path.endswith(".json"):
+            version = os.stat(self.book_path).st_mtime_ns if os.path.exists(self.book_path) else None
+            entries = read_json_addresses(self.book_path) if version is not None else {}
+        else:
+            if self._store is None:
+                legacy = clip_monitor.DATA_FILE if self.book_path == clip_monitor.DB_FILE else None
+                self._store = AddressStore(self.book_path, legacy_json=legacy)
+            version = self._store.data_version()
+            entries = self._store.labels()
+        book = IndexedAddressBook(entries)
+        book.index.prepare()
+        return book, version
+
+    def _current_version(self):
+        if self.book_path.endswith(".json"):
+            return os.stat(self.book_path).st_mtime_ns if os.path.exists(self.book_path) else None
+        return self._store.data_version()
+
+    async def reload(self):
+        """Builds a new book on the loader thread and swaps it in."""
+        async with self._reload_lock:
+            loop = asyncio.get_running_loop()
+            book, version = await loop.run_in_executor(self._loader, self._read_book)
+            self.book, self._book_version = book, version
+            print(f"🔄 Loaded {len(book)} addresses.")
+
+    async def _reload_logged(self):
+        """Reloads the book, reporting errors instead of raising them, for
+        reloads nobody awaits."""
+        try:
+            await self.reload()
+        except Exception as e:
+            print(f"❌ Error reloading addresses: {e}")
+
+    async def _watch(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(WATCH_INTERVAL)
+            try:
+                version = await loop.run_in_executor(self._loader, self._current_version)
+                if version != self._book_version:
+                    await self.reload()
+            except Exception as e:
+                print(f"❌ Error reloading addresses: {e}")
+
+    # Scoring
+
+    def _score(self, book, addresses):
+        results = {}
+        valid, records = [], []
+        for address in addresses:
+            # Validating builds the record, so each address is decoded once
+            record = make_record(address)
+            if record.payload is None:
+                results[address] = {"address": address, "valid": False, "suspicious": False}
+            else:
+                valid.append(address)
+                records.append(record)
+        # The whole batch is scored in one pass, as a scanned clipboard is
+        verdicts = clip_monitor.check_addresses(records, book, self.history)
+        for address, verdict in zip(valid, verdicts):
+            results[address] = {**verdict.to_dict(), "address": address, "valid": True}
+        return results
+
+    async def check(self, addresses):
+        """Queues addresses for the next batch and returns their verdicts."""
+        loop = asyncio.get_running_loop()
+        futures = []
+        for address in addresses:
+            future = loop.create_future()
+            self._queue.put_nowait((address, future))
+            futures.append(future)
+        return await asyncio.gather(*futures)
+
+    async def _batcher(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            pending = [await self._queue.get()]
+            deadline = loop.time() + BATCH_DELAY
+            while len(pending) < MAX_BATCH:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    pending.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            addresses = list(dict.fromkeys(address for address, _ in pending))
+            try:
+                results = await loop.run_in_executor(self._scorer, self._score, self.book, addresses)
+            except Exception as e:
+                for _, future in pending:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for address, future in pending:
+                if not future.done():
+                    future.set_result(results[address])
+
+    # HTTP
+
+    async def _route(self, method, path, body):
+        if method == "GET" and path == "/health":
+            blocklist = clip_monitor.blocklist
+            return 200, {"status": "ok", "addresses": len(self.book),
+                         "blocklisted": len(blocklist) if blocklist is not None else 0,
+                         "verdict_cache": clip_monitor.verdict_cache.stats()}
+        if method != "POST":
+            return 405, {"error": "method not allowed"}
+        if path == "/reload":
+            await self.reload()
+            return 200, {"status": "reloaded", "addresses": len(self.book)}
+
+        try:
+            request = json.loads(body or b"{}")
+        except ValueError:
+            return 400, {"error": "invalid JSON"}
+        if not isinstance(request, dict):
+            return 400, {"error": "expected a JSON object"}
+
+        if path == "/check":
+            address = request.get("address")
+            if not isinstance(address, str):
+                return 400, {"error": "missing string field 'address'"}
+            (verdict,) = await self.check([address.strip()])
+            return 200, verdict
+        if path == "/check_batch":
+            addresses = request.get("addresses")
+            if not isinstance(addresses, list) or not all(isinstance(a, str) for a in addresses):
+                return 400, {"error": "expected 'addresses' to be a list of strings"}
+            if len(addresses) > MAX_BATCH_REQUEST:
+                return 413, {"error": f"at most {MAX_BATCH_REQUEST} addresses per request"}
+            results = await self.check([address.strip() for address in addresses])
+            return 200, {"results": results}
+        return 404, {"error": "not found"}
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, path, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    await self._respond(writer, 400, {"error": "bad request line"}, False)
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                try:
+                    length = int(headers.get("content-length", "0") or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    await self._respond(writer, 400, {"error": "bad Content-Length"}, False)
+                    break
+                if length > MAX_BODY_BYTES:
+                    await self._respond(writer, 413, {"error": "request body too large"}, False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                keep_alive = (version == "HTTP/1.1" and headers.get("connection", "").lower() != "close")
+                try:
+                    status, payload = await self._route(method, path.split("?")[0], body)
+                except Exception as e:
+                    status, payload = 500, {"error": str(e)}
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, writer, status, payload, keep_alive):
+        reasons = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+                   413: "Payload Too Large", 500: "Internal Server Error"}
+        body = json.dumps(payload).encode("utf-8")
+        writer.write(
+            f"HTTP/1.1 {status} {reasons.get(status, '')}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + body
+        )
+        await writer.drain()
+
+    async def serve(self, port=DEFAULT_PORT, socket_path=None):
+        self._queue = asyncio.Queue()
+        self._reload_lock = asyncio.Lock()
+        await self.reload()
+        cache_path = os.environ.get("CLIPSHIELD_VERDICT_CACHE")
+        if cache_path:
+            loaded = clip_monitor.load_verdict_cache(cache_path, self.book, self.history)
+            print(f"🗃️ Loaded {loaded} cached verdicts.")
+
+        if socket_path:
+            server = await asyncio.start_unix_server(self._handle_connection, path=socket_path)
+            print(f"🛡️ Detection service listening on {socket_path}")
+        else:
+            server = await asyncio.start_server(self._handle_connection, "127.0.0.1", port)
+            print(f"🛡️ Detection service listening on http://127.0.0.1:{port}")
+
+        loop = asyncio.get_running_loop()
+        if hasattr(signal, "SIGHUP"):
+            loop.add_signal_handler(signal.SIGHUP, lambda: asyncio.ensure_future(self._reload_logged()))
+
+        tasks = [asyncio.ensure_future(self._batcher()), asyncio.ensure_future(self._watch())]
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            for task in tasks:
+                task.cancel()
+            if cache_path:
+                clip_monitor.save_verdict_cache(cache_path, self.book)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m clip_monitor serve", description="Run the local detection service.")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="localhost port (default: %(default)s)")
+    parser.add_argument("--socket", help="listen on this Unix socket instead of a port")
+    parser.add_argument("--book", default=clip_monitor.DB_FILE,
+                        help="address book database, or a .json address file (default: %(default)s)")
+    parser.add_argument("--blocklist", help="blocklist file of known poisoning addresses "
+                        "(default: $CLIPSHIELD_BLOCKLIST)")
+    parser.add_argument("--parallel-scoring", action="store_true",
+                        help="run the Hamming pass of small batches against large books on one "
+                        "worker process per CPU")
+    args = parser.parse_args(argv)
+
+    if args.parallel_scoring:
+        clip_monitor.enable_parallel_scoring()
+    if args.blocklist:
+        clip_monitor.load_blocklist(args.blocklist)
+    else:
+        clip_monitor.configure_blocklist_from_env()
+
+    service = DetectionService(args.book)
+    try:
+        asyncio.run(service.serve(args.port, args.socket))
+    except KeyboardInterrupt:
+        print("\n🔹 Detection service stopped.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+import sys
+import time
+from collections import OrderedDict
+
+from address_index import AddressIndex
+from address_record import AddressRecord, make_record
+
+# Rough per-entry cost of the history dict and index buckets, in bytes
+ENTRY_OVERHEAD = 400
+
+
+class ClipboardHistory:
+    """Bounded history of copied addresses in insertion order.
+
+    Membership is a dict lookup. Entries are evicted oldest first once the
+    history holds more than `max_entries` addresses, uses more than
+    `max_bytes` (estimated) or an entry is older than `max_age` seconds.
+    A limit of None disables it. Evicted addresses are also removed from the
+    history's AddressIndex, and the number of evictions per limit is kept in
+    `evictions`.
+    """
+
+    def __init__(self, max_entries=None, max_age=None, max_bytes=None, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self.clock = clock
+        self.index = AddressIndex()
+        self.evictions = {"count": 0, "age": 0, "memory": 0}
+        self._entries = OrderedDict()  # record key -> (AddressRecord, added_at)
+        self._bytes = 0
+
+    def __len__(self):
+        self.expire()
+        return len(self._entries)
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def __iter__(self):
+        self.expire()
+        return iter([record.address for record, _ in self._entries.values()])
+
+    def __contains__(self, address):
+        self.expire()
+        return isinstance(address, str) and address.lower() in self._entries
+
+    @property
+    def size_bytes(self):
+        """Estimated memory used by the stored entries."""
+        return self._bytes
+
+    def add(self, address):
+        """Adds an address or AddressRecord, or moves it to the newest
+        position if present."""
+        record = address if isinstance(address, AddressRecord) else make_record(address)
+        key = record.key
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self._entries[key] = (self._entries[key][0], self.clock())
+        else:
+            self._entries[key] = (record, self.clock())
+            self._bytes += self._entry_size(record)
+            self.index.add(record)
+        self._evict()
+
+    def discard(self, address):
+        key = address.lower()
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= self._entry_size(entry[0])
+            self.index.remove(key)
+
+    def clear(self):
+        self._entries.clear()
+        self.index.clear()
+        self._bytes = 0
+
+    def expire(self):
+        """Evicts the entries older than max_age."""
+        if self.max_age is None or not self._entries:
+            return
+        cutoff = self.clock() - self.max_age
+        while self._entries:
+            key, (_, added_at) = next(iter(self._entries.items()))
+            if added_at > cutoff:
+                break
+            self._pop_oldest("age")
+
+    def _evict(self):
+        self.expire()
+        while self.max_entries is not None and len(self._entries) > self.max_entries:
+            self._pop_oldest("count")
+        while self.max_bytes is not None and self._bytes > self.max_bytes and self._entries:
+            self._pop_oldest("memory")
+
+    def _pop_oldest(self, reason):
+        key, (record, _) = self._entries.popitem(last=False)
+        self._bytes -= self._entry_size(record)
+        self.index.remove(key)
+        self.evictions[reason] += 1
+
+    @staticmethod
+    def _entry_size(record):
+        size = sys.getsizeof(record) + sys.getsizeof(record.key) + ENTRY_OVERHEAD
+        if record.address is not record.key:
+            size += sys.getsizeof(record.address)
+        if record.payload is not None:
+            size += sys.getsizeof(record.payload)
+        return size
@@ -2,9 +2,12 @@ import tkinter as tk
 from tkinter import messagebox
 import threading
 import pyperclip
-import time
-from clip_monitor import is_suspicious, monitor_clipboard, save_addresses, load_addresses
-from similarity import similarity_score, hamming_similarity
+from collections.abc import Mapping
+from clip_monitor import monitor_clipboard, load_addresses, add_trusted, remove_trusted
+from clip_monitor import configure_blocklist_from_env, configure_scan_mode_from_env, configure_verdict_cache_from_env
+from clipboard_sources import default_clipboard_source
+from address_book_view import AddressBookView, LogRing
+import metrics
 
 # Initialize trusted_addresses 
 trusted_addresses = load_addresses()
@@ -14,53 +17,67 @@ previous_address = None
 monitoring_active = False  # Flag to track monitoring state
 monitor_event = threading.Event()  # Event to control monitoring thread
 monitor_thread = None  # To store the reference to the monitoring thread
+clipboard_source = None  # Clipboard backend used by the monitoring thread
+address_book_view = None  # Open address book window, if any
+log_ring = None  # Keeps the log Text widget to its last LOG_MAX_LINES lines
 
-# Detection and Monitoring Logic
-def initial_check_similarity(suspicious_address, trusted_addresses, threshold=30):
-    for trusted, label in trusted_addresses.items():
-        sim_score = similarity_score(suspicious_address, trusted)
-        hamming_sim = hamming_similarity(suspicious_address, trusted)
-        
-        # Combine or evaluate these scores (e.g., taking the max or an average)
-        combined_similarity = (sim_score + hamming_sim) / 2  # Example combination
-        
-        print(f"[Initial Check] Similarity with {trusted} ({label}): {combined_similarity}")
-        if combined_similarity >= threshold:
-            return True  # Address is suspiciously similar
-    return False  # Safe
+# Lines kept in the log widget
+LOG_MAX_LINES = 500
+
+# Suspicious addresses listed in the warning for one scanned clipboard
+ALERTS_SHOWN = 10
 
+# Detection and Monitoring Logic
 def monitor_clipboard_thread():
     """Run the clipboard monitoring logic in a separate thread."""
-    def callback(message, is_warning=False, suspicious_address=None, original_address=None):
+    def callback(message, is_warning=False, suspicious_address=None, original_address=None, verdict=None,
+                 alerts=None):
         """Callback function to update the GUI."""
         global previous_address
 
-        if not monitoring_active:
+        called_at = metrics.now()
+        if not monitoring_active or not (is_warning and suspicious_address):
             return
 
-        if is_warning and suspicious_address:
-            suspicious_address_lower = suspicious_address.lower()
+        alerts = alerts or [(suspicious_address, verdict)]
+        alerted = " ".join(address.lower() for address, _ in alerts)
 
-        # Skip duplicate warnings for same address
-        if suspicious_address_lower == previous_address:
-            print(f"Skipping duplicate warning for: {suspicious_address_lower}")
+        # Skip duplicate warnings for the same addresses
+        if alerted == previous_address:
+            print(f"Skipping duplicate warning for: {alerted}")
             return
 
-        previous_address = suspicious_address_lower  # Update it early to avoid re-alerting
-
-        if is_suspicious(suspicious_address_lower):
-            if initial_check_similarity(suspicious_address_lower, trusted_addresses, threshold=30):
-                message = f"⚠️ Warning: {suspicious_address} is similar to an address in your address book."
-            else:
-                message = f"⚠️ Warning: Address: {suspicious_address} is similar to a previously copied address"
+        previous_address = alerted  # Update it early to avoid re-alerting
 
-            root.after(0, show_warning, message)
-            root.after(0, update_gui, message)
-    while True: 
-        if monitor_event.is_set():  # Only monitor if the event is set
-            monitor_clipboard(callback) 
+        if len(alerts) == 1:
+            message = warning_message(suspicious_address, verdict)
         else:
-            time.sleep(1)  # Prevent CPU overloading when not monitoring
+            # A scanned clipboard gets one warning for all its suspicious addresses
+            message = f"⚠️ Warning: {len(alerts)} suspicious addresses in the copied text.\n\n"
+            message += "\n\n".join(warning_message(address, alert_verdict)
+                                   for address, alert_verdict in alerts[:ALERTS_SHOWN])
+            if len(alerts) > ALERTS_SHOWN:
+                message += f"\n\n...and {len(alerts) - ALERTS_SHOWN} more."
+
+        root.after(0, show_warning, message)
+        root.after(0, update_gui, message, called_at)
+    while True: 
+        monitor_event.wait()  # Blocks without waking up while monitoring is paused
+        monitor_clipboard(callback, source=clipboard_source, active_event=monitor_event)
+
+def warning_message(suspicious_address, verdict):
+    """Warning text for one suspicious address."""
+    # The verdict already names the match, so nothing is scored again here
+    if verdict is not None and verdict.source == "book":
+        matched = f"{verdict.matched_address} ({verdict.label})" if verdict.label else verdict.matched_address
+        message = f"⚠️ Warning: {suspicious_address} is similar to {matched} in your address book."
+    elif verdict is not None and verdict.source == "blocklist":
+        message = f"⚠️ Warning: {suspicious_address} is a known address poisoning address."
+    else:
+        message = f"⚠️ Warning: Address: {suspicious_address} is similar to a previously copied address"
+    if verdict is not None:
+        message += f"\n{verdict.evidence()}"
+    return message
 
 def toggle_monitoring():
     global monitoring_active
@@ -70,12 +87,15 @@ def toggle_monitoring():
         pause_monitoring()
 
 def start_monitoring():
-    global monitoring_active, monitor_thread
+    global monitoring_active, monitor_thread, clipboard_source
     if not monitoring_active:
         print("Starting clipboard monitoring.")
         monitoring_active = True
         monitor_event.set()
 
+        if clipboard_source is None:
+            clipboard_source = default_clipboard_source()
+
         # Start the monitoring thread if it isn't already running
         if monitor_thread is None or not monitor_thread.is_alive():
             monitor_thread = threading.Thread(target=monitor_clipboard_thread, daemon=True)
@@ -92,6 +112,8 @@ def pause_monitoring():
         print("Pausing clipboard monitoring.")
         monitoring_active = False
         monitor_event.clear()  # Stop the monitoring thread
+        if clipboard_source is not None:
+            clipboard_source.wake()  # Interrupt a wait for the next clipboard change
         monitor_button.config(text="Resume Monitoring")  # Change button text to 'Resume Monitoring'
     else:
         print("Monitoring is already paused.")
@@ -109,14 +131,11 @@ def resume_monitoring():
 
 # Address Book Management
 def add_trusted_address():
-    global trusted_addresses
-    address = trusted_address_entry.get().strip().lower()
+    address = trusted_address_entry.get().strip()
     label = label_entry.get().strip()
     if address:
-        trusted_addresses[address] = label
-        save_addresses(trusted_addresses)
-        # Reload addresses to update the current session's view
-        trusted_addresses = load_addresses()
+        add_trusted(address, label)  # Updates the shared book and saves just this address
+        refresh_address_book_view()
         trusted_address_entry.delete(0, tk.END)
         label_entry.delete(0, tk.END)
 
@@ -126,13 +145,10 @@ def add_trusted_address():
         root.after(0, lambda: messagebox.showwarning("Input Error", "Please enter a valid address."))
 
 def remove_trusted_address():
-    global trusted_addresses
-    address = trusted_address_entry.get().strip().lower()
+    address = trusted_address_entry.get().strip()
     if address in trusted_addresses:
-        del trusted_addresses[address]
-        save_addresses(trusted_addresses)
-        # Reload addresses to update the current session's view
-        trusted_addresses = load_addresses()
+        remove_trusted(address)  # Updates the shared book and deletes just this address
+        refresh_address_book_view()
         trusted_address_entry.delete(0, tk.END)
 
         root.after(0, lambda: messagebox.showinfo("Success", "Address removed from address book."))
@@ -140,18 +156,29 @@ def remove_trusted_address():
         root.after(0, lambda: messagebox.showwarning("Not Found", "Address not found in trusted list."))
 
 def show_trusted_addresses():
-    """Displays the trusted addresses in a labeled list."""
-    if trusted_addresses:
-        # Ensure trusted_addresses is a dictionary
-        if isinstance(trusted_addresses, dict):
-            numbered_addresses = [
-                f"{index + 1}. {address} - {label}" for index, (address, label) in enumerate(trusted_addresses.items())
-            ]
-            messagebox.showinfo("Trusted Addresses", "\n".join(numbered_addresses))
-        else:
-            messagebox.showerror("Error", "Trusted addresses data is corrupted.")
-    else:
+    """Opens (or raises) the searchable address book window."""
+    global address_book_view
+    if not isinstance(trusted_addresses, Mapping):
+        messagebox.showerror("Error", "Trusted addresses data is corrupted.")
+        return
+    if not trusted_addresses:
         messagebox.showinfo("No Trusted Addresses", "You have no addresses in address book.")
+        return
+    if address_book_view is not None and address_book_view.winfo_exists():
+        refresh_address_book_view()
+        address_book_view.lift()
+        return
+    address_book_view = AddressBookView(root, trusted_addresses, on_select=select_trusted_address)
+
+def refresh_address_book_view():
+    """Shows address book changes in the address book window if it is open."""
+    if address_book_view is not None and address_book_view.winfo_exists():
+        address_book_view.refresh()
+
+def select_trusted_address(address):
+    """Puts an address picked in the address book window into the entry."""
+    trusted_address_entry.delete(0, tk.END)
+    trusted_address_entry.insert(0, address)
 
 # Clipboard and GUI Helpers
 def clear_clipboard():
@@ -161,10 +188,10 @@ def clear_clipboard():
     previous_address = None  
     messagebox.showinfo("Info", "Clipboard cleared.")
 
-def update_gui(message):
+def update_gui(message, called_at=None):
     """Update the Text widget with new messages."""
-    text_widget.insert(tk.END, message + '\n')
-    text_widget.yview(tk.END)  
+    metrics.observe_since("gui_dispatch_seconds", called_at)
+    log_ring.append(message)
 
 def show_warning(warning):
     """Show a warning message in the GUI."""
@@ -175,8 +202,20 @@ def main():
     try:
         global root, trusted_address_label, trusted_address_entry, label_entry
         global add_trusted_button, remove_trusted_button, view_trusted_button, clear_button
-        global monitor_button, text_widget
+        global monitor_button, text_widget, log_ring
     
+        # Start exporting metrics if CLIPSHIELD_METRICS_PORT/FILE is set
+        metrics.configure_from_env()
+
+        # Reuse verdicts from the last run if CLIPSHIELD_VERDICT_CACHE is set
+        configure_verdict_cache_from_env()
+
+        # Flag known poisoning addresses if CLIPSHIELD_BLOCKLIST is set
+        configure_blocklist_from_env()
+
+        # Check addresses inside copied text if CLIPSHIELD_SCAN_MODE=1
+        configure_scan_mode_from_env()
+
         root = tk.Tk()
         root.title("ClipShield")
 
@@ -241,6 +280,7 @@ def main():
 
         text_widget = tk.Text(log_frame, height=15, width=50, font=("Arial", 12))
         text_widget.pack(pady=5)
+        log_ring = LogRing(text_widget, LOG_MAX_LINES)
 
         # Delay start_monitoring to ensure GUI is ready
         root.after(1000, start_monitoring)  # Delay by 1 second
@@ -0,0 +1,195 @@
+"""Latency histograms and counters for the monitor loop.
+
+Metrics are off by default and cost one flag check per call site while off.
+Turn them on with enable(), or at startup with the CLIPSHIELD_METRICS_PORT
+(serve on 127.0.0.1:PORT/metrics) and CLIPSHIELD_METRICS_FILE (rewrite a
+Prometheus text file every few seconds) environment variables.
+
+Hot paths use the pattern
+
+    started = metrics.now()
+    ...
+    metrics.observe_since("scoring_seconds", started)
+
+where now() returns None while metrics are disabled.
+"""
+import os
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+enabled = False
+
+# Bucket upper bounds in seconds, 1 µs to 10 s
+LATENCY_BUCKETS = tuple(m * 10.0 ** e for e in range(-6, 1) for m in (1, 2.5, 5)) + (10.0,)
+# Bucket upper bounds for candidate counts
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 10000, 100000)
+
+TEXTFILE_INTERVAL = 5.0  # seconds
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        with self._lock:
+            self.counts[bisect_left(self.buckets, value)] += 1
+            self.sum += value
+            self.count += 1
+
+    def render(self):
+        with self._lock:
+            counts, total, count = list(self.counts), self.sum, self.count
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            lines.append(f'{self.name}_bucket{{le="{bound:g}"}} {cumulative}')
+        lines.append(f'{self.name}_bucket{{le="+Inf"}} {count}')
+        lines.append(f"{self.name}_sum {total:.9g}")
+        lines.append(f"{self.name}_count {count}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def render(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter", f"{self.name} {self.value}"]
+
+
+registry = {}
+
+
+def _register(metric):
+    registry[metric.name] = metric
+    return metric
+
+
+_register(Histogram("clipshield_clipboard_read_seconds", "Time to read the clipboard."))
+_register(Histogram("clipshield_validation_seconds", "Time to validate a new clipboard value."))
+_register(Histogram("clipshield_scoring_seconds", "Time to score an address against the book and history."))
+_register(Histogram("clipshield_candidates_scored", "Candidates compared by edit distance per book or history lookup.", COUNT_BUCKETS))
+_register(Histogram("clipshield_callback_seconds", "Time from reading a clipboard change to invoking the callback."))
+_register(Histogram("clipshield_gui_dispatch_seconds", "Time from the callback to the GUI handling the alert."))
+_register(Counter("clipshield_alerts_total", "Suspicious addresses detected."))
+_register(Counter("clipshield_clipboard_errors_total", "Failed clipboard reads."))
+_register(Counter("clipshield_verdict_cache_hits_total", "Verdicts answered from the verdict cache."))
+_register(Counter("clipshield_verdict_cache_misses_total", "Verdicts computed because the cache had none."))
+
+
+def enable():
+    global enabled
+    enabled = True
+
+
+def disable():
+    global enabled
+    enabled = False
+
+
+def now():
+    """Returns a start time for observe_since, or None while disabled."""
+    return time.perf_counter() if enabled else None
+
+
+def observe_since(name, started):
+    """Records the time elapsed since `started` (a value from now())."""
+    if started is not None and enabled:
+        registry["clipshield_" + name].observe(time.perf_counter() - started)
+
+
+def observe(name, value):
+    if enabled:
+        registry["clipshield_" + name].observe(value)
+
+
+def inc(name, amount=1):
+    if enabled:
+        registry["clipshield_" + name].inc(amount)
+
+
+def render():
+    """Returns every metric in the Prometheus text exposition format."""
+    lines = []
+    for metric in registry.values():
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def write_textfile(path):
+    """Writes the metrics to `path` atomically."""
+    temporary = f"{path}.tmp"
+    with open(temporary, "w") as f:
+        f.write(render())
+    os.replace(temporary, path)
+
+
+def start_textfile_writer(path, interval=TEXTFILE_INTERVAL):
+    """Rewrites the metrics file every `interval` seconds in a daemon thread."""
+    def loop():
+        while True:
+            time.sleep(interval)
+            if enabled:
+                try:
+                    write_textfile(path)
+                except OSError as e:
+                    print(f"❌ Could not write metrics to {path}: {e}")
+
+    thread = threading.Thread(target=loop, daemon=True)
+    thread.start()
+    return thread
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != "/metrics":
+            self.send_error(404)
+            return
+        body = render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port, host="127.0.0.1"):
+    """Serves the metrics on http://host:port/metrics in a daemon thread."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def configure_from_env():
+    """Enables metrics and starts the exporters named by the environment."""
+    port = os.environ.get("CLIPSHIELD_METRICS_PORT")
+    path = os.environ.get("CLIPSHIELD_METRICS_FILE")
+    if not port and not path:
+        return
+    enable()
+    if port:
+        serve(int(port))
+        print(f"📈 Metrics served on http://127.0.0.1:{port}/metrics")
+    if path:
+        start_textfile_writer(path)
+        print(f"📈 Metrics written to {path}")
@@ -0,0 +1,191 @@
+"""Parallel scoring of very large address books.
+
+A ScoringPool copies the nibble matrix of a PackedAddressBook once into
+shared memory and gives every worker process a contiguous shard of its rows.
+For each copied address the parent writes the 40 query nibbles into a small
+shared control block and wakes the workers with a one-byte message; each
+worker scores its shard with the same vectorized pass as score_many and
+writes only its best row and Hamming score back into the control block.
+Nothing is pickled per request.
+
+The pool holds one published book. It is republished (copied again) when
+the book changes, and books smaller than PARALLEL_MIN_ROWS are scored in the
+calling process, where dispatching to the workers would cost more than it
+saves.
+
+Only this Hamming pass runs on the workers, for check_address and for
+check_addresses batches too small for a first_matches block join. The
+Levenshtein stage, which verifies the few candidates a QGramIndex returns,
+and the block join of larger batches stay in the calling process.
+"""
+import atexit
+import multiprocessing
+import os
+import threading
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from batch_scoring import ADDRESS_WIDTH, PAYLOAD_WIDTH, pack_payload
+
+# Books with fewer rows are scored serially
+PARALLEL_MIN_ROWS = 50000
+
+# Control block layout: query nibbles, then one (row, score) pair per worker
+_RESULTS_OFFSET = 64
+
+_COMMAND_BOOK = b"b"
+_COMMAND_SCORE = b"s"
+_COMMAND_STOP = b"x"
+
+
+def default_workers():
+    """Returns the number of worker processes for this machine."""
+    return os.cpu_count() or 1
+
+
+def _best_row(matrix, query):
+    """Returns (row, hamming) of the most similar row that is not the query
+    itself, or (-1, 0.0) when there is none."""
+    if not len(matrix):
+        return -1, 0.0
+    matches = (matrix == query).sum(axis=1)
+    matches[matches == PAYLOAD_WIDTH] = -1
+    row = int(matches.argmax())
+    if matches[row] < 0:
+        return -1, 0.0
+    return row, (int(matches[row]) + 2) * 100 / ADDRESS_WIDTH
+
+
+def _worker(connection, control_name, slot):
+    control = shared_memory.SharedMemory(name=control_name)
+    query = np.ndarray(PAYLOAD_WIDTH, dtype=np.uint8, buffer=control.buf)
+    results = np.ndarray((slot + 1, 2), dtype=np.float64, buffer=control.buf, offset=_RESULTS_OFFSET)
+    book, shard, start = None, None, 0
+    try:
+        while True:
+            message = connection.recv_bytes()
+            command = message[:1]
+            if command == _COMMAND_SCORE:
+                row, score = _best_row(shard, query)
+                results[slot] = (start + row if row >= 0 else -1, score)
+                connection.send_bytes(_COMMAND_SCORE)
+            elif command == _COMMAND_BOOK:
+                shard = None
+                if book is not None:
+                    book.close()
+                name, rows, start, stop = message[1:].decode("ascii").split(",")
+                start, stop = int(start), int(stop)
+                book = shared_memory.SharedMemory(name=name)
+                matrix = np.ndarray((int(rows), PAYLOAD_WIDTH), dtype=np.uint8, buffer=book.buf)
+                shard = matrix[start:stop]
+                connection.send_bytes(_COMMAND_BOOK)
+            else:
+                break
+    finally:
+        shard = query = results = None
+        if book is not None:
+            book.close()
+        control.close()
+
+
+class ScoringPool:
+    """Persistent worker processes scoring shards of a shared nibble matrix.
+
+    `workers` defaults to the CPU count. With a single worker every book is
+    scored serially and no process is started.
+    """
+
+    def __init__(self, workers=None, min_rows=PARALLEL_MIN_ROWS):
+        self.workers = workers or default_workers()
+        self.min_rows = min_rows
+        self._lock = threading.Lock()
+        self._processes = []
+        self._connections = []
+        self._control = None
+        self._shared_book = None
+        self._book = None
+        self._book_version = None
+        self._records = []
+
+    def _start(self):
+        context = multiprocessing.get_context("spawn")
+        self._control = shared_memory.SharedMemory(create=True, size=_RESULTS_OFFSET + 16 * self.workers)
+        for slot in range(self.workers):
+            parent, child = context.Pipe()
+            process = context.Process(target=_worker, args=(child, self._control.name, slot),
+                                      name=f"clipshield-score-{slot}", daemon=True)
+            process.start()
+            child.close()
+            self._processes.append(process)
+            self._connections.append(parent)
+        atexit.register(self.close)
+
+    def _publish(self, packed):
+        """Copies the rows of `packed` into a new shared block and hands
+        every worker its shard."""
+        matrix = packed.matrix
+        shared = shared_memory.SharedMemory(create=True, size=max(matrix.nbytes, 1))
+        np.ndarray(matrix.shape, dtype=np.uint8, buffer=shared.buf)[:] = matrix
+
+        rows = len(matrix)
+        bounds = np.linspace(0, rows, self.workers + 1).astype(int)
+        for connection, start, stop in zip(self._connections, bounds, bounds[1:]):
+            connection.send_bytes(_COMMAND_BOOK + f"{shared.name},{rows},{start},{stop}".encode("ascii"))
+        for connection in self._connections:
+            connection.recv_bytes()
+
+        self._release_book()
+        self._shared_book = shared
+        self._book, self._book_version = packed, packed.version
+        self._records = list(packed.records)
+
+    def _release_book(self):
+        if self._shared_book is not None:
+            self._shared_book.close()
+            self._shared_book.unlink()
+            self._shared_book = None
+
+    def best_match(self, record, packed):
+        """Returns (record, hamming) of the row of `packed` most similar to
+        `record` (an AddressRecord with a 20-byte payload), or (None, 0.0)."""
+        if self.workers < 2 or len(packed) < self.min_rows:
+            row, score = _best_row(packed.matrix, pack_payload(record.payload))
+            return (packed.records[row], score) if row >= 0 else (None, 0.0)
+
+        with self._lock:
+            if not self._processes:
+                self._start()
+            if self._book is not packed or self._book_version != packed.version:
+                self._publish(packed)
+
+            np.ndarray(PAYLOAD_WIDTH, dtype=np.uint8, buffer=self._control.buf)[:] = pack_payload(record.payload)
+            for connection in self._connections:
+                connection.send_bytes(_COMMAND_SCORE)
+            for connection in self._connections:
+                connection.recv_bytes()
+
+            results = np.ndarray((self.workers, 2), dtype=np.float64, buffer=self._control.buf,
+                                 offset=_RESULTS_OFFSET)
+            best = int(results[:, 1].argmax())
+            row, score = int(results[best, 0]), float(results[best, 1])
+            return (self._records[row], score) if row >= 0 else (None, 0.0)
+
+    def close(self):
+        """Stops the workers and frees the shared memory."""
+        with self._lock:
+            for connection in self._connections:
+                try:
+                    connection.send_bytes(_COMMAND_STOP)
+                except OSError:
+                    pass
+                connection.close()
+            for process in self._processes:
+                process.join(timeout=5)
+            self._processes, self._connections = [], []
+            self._release_book()
+            if self._control is not None:
+                self._control.close()
+                self._control.unlink()
+                self._control = None
+            self._book, self._records = None, []
@@ -0,0 +1,224 @@
+"""q-gram inverted index for edit distance range queries.
+
+Two strings within edit distance k share at least max(len) - Q + 1 - k * Q
+of their Q-grams, counted with multiplicity, since each edit destroys at
+most Q of the grams of the longer string. A range query looks up the grams
+of the query in an inverted index, counts how many grams every indexed key
+shares with it, and only computes the edit distance for the keys whose count
+and length can still be within the threshold. For 42-character addresses at
+the 70% threshold that leaves a handful of keys out of a book of any size.
+
+The postings are kept in sorted numpy arrays, built in one vectorized pass
+over all keys. Keys added since the last build get their postings in a small
+dict and removed keys are only flagged dead; the arrays are rebuilt lazily
+on the next search once enough keys have changed. prepare() builds them
+ahead of the first search, e.g. on a loader thread right after a bulk load.
+"""
+import threading
+from functools import lru_cache
+
+import numpy as np
+
+from similarity import max_distance_for, similarity_score
+
+Q = 3
+
+# The postings are rebuilt once more keys than this, and more than a
+# quarter of the keys, were added or removed since the last build
+REBUILD_MIN_CHANGES = 256
+
+# A gram code holds the Q bytes of the gram, with the occurrence number of
+# the gram in its key above them
+_OCCURRENCE_SHIFT = 8 * Q
+_NO_GRAM = np.iinfo(np.int64).max
+
+
+def gram_codes(keys):
+    """Returns (rows, codes) for the Q-grams of `keys`: the code of every
+    gram and the position of its key in `keys`. The second "abc" of a key
+    gets a different code from the first, so equal codes count shared grams
+    with multiplicity."""
+    width = max(map(len, keys), default=0)
+    if width < Q:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    text = "".join(key.ljust(width, "\0") for key in keys).encode("ascii", "replace")
+    chars = np.frombuffer(text, dtype=np.uint8).reshape(len(keys), width).astype(np.int64)
+
+    grams = width - Q + 1
+    codes = np.zeros((len(keys), grams), dtype=np.int64)
+    for offset in range(Q):
+        codes |= chars[:, offset:offset + grams] << (8 * (Q - 1 - offset))
+    lengths = np.fromiter(map(len, keys), dtype=np.int32, count=len(keys))
+    codes[np.arange(grams) > (lengths - Q)[:, None]] = _NO_GRAM
+
+    # Sorted, repeated grams of a key are adjacent; number them within each run
+    codes.sort(axis=1)
+    positions = np.broadcast_to(np.arange(grams), codes.shape)
+    starts = np.ones(codes.shape, dtype=bool)
+    starts[:, 1:] = codes[:, 1:] != codes[:, :-1]
+    occurrence = positions - np.maximum.accumulate(np.where(starts, positions, 0), axis=1)
+    present = codes != _NO_GRAM
+    rows = np.broadcast_to(np.arange(len(keys))[:, None], codes.shape)[present]
+    return rows, (codes | occurrence << _OCCURRENCE_SHIFT)[present]
+
+
+def key_codes(key):
+    """Returns the gram codes of one key, as gram_codes does for many."""
+    text = key.encode("ascii", "replace")
+    counts = {}
+    codes = []
+    for start in range(len(text) - Q + 1):
+        code = int.from_bytes(text[start:start + Q], "big")
+        occurrence = counts.get(code, 0)
+        counts[code] = occurrence + 1
+        codes.append(code | occurrence << _OCCURRENCE_SHIFT)
+    return codes
+
+
+@lru_cache(maxsize=256)
+def _distance_limits(threshold, longest):
+    """Returns max_distance_for(length, threshold) for every length up to
+    `longest`, indexed by length."""
+    return np.array([-1] + [max_distance_for(length, threshold) for length in range(1, longest + 1)])
+
+
+class QGramIndex:
+    """AddressRecords indexed by the Q-grams of their key.
+
+    `search(key, threshold)` returns the records whose similarity_score to
+    `key` exceeds `threshold`, the same records as scoring every indexed
+    record, in the order they were added.
+    """
+
+    def __init__(self):
+        self._records = []  # row -> record, None once removed
+        self._rows = {}  # key -> row
+        self._lengths = np.zeros(64, dtype=np.int32)
+        self._live = np.zeros(64, dtype=bool)
+        self._longest = 0
+        # Sorted gram codes, and the rows holding codes[i] in postings[offsets[i]:offsets[i + 1]]
+        self._codes = np.zeros(0, dtype=np.int64)
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._postings = np.zeros(0, dtype=np.int32)
+        self._pending = {}  # code -> rows added since the last build
+        self._changes = 0
+        self._stale = False
+        # Held while the index changes or is searched, so prepare() can run
+        # on another thread
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._rows)
+
+    def _append(self, record):
+        if record.key in self._rows:
+            self.remove(record.key)
+        row = len(self._records)
+        if row == len(self._lengths):
+            self._lengths = np.concatenate([self._lengths, np.zeros(row, dtype=np.int32)])
+            self._live = np.concatenate([self._live, np.zeros(row, dtype=bool)])
+        self._records.append(record)
+        self._rows[record.key] = row
+        self._lengths[row] = len(record.key)
+        self._longest = max(self._longest, len(record.key))
+        self._live[row] = True
+        self._changes += 1
+        return row
+
+    def add(self, record):
+        with self._lock:
+            row = self._append(record)
+            if not self._stale:
+                for code in key_codes(record.key):
+                    self._pending.setdefault(code, []).append(row)
+
+    def extend(self, records):
+        """Adds many records. Their postings are built by prepare() or on
+        the next search."""
+        with self._lock:
+            for record in records:
+                self._append(record)
+            self._stale = True
+
+    def remove(self, key):
+        with self._lock:
+            row = self._rows.pop(key, None)
+            if row is not None:
+                self._records[row] = None
+                self._live[row] = False
+                self._changes += 1
+
+    def prepare(self):
+        """Builds the postings now if the next search would build them."""
+        with self._lock:
+            if self._stale or self._changes > max(REBUILD_MIN_CHANGES, len(self._rows) // 4):
+                self._build()
+
+    def _build(self):
+        self._records = [record for record in self._records if record is not None]
+        self._rows = {record.key: row for row, record in enumerate(self._records)}
+        keys = [record.key for record in self._records]
+        capacity = max(len(keys), 64)
+        self._lengths = np.zeros(capacity, dtype=np.int32)
+        self._lengths[:len(keys)] = np.fromiter(map(len, keys), dtype=np.int32, count=len(keys))
+        self._live = np.zeros(capacity, dtype=bool)
+        self._live[:len(keys)] = True
+        self._longest = max(map(len, keys), default=0)
+
+        rows, codes = gram_codes(keys)
+        order = np.argsort(codes, kind="stable")
+        codes = codes[order]
+        starts = np.flatnonzero(np.concatenate([[True], codes[1:] != codes[:-1]]))
+        self._codes = codes[starts]
+        self._offsets = np.append(starts, len(codes))
+        self._postings = rows[order].astype(np.int32)
+        self._pending = {}
+        self._changes = 0
+        self._stale = False
+
+    def candidates(self, key, threshold):
+        """Returns the records that can have a similarity_score above
+        `threshold` with `key` by their length and shared grams, other than
+        the record of `key` itself."""
+        with self._lock:
+            self.prepare()
+            return self._candidates(key, threshold)
+
+    def _candidates(self, key, threshold):
+        count = len(self._records)
+        if not count:
+            return []
+
+        codes = key_codes(key)
+        query = np.array(codes, dtype=np.int64)
+        positions = np.searchsorted(self._codes, query)
+        hit = positions < len(self._codes)
+        hit[hit] = self._codes[positions[hit]] == query[hit]
+        positions = positions[hit]
+        parts = [self._postings[start:stop] for start, stop in
+                 zip(self._offsets[positions].tolist(), self._offsets[positions + 1].tolist())]
+        if self._pending:
+            parts.extend(np.array(rows) for rows in map(self._pending.get, codes) if rows)
+
+        # Filter on the lowest count any key length allows, then on the
+        # count and length limits of each remaining key
+        limits = _distance_limits(threshold, max(self._longest, len(key)))
+        lengths = np.arange(len(key), len(limits))
+        lowest = int((lengths - Q + 1 - Q * limits[len(key):]).min())
+        shared = np.bincount(np.concatenate(parts), minlength=count) if parts else np.zeros(count, dtype=np.int64)
+        rows = np.flatnonzero(shared >= lowest) if lowest > 0 else np.arange(count)
+        shared = shared[rows]
+        lengths = self._lengths[rows]
+        longest = np.maximum(lengths, len(key))
+        max_distance = limits[longest]
+        possible = (self._live[rows]
+                    & (shared >= longest - Q + 1 - Q * max_distance)
+                    & (np.abs(lengths - len(key)) <= max_distance))
+        records = self._records
+        return [records[row] for row in rows[possible].tolist() if records[row].key != key]
+
+    def search(self, key, threshold):
+        """Returns the records whose similarity_score to `key` is above
+        `threshold`, other than the record of `key` itself."""
+        return [record for record in self.candidates(key, threshold)
+                if similarity_score(key, record.key, threshold) > threshold]
@@ -0,0 +1,177 @@
+"""Headless bulk screening of addresses.
+
+    python -m clip_monitor screen [--book FILE] [--input FILE] [--output FILE]
+
+Reads one address per line (or JSON objects, one per line) from a file or
+stdin and writes one JSON verdict per input line. The clipboard is never
+read or written. With CLIPSHIELD_BLOCKLIST set, addresses on that blocklist
+are flagged too.
+"""
+import argparse
+import contextlib
+import json
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import book_snapshot
+import clip_monitor
+from address_index import IndexedAddressBook
+
+# Addresses sent to a worker in one task
+BATCH_SIZE = 256
+
+# Batches in flight per worker; bounds memory on unbounded inputs
+BATCHES_PER_WORKER = 4
+
+
+def parse_line(line, input_format="auto", field="address"):
+    """Returns the address in one input line, or None for blank lines."""
+    line = line.strip()
+    if not line:
+        return None
+    if input_format == "jsonl" or (input_format == "auto" and line.startswith("{")):
+        record = json.loads(line)
+        address = record.get(field) if isinstance(record, dict) else None
+        if not isinstance(address, str):
+            raise ValueError(f"missing string field '{field}'")
+        return address.strip()
+    return line
+
+
+def screen_address(address):
+    """Returns the verdict for one address against the loaded address book."""
+    if not clip_monitor.is_valid_address(address):
+        return {"address": address, "valid": False, "suspicious": False}
+    return {**clip_monitor.check_address(address).to_dict(), "address": address, "valid": True}
+
+
+def _read_batches(lines, input_format, field):
+    batch = []
+    for line_number, line in enumerate(lines, 1):
+        try:
+            address = parse_line(line, input_format, field)
+        except ValueError as e:
+            batch.append((line_number, None, str(e)))
+        else:
+            if address is None:
+                continue
+            batch.append((line_number, address, None))
+        if len(batch) == BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _book_for_workers():
+    """Returns what a worker needs to rebuild the book the parent loaded:
+    (snapshot path, token, None) when the snapshot next to the book is
+    current, else (None, None, entries). Workers never open the store, so
+    they cannot migrate it or write a snapshot."""
+    if clip_monitor.snapshot_writer is not None:
+        clip_monitor.snapshot_writer.join()
+    if clip_monitor.loaded_snapshot is not None:
+        snapshot, token = clip_monitor.loaded_snapshot
+        if book_snapshot.is_current(snapshot, token):
+            return snapshot, token, None
+    return None, None, clip_monitor.trusted_addresses.to_dict()
+
+
+@contextlib.contextmanager
+def _quiet():
+    """Drops what the worker prints; detection messages would end up
+    between the JSON lines on stdout."""
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+def _init_worker(snapshot, token, entries):
+    with _quiet():
+        book = book_snapshot.read_snapshot(snapshot, token) if snapshot else None
+        if book is None:
+            if entries is None:
+                raise RuntimeError(f"address book snapshot {snapshot} changed while screening")
+            book = IndexedAddressBook(entries)
+        book.index.prepare()
+        clip_monitor.trusted_addresses = book
+        clip_monitor.configure_blocklist_from_env()
+
+
+def _screen_batch_quietly(batch):
+    with _quiet():
+        return _screen_batch(batch)
+
+
+def _screen_batch(batch):
+    results = []
+    for line_number, address, error in batch:
+        if error is not None:
+            result = {"error": error}
+        else:
+            result = screen_address(address)
+        result["line"] = line_number
+        results.append(result)
+    return results
+
+
+def screen(lines, output, book_path=None, workers=None, input_format="auto", field="address"):
+    """Screens every address in `lines` and writes JSONL verdicts to `output`,
+    in input order. Returns the number of suspicious addresses."""
+    batches = _read_batches(lines, input_format, field)
+    suspicious = 0
+
+    def write(results):
+        nonlocal suspicious
+        for result in results:
+            suspicious += bool(result.get("suspicious"))
+            output.write(json.dumps(result) + "\n")
+
+    with contextlib.redirect_stdout(sys.stderr):
+        # The book is loaded (and a legacy JSON file migrated) only here;
+        # the workers get it from the snapshot or from the parent
+        clip_monitor.load_addresses(book_path)
+        clip_monitor.configure_blocklist_from_env()
+
+    if workers == 1:
+        with contextlib.redirect_stdout(sys.stderr):
+            for batch in batches:
+                write(_screen_batch(batch))
+        return suspicious
+
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=_book_for_workers()) as pool:
+        pending = deque()
+        for batch in batches:
+            pending.append(pool.submit(_screen_batch_quietly, batch))
+            if len(pending) >= workers * BATCHES_PER_WORKER:
+                write(pending.popleft().result())
+        while pending:
+            write(pending.popleft().result())
+    return suspicious
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m clip_monitor screen", description="Screen addresses in bulk.")
+    parser.add_argument("--book", default=clip_monitor.DB_FILE,
+                        help="address book database, or a .json address file (default: %(default)s)")
+    parser.add_argument("--input", default="-", help="input file, '-' for stdin (default)")
+    parser.add_argument("--output", default="-", help="output file, '-' for stdout (default)")
+    parser.add_argument("--format", dest="input_format", choices=["auto", "lines", "jsonl"], default="auto",
+                        help="input format (default: auto)")
+    parser.add_argument("--field", default="address", help="address field of JSONL input (default: address)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    args = parser.parse_args(argv)
+
+    with contextlib.ExitStack() as stack:
+        lines = sys.stdin if args.input == "-" else stack.enter_context(open(args.input, "r"))
+        output = sys.stdout if args.output == "-" else stack.enter_context(open(args.output, "w"))
+        suspicious = screen(lines, output, args.book, args.workers, args.input_format, args.field)
+
+    print(f"🔎 Screening finished: {suspicious} suspicious address(es).", file=sys.stderr)
+    return 1 if suspicious else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
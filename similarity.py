@@ -0,0 +1,128 @@
+"""Address similarity scores.
+
+Scores are on a 0-100 scale. The edit distance is computed with the
+bit-parallel algorithm of Myers, in the formulation of Hyyrö, which keeps a
+whole column of the DP matrix in one integer. For 40-64 character addresses
+that is one machine word per column. When python-Levenshtein is installed
+its C implementation of the same algorithm is used instead.
+"""
+import math
+
+try:
+    import Levenshtein
+except ImportError:
+    Levenshtein = None
+
+# Similarity above which an address of 40 or more characters is a lookalike
+BASE_THRESHOLD = 70.0
+MAX_THRESHOLD = 90.0
+
+
+def calculate_dynamic_threshold(address):
+    """Returns the similarity above which another address counts as a lookalike.
+
+    Shorter addresses have fewer characters that can differ, so each point
+    of similarity means less and the threshold is raised.
+    """
+    shortfall = max(0, 40 - len(address))
+    return min(MAX_THRESHOLD, BASE_THRESHOLD + shortfall)
+
+
+def hamming_similarity(a, b):
+    """Percentage of positions holding the same character."""
+    longest = max(len(a), len(b))
+    if not longest:
+        return 100.0
+    matches = sum(x == y for x, y in zip(a, b))
+    return 100.0 * matches / longest
+
+
+def similarity_score(a, b, threshold=None):
+    """Levenshtein similarity: 100 * (1 - distance / length of the longer string).
+
+    With a threshold, the distance computation stops as soon as the score
+    can no longer exceed it, and 0.0 is returned in that case.
+    """
+    longest = max(len(a), len(b))
+    if not longest:
+        return 100.0
+    if threshold is None:
+        return 100.0 * (1 - levenshtein_distance(a, b) / longest)
+
+    max_distance = max_distance_for(longest, threshold)
+    if max_distance < 0:
+        return 0.0
+    distance = levenshtein_distance(a, b, max_distance)
+    if distance > max_distance:
+        return 0.0
+    return 100.0 * (1 - distance / longest)
+
+
+def max_distance_for(length, threshold):
+    """Largest edit distance whose similarity still exceeds `threshold` for
+    strings whose longer one has `length` characters (-1 if none does)."""
+    distance = math.floor(length * (100.0 - threshold) / 100.0)
+    while distance >= 0 and 100.0 * (1 - distance / length) <= threshold:
+        distance -= 1
+    return distance
+
+
+def levenshtein_distance(a, b, max_distance=None):
+    """Edit distance between a and b.
+
+    If the distance is larger than `max_distance`, max_distance + 1 is
+    returned, usually without computing the full distance.
+    """
+    if Levenshtein is not None:
+        return Levenshtein.distance(a, b, score_cutoff=max_distance)
+    return bit_parallel_distance(a, b, max_distance)
+
+
+def bit_parallel_distance(a, b, max_distance=None):
+    """Pure-Python Myers/Hyyrö edit distance with early termination."""
+    if len(a) > len(b):
+        a, b = b, a
+    m, n = len(a), len(b)
+    if max_distance is None:
+        max_distance = n
+    if n - m > max_distance:
+        return max_distance + 1
+    if not m:
+        return n
+
+    # Bit i of peq[c] is set where a[i] == c
+    peq = {}
+    for i, char in enumerate(a):
+        peq[char] = peq.get(char, 0) | (1 << i)
+
+    mask = (1 << m) - 1
+    last = 1 << (m - 1)
+    vp, vn = mask, 0
+    score = m
+    # Cells on the diagonal ending in D[m][n] never decrease, so once the one
+    # in the current column exceeds max_distance the result will as well
+    diagonal = n - m
+
+    for j, char in enumerate(b, 1):
+        eq = peq.get(char, 0)
+        xv = eq | vn
+        xh = (((eq & vp) + vp) ^ vp) | eq
+        hp = (vn | ~(xh | vp)) & mask
+        hn = vp & xh
+        if hp & last:
+            score += 1
+        elif hn & last:
+            score -= 1
+        hp = ((hp << 1) | 1) & mask
+        hn = (hn << 1) & mask
+        vp = (hn | ~(xv | hp)) & mask
+        vn = hp & xv
+
+        row = j - diagonal
+        if row >= 0:
+            diagonal_cell = score - (vp >> row).bit_count() + (vn >> row).bit_count()
+            if diagonal_cell > max_distance:
+                return max_distance + 1
+
+    return score if score <= max_distance else max_distance + 1
+
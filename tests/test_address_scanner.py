@@ -0,0 +1,50 @@
+import random
+
+import address_scanner
+from address_scanner import content_digest, extract_addresses
+
+EVM = "0x52908400098527886e0f7030069857d2e4169ee7"
+BTC = "1BvBMSEYstWetqTFn5Au4m4GFg7xJaNVN2"
+BECH32 = "bc1qw508d6qejxtdg4y5r3zarvary0c5xw7kv8f3t4"
+
+
+def evm_address(rng):
+    return "0x" + "".join(rng.choice("0123456789abcdef") for _ in range(40))
+
+
+def test_extracts_valid_standalone_addresses_once_in_order():
+    text = (f"Send to {BTC}, or {EVM.upper().replace('0X', '0x')}.\n"
+            f"| {BECH32} | {EVM} |\n"
+            f"x{EVM} {EVM}00 {BTC[:-1]}0 1111111111111111111111111111")
+    found = extract_addresses(text)
+    assert [record.address for record in found] == [BTC, EVM, BECH32]
+
+
+def test_stops_at_max_addresses():
+    rng = random.Random(1)
+    addresses = [evm_address(rng) for _ in range(20)]
+    text = " ".join(addresses)
+    assert [record.address for record in extract_addresses(text, max_addresses=5)] == addresses[:5]
+    assert len(extract_addresses(text)) == 20
+
+
+def test_default_limit_caps_huge_lists():
+    rng = random.Random(2)
+    text = "\n".join(evm_address(rng) for _ in range(address_scanner.SCAN_MAX_ADDRESSES + 100))
+    assert len(extract_addresses(text)) == address_scanner.SCAN_MAX_ADDRESSES
+
+
+def test_only_the_first_scan_max_chars_are_scanned(monkeypatch):
+    monkeypatch.setattr(address_scanner, "SCAN_MAX_CHARS", 100)
+    inside = " " * 10 + EVM
+    assert [record.address for record in extract_addresses(inside + " " * 200 + BTC)] == [EVM]
+    # An address cut by the limit is not found
+    assert extract_addresses(" " * 80 + EVM) == []
+
+
+def test_digest_covers_only_the_scanned_part(monkeypatch):
+    monkeypatch.setattr(address_scanner, "SCAN_MAX_CHARS", 100)
+    head = "a" * 100
+    assert content_digest(head + "b" * 50) == content_digest(head + "c" * 50)
+    assert content_digest(head + "b" * 50) != content_digest(head + "b" * 51)
+    assert content_digest("short") != content_digest("shorT")
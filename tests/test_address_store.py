@@ -0,0 +1,56 @@
+import json
+import os
+
+import pytest
+
+from address_store import AddressStore
+
+EVM = "0x52908400098527886e0f7030069857d2e4169ee7"
+BTC = "1BvBMSEYstWetqTFn5Au4m4GFg7xJaNVN2"
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = AddressStore(str(tmp_path / "book.db"))
+    yield store
+    store.close()
+
+
+def test_legacy_json_is_migrated_once(tmp_path):
+    legacy = tmp_path / "addresses_data.json"
+    legacy.write_text(json.dumps({"trusted_addresses": {EVM: "savings", BTC: None}}))
+    store = AddressStore(str(tmp_path / "book.db"), legacy_json=str(legacy))
+    assert sorted(store.records()) == sorted([(EVM, "savings", "evm"), (BTC, "", "btc")])
+    assert not legacy.exists()
+    assert os.path.exists(str(legacy) + ".migrated")
+    store.close()
+
+    # A JSON file showing up again is migrated again, and the store is kept
+    legacy.write_text(json.dumps({"trusted_addresses": [BTC]}))
+    reopened = AddressStore(str(tmp_path / "book.db"), legacy_json=str(legacy))
+    assert len(reopened) == 2
+    reopened.close()
+
+
+def test_legacy_list_format(tmp_path):
+    legacy = tmp_path / "addresses_data.json"
+    legacy.write_text(json.dumps({"trusted_addresses": [EVM]}))
+    store = AddressStore(str(tmp_path / "book.db"), legacy_json=str(legacy))
+    assert list(store.labels()) == [(EVM, "")]
+    store.close()
+
+
+def test_upsert_adds_and_relabels_case_insensitively(store):
+    store.upsert(EVM, "savings")
+    store.upsert(BTC)
+    store.upsert(EVM.upper().replace("0X", "0x"), "cold")
+    assert len(store) == 2
+    assert dict(store.labels()) == {EVM.upper().replace("0X", "0x"): "cold", BTC: ""}
+    store.delete(BTC)
+    assert [address for address, _ in store.labels()] == [EVM.upper().replace("0X", "0x")]
+
+
+def test_replace_all(store):
+    store.upsert(EVM, "old")
+    store.replace_all({BTC: "new"})
+    assert list(store.records()) == [(BTC, "new", "btc")]
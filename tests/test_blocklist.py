@@ -0,0 +1,72 @@
+import os
+import random
+
+import pytest
+
+from blocklist import Blocklist, blocklist_payload, read_addresses, write_blocklist
+
+
+def random_payloads(rng, count):
+    return [bytes(rng.getrandbits(8) for _ in range(20)) for _ in range(count)]
+
+
+@pytest.mark.parametrize("count", [0, 1, 7, 1000])
+def test_round_trip(tmp_path, count):
+    rng = random.Random(count)
+    listed = random_payloads(rng, count)
+    path = str(tmp_path / "blocklist.bin")
+    # Duplicates are stored once
+    assert write_blocklist(path, listed + listed[:count // 2]) == count
+
+    blocklist = Blocklist(path)
+    try:
+        assert len(blocklist) == count
+        assert all(payload in blocklist for payload in listed)
+        assert not any(payload in blocklist for payload in random_payloads(rng, 1000))
+        assert b"" not in blocklist
+    finally:
+        blocklist.close()
+
+
+def test_addresses(tmp_path):
+    lines = [
+        "# known poisoning addresses",
+        "",
+        "0x5aAeb6053F3E94C9b9A09f33669435E7Ef1BeAed,2024-05-01",
+        "1A1zP1eP5QGefi2DMPTfTL5SLmv7DivfNa first seen 2024",
+        "not an address",
+        # Solana payloads are 32 bytes and cannot be listed
+        "So11111111111111111111111111111111111111112",
+    ]
+    payloads, skipped = read_addresses(lines)
+    assert skipped == 2
+    path = str(tmp_path / "blocklist.bin")
+    write_blocklist(path, payloads)
+
+    blocklist = Blocklist(path)
+    try:
+        # The case of an EVM address does not matter
+        assert blocklist.contains_address("0x5aaeb6053f3e94c9b9a09f33669435e7ef1beaed")
+        assert blocklist.contains_address("1A1zP1eP5QGefi2DMPTfTL5SLmv7DivfNa")
+        assert not blocklist.contains_address("0xfB6916095ca1df60bB79Ce92cE3Ea74c37c5d359")
+        assert blocklist_payload("So11111111111111111111111111111111111111112") is None
+    finally:
+        blocklist.close()
+
+
+def test_rejects_other_files(tmp_path):
+    path = str(tmp_path / "blocklist.bin")
+    write_blocklist(path, random_payloads(random.Random(1), 10))
+    with open(path, "rb") as f:
+        data = f.read()
+
+    with open(path, "wb") as f:
+        f.write(data[:-1])
+    with pytest.raises(ValueError):
+        Blocklist(path)
+
+    with open(path, "wb") as f:
+        f.write(b"not a blocklist" + data)
+    with pytest.raises(ValueError):
+        Blocklist(path)
+    assert os.path.exists(path)
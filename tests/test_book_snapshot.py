@@ -0,0 +1,118 @@
+import random
+
+import pytest
+
+import book_snapshot
+import clip_monitor
+from address_index import IndexedAddressBook
+from address_store import AddressStore
+
+EVM = "0x52908400098527886e0f7030069857d2e4169ee7"
+BTC = "1BvBMSEYstWetqTFn5Au4m4GFg7xJaNVN2"
+
+
+def evm_address(rng):
+    return "0x" + "".join(rng.choice("0123456789abcdef") for _ in range(40))
+
+
+@pytest.fixture
+def book():
+    rng = random.Random(1)
+    entries = {evm_address(rng): f"wallet {i}" for i in range(300)}
+    entries[BTC] = "btc"
+    entries["not an address"] = "legacy"
+    return IndexedAddressBook(entries)
+
+
+def records(book):
+    return sorted((record.address, record.key, record.chain, record.payload, record.label) for record in book.index)
+
+
+def test_round_trip(tmp_path, book):
+    path = str(tmp_path / "book.snapshot")
+    book_snapshot.write_snapshot(path, book, "token-1")
+    assert book_snapshot.is_current(path, "token-1")
+
+    loaded = book_snapshot.read_snapshot(path, "token-1")
+    assert records(loaded) == records(book)
+    packed, original = loaded.index.packed, book.index.packed
+    assert sorted(record.key for record in packed.records) == sorted(record.key for record in original.records)
+    for record in packed.records:
+        assert (packed.matrix[packed._rows[record.key]] == original.matrix[original._rows[record.key]]).all()
+
+    # The adopted matrix is a private copy: the loaded book can change
+    loaded[EVM] = "new"
+    del loaded[BTC]
+    assert EVM in loaded and BTC not in loaded
+    assert records(book_snapshot.read_snapshot(path, "token-1")) == records(book)
+
+
+def test_other_token_is_ignored(tmp_path, book):
+    path = str(tmp_path / "book.snapshot")
+    book_snapshot.write_snapshot(path, book, "token-1")
+    assert not book_snapshot.is_current(path, "token-2")
+    assert book_snapshot.read_snapshot(path, "token-2") is None
+
+
+def test_corruption_is_rejected(tmp_path, book):
+    path = str(tmp_path / "book.snapshot")
+    book_snapshot.write_snapshot(path, book, "token-1")
+    with open(path, "rb") as f:
+        data = bytearray(f.read())
+
+    flipped = bytearray(data)
+    flipped[len(flipped) // 2] ^= 0x01
+    with open(path, "wb") as f:
+        f.write(flipped)
+    # The header still matches; only the CRC catches the flipped bit
+    assert book_snapshot.is_current(path, "token-1")
+    assert book_snapshot.read_snapshot(path, "token-1") is None
+
+    for broken in (data[:-1], data[:book_snapshot.HEADER.size - 1], b""):
+        with open(path, "wb") as f:
+            f.write(broken)
+        assert book_snapshot.read_snapshot(path, "token-1") is None
+
+
+def test_missing_snapshot(tmp_path):
+    path = str(tmp_path / "missing.snapshot")
+    assert not book_snapshot.is_current(path, "token-1")
+    assert book_snapshot.read_snapshot(path, "token-1") is None
+
+
+def test_generation_changes_on_every_commit(tmp_path):
+    store = AddressStore(str(tmp_path / "book.db"))
+    seen = {store.generation()}
+    for change in (lambda: store.upsert(EVM), lambda: store.upsert(EVM, "relabelled"),
+                   lambda: store.delete(EVM), lambda: store.replace_all({BTC: "x"})):
+        change()
+        generation = store.generation()
+        assert generation not in seen
+        seen.add(generation)
+
+    # The token survives a restart, and another book never shares it
+    store.close()
+    reopened, other = AddressStore(store.path), AddressStore(str(tmp_path / "other.db"))
+    assert reopened.generation() == generation
+    assert other.generation() not in seen
+    reopened.close()
+    other.close()
+
+
+def test_load_addresses_ignores_a_stale_snapshot(monkeypatch, tmp_path):
+    monkeypatch.setattr(clip_monitor, "address_store", None)
+    monkeypatch.setattr(clip_monitor, "trusted_addresses", IndexedAddressBook())
+    path = str(tmp_path / "book.db")
+
+    clip_monitor.load_addresses(path)
+    clip_monitor.add_trusted(EVM, "savings")
+    clip_monitor.load_addresses(path)  # Snapshot written for this generation
+    clip_monitor.snapshot_writer.join()
+    assert book_snapshot.is_current(*clip_monitor.loaded_snapshot)
+
+    clip_monitor.add_trusted(BTC, "btc")
+    book = clip_monitor.load_addresses(path)
+    assert book.to_dict() == {EVM: "savings", BTC: "btc"}
+    clip_monitor.snapshot_writer.join()
+    clip_monitor.index_builder.join()
+    clip_monitor.address_store.close()
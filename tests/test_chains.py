@@ -0,0 +1,85 @@
+import pytest
+
+from chains import (BTC_BECH32, BTC_P2PKH, BTC_P2SH, EVM, SOLANA, TRON, base58check_decode, keccak256,
+                    validate_address)
+
+# EIP-55 test vectors
+EIP55_ADDRESSES = [
+    "0x5aAeb6053F3E94C9b9A09f33669435E7Ef1BeAed",
+    "0xfB6916095ca1df60bB79Ce92cE3Ea74c37c5d359",
+    "0xdbF03B407c01E7cD3CBea99509d93f8DDDC8C6FB",
+    "0xD1220A0cf47c7B9Be7A2E6BA89F429762e7b9aDb",
+]
+
+
+def test_keccak256():
+    assert keccak256(b"").hex() == "c5d2460186f7233c927e7db2dcc703c0e500b653ca82273b7bfad8045d85a470"
+    assert keccak256(b"abc").hex() == "4e03657aea45a94fc7d47ba826c8d667c0d1e6e33a64a036ec44f58fa12d6c45"
+    assert (keccak256(b"The quick brown fox jumps over the lazy dog").hex()
+            == "4d741b6f1eb29cb2a9b9911c82f56fa8d73b04959d3d9d222895df6c0b28aa15")
+
+
+@pytest.mark.parametrize("address", EIP55_ADDRESSES)
+def test_eip55_checksum(address):
+    assert validate_address(address) == (EVM, bytes.fromhex(address[2:]))
+    # All lowercase and all uppercase carry no checksum
+    assert validate_address("0x" + address[2:].lower())[0] is EVM
+    assert validate_address("0x" + address[2:].upper())[0] is EVM
+    # Flipping the case of one letter breaks the checksum
+    position = next(i for i, char in enumerate(address) if i > 1 and char.isalpha())
+    broken = address[:position] + address[position].swapcase() + address[position + 1:]
+    assert validate_address(broken) == (None, None)
+
+
+@pytest.mark.parametrize("address, chain_format, payload", [
+    ("1A1zP1eP5QGefi2DMPTfTL5SLmv7DivfNa", BTC_P2PKH, "62e907b15cbf27d5425399ebf6f0fb50ebb88f18"),
+    ("1BvBMSEYstWetqTFn5Au4m4GFg7xJaNVN2", BTC_P2PKH, "77bff20c60e522dfaa3350c39b030a5d004e839a"),
+    ("3J98t1WpEZ73CNmQviecrnyiWrnqRhWNLy", BTC_P2SH, "b472a266d0bd89c13706a4132ccfb16f7c3b9fcb"),
+    ("TR7NHqjeKQxGTCi8q8ZY4pL8otSzgjLj6t", TRON, "a614f803b6fd780986a42c78ec9c7f77e6ded13c"),
+])
+def test_base58check(address, chain_format, payload):
+    assert validate_address(address) == (chain_format, bytes.fromhex(payload))
+
+
+def test_base58check_rejects_a_bad_checksum():
+    assert base58check_decode("1A1zP1eP5QGefi2DMPTfTL5SLmv7DivfNb") is None
+    assert validate_address("1A1zP1eP5QGefi2DMPTfTL5SLmv7DivfNb") == (None, None)
+
+
+@pytest.mark.parametrize("address, payload", [
+    # The system program, also a valid P2PKH shape
+    ("11111111111111111111111111111111", "00" * 32),
+    # The wrapped SOL mint
+    ("So11111111111111111111111111111111111111112",
+     "069b8857feab8184fb687f634618c035dac439dc1aeb3b5598a0f00000000001"),
+])
+def test_solana(address, payload):
+    assert validate_address(address) == (SOLANA, bytes.fromhex(payload))
+
+
+@pytest.mark.parametrize("address, program", [
+    # BIP 173: P2WPKH and P2WSH, either case
+    ("BC1QW508D6QEJXTDG4Y5R3ZARVARY0C5XW7KV8F3T4", "751e76e8199196d454941c45d1b3a323f1433bd6"),
+    ("bc1qw508d6qejxtdg4y5r3zarvary0c5xw7kv8f3t4", "751e76e8199196d454941c45d1b3a323f1433bd6"),
+    ("bc1qrp33g0q5c5txsp9arysrx4k6zdkfs4nce4xj0gdcccefvpysxf3qccfmv3",
+     "1863143c14c5166804bd19203356da136c985678cd4d27a1b8c6329604903262"),
+    # BIP 350: witness version 1 (taproot) uses bech32m
+    ("bc1p0xlxvlhemja6c4dqv22uapctqupfhlxm9h8z3k2e72q4k9hcz7vqzk5jj0",
+     "79be667ef9dcbbac55a06295ce870b07029bfcdb2dce28d959f2815b16f81798"),
+])
+def test_bech32(address, program):
+    assert validate_address(address) == (BTC_BECH32, bytes.fromhex(program))
+
+
+@pytest.mark.parametrize("address", [
+    # Bad checksum
+    "bc1qw508d6qejxtdg4y5r3zarvary0c5xw7kv8f3t5",
+    # Mixed case
+    "bc1qw508d6qejxtdg4y5r3zarvary0c5xw7kv8f3T4",
+    # Version 0 with a bech32m checksum (BIP 350)
+    "bc1qw508d6qejxtdg4y5r3zarvary0c5xw7kn40wgf",
+    # Version 1 with a bech32 checksum (BIP 350)
+    "bc1p0xlxvlhemja6c4dqv22uapctqupfhlxm9h8z3k2e72q4k9hcz7vqh2y7hd",
+])
+def test_bech32_rejects(address):
+    assert validate_address(address) == (None, None)
@@ -0,0 +1,56 @@
+import random
+
+import pytest
+
+import clip_monitor
+from address_index import IndexedAddressBook
+from history import ClipboardHistory
+from verdict_cache import VerdictCache
+
+
+def evm_address(rng, prefix=""):
+    return "0x" + prefix + "".join(rng.choice("0123456789abcdef") for _ in range(40 - len(prefix)))
+
+
+@pytest.fixture
+def monitor(monkeypatch):
+    """clip_monitor with an empty book and history, scan mode on and the
+    clipboard left alone."""
+    monkeypatch.setattr(clip_monitor, "trusted_addresses", IndexedAddressBook())
+    monkeypatch.setattr(clip_monitor, "previously_copied_addresses", ClipboardHistory())
+    monkeypatch.setattr(clip_monitor, "verdict_cache", VerdictCache(64))
+    monkeypatch.setattr(clip_monitor, "blocklist", None)
+    monkeypatch.setattr(clip_monitor, "scan_mode", True)
+    monkeypatch.setattr(clip_monitor.pyperclip, "copy", lambda text: None)
+    return clip_monitor
+
+
+def test_scanned_clipboard_raises_one_alert(monitor):
+    rng = random.Random(1)
+    trusted = [evm_address(rng) for _ in range(3)]
+    for address in trusted:
+        monitor.trusted_addresses[address] = "trusted"
+    lookalikes = [evm_address(rng, address[2:10]) for address in trusted]
+    text = "Payouts:\n" + "\n".join(lookalikes) + "\n" + evm_address(rng)
+
+    calls = []
+    monitor.check_clipboard(text, lambda *args, **kwargs: calls.append(kwargs))
+
+    assert len(calls) == 1
+    assert [address for address, _ in calls[0]["alerts"]] == lookalikes
+    assert calls[0]["suspicious_address"] == lookalikes[0]
+    assert [verdict.matched_address for _, verdict in calls[0]["alerts"]] == trusted
+
+
+def test_copied_address_raises_one_alert(monitor):
+    rng = random.Random(2)
+    trusted = evm_address(rng)
+    monitor.trusted_addresses[trusted] = "trusted"
+    lookalike = evm_address(rng, trusted[2:10])
+
+    calls = []
+    monitor.check_clipboard(lookalike, lambda *args, **kwargs: calls.append(kwargs))
+
+    assert len(calls) == 1
+    assert calls[0]["alerts"] == [(lookalike, calls[0]["verdict"])]
+    assert calls[0]["verdict"].source == "book"
@@ -0,0 +1,100 @@
+import random
+import threading
+import time
+
+import clip_monitor
+from address_index import IndexedAddressBook
+from clipboard_sources import FakeClipboardSource, PollingClipboardSource
+from history import ClipboardHistory
+from verdict_cache import VerdictCache
+
+
+def evm_address(rng, prefix=""):
+    return "0x" + prefix + "".join(rng.choice("0123456789abcdef") for _ in range(40 - len(prefix)))
+
+
+def wait_in_thread(source, timeout):
+    """Starts source.wait_for_change in a thread; returns the thread and
+    the list its result is appended to."""
+    results = []
+    thread = threading.Thread(target=lambda: results.append(source.wait_for_change(timeout)))
+    thread.start()
+    return thread, results
+
+
+def test_fake_source_reports_each_change_once():
+    source = FakeClipboardSource("first")
+    assert source.read() == "first"
+    assert source.wait_for_change(0.01) is False
+    source.set("second")
+    assert source.wait_for_change(0.01) is True
+    assert source.wait_for_change(0.01) is True  # Not read yet
+    assert source.read() == "second"
+    assert source.wait_for_change(0.01) is False
+
+
+def test_fake_source_wakes_a_blocked_wait_on_set():
+    source = FakeClipboardSource()
+    source.read()
+    thread, results = wait_in_thread(source, 5)
+    time.sleep(0.05)
+    source.set("copied")
+    thread.join(1)
+    assert results == [True]
+
+
+def test_wake_interrupts_a_blocked_wait():
+    for source in (FakeClipboardSource(), PollingClipboardSource(interval=5)):
+        source.read = lambda: ""
+        thread, results = wait_in_thread(source, None)
+        time.sleep(0.05)
+        started = time.monotonic()
+        source.wake()
+        thread.join(1)
+        assert results == [False]
+        assert time.monotonic() - started < 1
+
+
+def test_polling_source_reports_a_possible_change_every_interval():
+    source = PollingClipboardSource(interval=0.01)
+    started = time.monotonic()
+    assert source.wait_for_change() is True
+    assert time.monotonic() - started < 1
+    # A longer timeout is capped at the interval
+    assert source.wait_for_change(10) is True
+
+
+def test_monitor_checks_changes_and_stops_when_woken(monkeypatch):
+    rng = random.Random(1)
+    book = IndexedAddressBook()
+    trusted = evm_address(rng)
+    book[trusted] = "trusted"
+    monkeypatch.setattr(clip_monitor, "trusted_addresses", book)
+    monkeypatch.setattr(clip_monitor, "previously_copied_addresses", ClipboardHistory())
+    monkeypatch.setattr(clip_monitor, "verdict_cache", VerdictCache(64))
+    monkeypatch.setattr(clip_monitor, "blocklist", None)
+    monkeypatch.setattr(clip_monitor.pyperclip, "copy", lambda text: None)
+
+    source = FakeClipboardSource()
+    active = threading.Event()
+    active.set()
+    alerts = []
+    alerted = threading.Event()
+
+    def callback(message, **kwargs):
+        alerts.append(kwargs["suspicious_address"])
+        alerted.set()
+
+    thread = threading.Thread(target=clip_monitor.monitor_clipboard, args=(callback, source, active))
+    thread.start()
+    safe = evm_address(rng)
+    source.set(safe)
+    lookalike = evm_address(rng, trusted[2:10])
+    source.set(lookalike)
+    assert alerted.wait(5)
+
+    active.clear()
+    source.wake()
+    thread.join(5)
+    assert not thread.is_alive()
+    assert alerts == [lookalike]
@@ -0,0 +1,72 @@
+import asyncio
+import json
+import random
+
+import pytest
+
+import clip_monitor
+from detection_service import DetectionService
+from verdict_cache import VerdictCache
+
+
+def evm_address(rng, prefix=""):
+    return "0x" + prefix + "".join(rng.choice("0123456789abcdef") for _ in range(40 - len(prefix)))
+
+
+@pytest.fixture
+def service(monkeypatch, tmp_path):
+    monkeypatch.setattr(clip_monitor, "verdict_cache", VerdictCache(64))
+    monkeypatch.setattr(clip_monitor, "blocklist", None)
+    service = DetectionService(str(tmp_path / "book.json"))
+    rng = random.Random(1)
+    for _ in range(50):
+        service.book[evm_address(rng)] = "trusted"
+    return service
+
+
+def test_batch_scores_like_single_checks(service):
+    rng = random.Random(2)
+    trusted = list(service.book)
+    addresses = ([evm_address(rng, address[2:10]) for address in trusted[:5]]
+                 + [evm_address(rng) for _ in range(5)] + trusted[5:8] + ["not an address", ""])
+    results = service._score(service.book, addresses)
+
+    assert set(results) == set(addresses)
+    for address in addresses:
+        if not clip_monitor.is_valid_address(address):
+            assert results[address] == {"address": address, "valid": False, "suspicious": False}
+            continue
+        clip_monitor.verdict_cache.clear()
+        verdict = clip_monitor.check_address(address, service.book, service.history)
+        assert results[address] == {**verdict.to_dict(), "address": address, "valid": True}
+    assert sum(result["suspicious"] for result in results.values()) == 5
+
+
+def exchange(service, request):
+    """Sends raw request bytes to the service and returns the status code."""
+    async def run():
+        server = await asyncio.start_server(service._handle_connection, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(request)
+            status_line = await reader.readline()
+            writer.close()
+            return int(status_line.split()[1])
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("length", ["abc", "-5", "1.5"])
+def test_bad_content_length_is_rejected(service, length):
+    request = f"POST /check HTTP/1.1\r\nContent-Length: {length}\r\n\r\n".encode("latin-1")
+    assert exchange(service, request) == 400
+
+
+def test_oversized_body_is_rejected(service):
+    request = b"POST /check HTTP/1.1\r\nContent-Length: 99999999\r\n\r\n"
+    assert exchange(service, request) == 413
+
+
+def test_health(service):
+    request = b"GET /health HTTP/1.1\r\nConnection: close\r\n\r\n"
+    assert exchange(service, request) == 200
@@ -0,0 +1,84 @@
+import random
+
+from address_record import make_record
+from history import ClipboardHistory
+
+
+def evm_address(rng):
+    return "0x" + "".join(rng.choice("0123456789abcdef") for _ in range(40))
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_count_limit_evicts_oldest_first():
+    rng = random.Random(1)
+    addresses = [evm_address(rng) for _ in range(5)]
+    history = ClipboardHistory(max_entries=3)
+    for address in addresses:
+        history.add(address)
+    assert list(history) == addresses[2:]
+    assert addresses[0] not in history
+    assert history.evictions == {"count": 2, "age": 0, "memory": 0}
+    # Evicted addresses leave the index too
+    assert history.index.get(addresses[0]) is None
+    assert len(history.index) == 3
+
+
+def test_adding_again_refreshes_an_entry():
+    rng = random.Random(2)
+    first, second, third = (evm_address(rng) for _ in range(3))
+    history = ClipboardHistory(max_entries=2)
+    history.add(first)
+    history.add(second)
+    history.add(first.upper().replace("0X", "0x"))
+    history.add(third)
+    assert list(history) == [first, third]
+
+
+def test_age_limit_expires_old_entries():
+    rng = random.Random(3)
+    clock = FakeClock()
+    history = ClipboardHistory(max_age=10, clock=clock)
+    old, new = evm_address(rng), evm_address(rng)
+    history.add(old)
+    clock.now = 6
+    history.add(new)
+    clock.now = 11
+    assert old not in history
+    assert new in history
+    assert len(history) == 1
+    assert history.evictions["age"] == 1
+    clock.now = 17
+    assert not history
+    assert len(history.index) == 0
+
+
+def test_memory_limit_bounds_the_estimate():
+    rng = random.Random(4)
+    entry = ClipboardHistory._entry_size(make_record(evm_address(rng)))
+    history = ClipboardHistory(max_bytes=entry * 10)
+    for _ in range(50):
+        history.add(evm_address(rng))
+    assert history.size_bytes <= entry * 10
+    assert len(history) == 10
+    assert history.evictions["memory"] == 40
+
+
+def test_discard_and_clear_keep_the_size_in_step():
+    rng = random.Random(5)
+    history = ClipboardHistory()
+    addresses = [evm_address(rng) for _ in range(4)]
+    for address in addresses:
+        history.add(address)
+    history.discard(addresses[1].upper().replace("0X", "0x"))
+    assert addresses[1] not in history
+    assert history.size_bytes == sum(ClipboardHistory._entry_size(make_record(a)) for a in addresses if a != addresses[1])
+    history.clear()
+    assert history.size_bytes == 0
+    assert len(history.index) == 0
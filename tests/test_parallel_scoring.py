@@ -0,0 +1,57 @@
+import random
+
+import pytest
+
+import clip_monitor
+from address_index import IndexedAddressBook
+from address_record import make_record
+from batch_scoring import score_many
+from history import ClipboardHistory
+from parallel_scoring import ScoringPool
+from verdict_cache import VerdictCache
+
+
+def evm_address(rng, prefix=""):
+    return "0x" + prefix + "".join(rng.choice("0123456789abcdef") for _ in range(40 - len(prefix)))
+
+
+@pytest.fixture(scope="module")
+def pool():
+    pool = ScoringPool(2, min_rows=1)
+    yield pool
+    pool.close()
+
+
+def test_best_match_agrees_with_serial_scores(pool):
+    rng = random.Random(1)
+    book = IndexedAddressBook({evm_address(rng): "" for _ in range(3000)})
+    for _ in range(20):
+        # Lookalikes sharing the middle, which the exact match rule misses
+        trusted = rng.choice(list(book))
+        query = make_record(evm_address(rng)[:12] + trusted[12:36] + evm_address(rng)[36:])
+        match, hamming = pool.best_match(query, book.index.packed)
+        assert hamming == score_many(query, book.index.packed).max()
+        assert make_record(match.address).key in book
+
+
+def test_small_batches_on_the_pool_match_serial(monkeypatch, pool):
+    rng = random.Random(2)
+    book = IndexedAddressBook({evm_address(rng): "" for _ in range(3000)})
+    trusted = list(book)[:3]
+    # Lookalikes differing at both ends, so only the Hamming pass finds them
+    records = [make_record(evm_address(rng)[:6] + address[6:38] + evm_address(rng)[38:]) for address in trusted]
+    records.append(make_record(evm_address(rng)))
+    assert all(book.index.exact_match(record) is None for record in records)
+    assert len(records) == clip_monitor.FIRST_MATCHES_MIN_RECORDS
+
+    monkeypatch.setattr(clip_monitor, "blocklist", None)
+    results = {}
+    for scoring_pool in (None, pool):
+        monkeypatch.setattr(clip_monitor, "scoring_pool", scoring_pool)
+        for group in (records[:1], records[:3]):
+            monkeypatch.setattr(clip_monitor, "verdict_cache", VerdictCache(64))
+            verdicts = clip_monitor.check_addresses(group, book, ClipboardHistory())
+            results.setdefault(len(group), []).append([verdict.suspicious for verdict in verdicts])
+    assert results[1] == [[True], [True]]
+    assert results[3] == [[True, True, True], [True, True, True]]
+    assert pool._processes
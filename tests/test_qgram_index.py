@@ -0,0 +1,68 @@
+import random
+
+import pytest
+
+from address_record import make_record
+import qgram_index
+from qgram_index import QGramIndex
+from similarity import similarity_score
+
+HEX_DIGITS = "0123456789abcdef"
+
+
+def random_key(rng):
+    return "0x" + "".join(rng.choice(HEX_DIGITS) for _ in range(rng.choice((40, 40, 38, 41))))
+
+
+def edited(rng, key, edits):
+    chars = list(key)
+    for _ in range(edits):
+        position = rng.randrange(2, len(chars))
+        operation = rng.choice("sid")
+        if operation == "i":
+            chars.insert(position, rng.choice(HEX_DIGITS))
+        elif operation == "d" and len(chars) > 3:
+            del chars[position]
+        else:
+            chars[position] = rng.choice(HEX_DIGITS)
+    return "".join(chars)
+
+
+def brute_force(records, key, threshold):
+    return [record.key for record in records
+            if record.key != key and similarity_score(key, record.key, threshold) > threshold]
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("rebuild_min_changes", [16, qgram_index.REBUILD_MIN_CHANGES])
+def test_search_matches_brute_force(monkeypatch, seed, rebuild_min_changes):
+    # Few changes force rebuilds of the postings between searches
+    monkeypatch.setattr(qgram_index, "REBUILD_MIN_CHANGES", rebuild_min_changes)
+    rng = random.Random(seed)
+    index = QGramIndex()
+    indexed = {}
+
+    keys = [random_key(rng) for _ in range(300)]
+    # Clusters of near keys, so most queries have matches
+    keys += [edited(rng, rng.choice(keys), rng.randint(1, 15)) for _ in range(300)]
+    index.extend(make_record(key) for key in keys[:400])
+    for key in keys[:400]:
+        indexed[key] = make_record(key)
+    for step, key in enumerate(keys[400:]):
+        # Single adds, removes and re-adds land in the pending postings
+        index.add(make_record(key))
+        indexed.pop(key, None)
+        indexed[key] = make_record(key)
+        if step % 5 == 0:
+            removed = rng.choice(list(indexed))
+            index.remove(removed)
+            del indexed[removed]
+
+        if step % 10 == 0:
+            records = list(indexed.values())
+            for _ in range(5):
+                query = edited(rng, rng.choice(list(indexed)), rng.randint(0, 15))
+                for threshold in (50.0, 70.0, 90.0):
+                    found = [record.key for record in index.search(query, threshold)]
+                    assert found == brute_force(records, query, threshold), (query, threshold)
+    assert len(index) == len(indexed)
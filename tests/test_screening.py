@@ -0,0 +1,68 @@
+import io
+import json
+import os
+import random
+
+import pytest
+
+import clip_monitor
+import screening
+from verdict_cache import VerdictCache
+
+
+def evm_address(rng, prefix=""):
+    return "0x" + prefix + "".join(rng.choice("0123456789abcdef") for _ in range(40 - len(prefix)))
+
+
+@pytest.fixture
+def book_file(monkeypatch, tmp_path):
+    monkeypatch.setattr(clip_monitor, "verdict_cache", VerdictCache(64))
+    monkeypatch.delenv("CLIPSHIELD_BLOCKLIST", raising=False)
+    rng = random.Random(1)
+    path = tmp_path / "book.json"
+    path.write_text(json.dumps({"trusted_addresses": {evm_address(rng): "trusted" for _ in range(200)}}))
+    return str(path)
+
+
+def screening_input(book_file):
+    rng = random.Random(2)
+    with open(book_file) as f:
+        trusted = list(json.load(f)["trusted_addresses"])
+    lines = [evm_address(rng, address[2:10]) for address in trusted[:20]]
+    lines += [evm_address(rng) for _ in range(500)]
+    lines += ["", "not an address", '{"address": "' + trusted[0] + '"}', '{"other": 1}']
+    rng.shuffle(lines)
+    return lines
+
+
+def run(book_file, lines, workers):
+    output = io.StringIO()
+    suspicious = screening.screen([line + "\n" for line in lines], output, book_file, workers)
+    return suspicious, [json.loads(line) for line in output.getvalue().splitlines()]
+
+
+def test_workers_match_serial_screening(book_file):
+    lines = screening_input(book_file)
+    serial = run(book_file, lines, 1)
+    assert serial[0] == 20
+    assert [result["line"] for result in serial[1]] == [i for i, line in enumerate(lines, 1) if line]
+    clip_monitor.verdict_cache.clear()
+    assert run(book_file, lines, 2) == serial
+
+
+def test_workers_leave_the_book_files_alone(book_file):
+    lines = screening_input(book_file)
+    run(book_file, lines, 1)
+    clip_monitor.snapshot_writer.join()
+    snapshot = book_file + ".snapshot"
+    before = {path: os.stat(path).st_mtime_ns for path in (book_file, snapshot)}
+    run(book_file, lines, 2)
+    assert {path: os.stat(path).st_mtime_ns for path in (book_file, snapshot)} == before
+
+
+def test_workers_get_the_entries_without_a_current_snapshot(monkeypatch, book_file):
+    lines = screening_input(book_file)
+    serial = run(book_file, lines, 1)
+    monkeypatch.setattr(screening.book_snapshot, "is_current", lambda path, token: False)
+    clip_monitor.verdict_cache.clear()
+    assert run(book_file, lines, 2) == serial
@@ -0,0 +1,91 @@
+import random
+
+import pytest
+
+import similarity
+from similarity import bit_parallel_distance, levenshtein_distance, similarity_score
+
+ALPHABETS = ["0123456789abcdef", "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz", "ab"]
+
+
+def random_string(rng, alphabet, length):
+    return "".join(rng.choice(alphabet) for _ in range(length))
+
+
+def mutate(rng, text, alphabet, edits):
+    chars = list(text)
+    for _ in range(edits):
+        position = rng.randrange(len(chars) + 1)
+        operation = rng.choice("sid")
+        if operation == "i" or not chars:
+            chars.insert(position, rng.choice(alphabet))
+        elif operation == "d":
+            del chars[min(position, len(chars) - 1)]
+        else:
+            chars[min(position, len(chars) - 1)] = rng.choice(alphabet)
+    return "".join(chars)
+
+
+def random_pairs(rng, count):
+    """Addresses with lookalikes, and arbitrary strings, of up to 70 characters."""
+    for _ in range(count):
+        alphabet = rng.choice(ALPHABETS)
+        a = random_string(rng, alphabet, rng.randint(0, 70))
+        if rng.random() < 0.7:
+            b = mutate(rng, a, alphabet, rng.randint(0, 20))
+        else:
+            b = random_string(rng, alphabet, rng.randint(0, 70))
+        yield a, b
+
+
+def reference_distance(a, b):
+    """Textbook dynamic programming edit distance."""
+    previous = list(range(len(b) + 1))
+    for i, x in enumerate(a, 1):
+        current = [i]
+        for j, y in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (x != y)))
+        previous = current
+    return previous[-1]
+
+
+def test_distance_matches_python_levenshtein():
+    Levenshtein = pytest.importorskip("Levenshtein")
+    for a, b in random_pairs(random.Random(1), 20000):
+        assert bit_parallel_distance(a, b) == Levenshtein.distance(a, b), (a, b)
+
+
+def test_distance_with_cutoff_matches_python_levenshtein():
+    Levenshtein = pytest.importorskip("Levenshtein")
+    for a, b in random_pairs(random.Random(2), 5000):
+        expected = Levenshtein.distance(a, b)
+        for max_distance in (0, 1, 5, 10, 20):
+            got = bit_parallel_distance(a, b, max_distance)
+            assert got == min(expected, max_distance + 1), (a, b, max_distance)
+            assert got == Levenshtein.distance(a, b, score_cutoff=max_distance)
+
+
+def test_score_with_threshold_is_exact_above_it():
+    for a, b in random_pairs(random.Random(3), 5000):
+        exact = similarity_score(a, b)
+        for threshold in (50.0, 70.0, 90.0):
+            got = similarity_score(a, b, threshold)
+            if exact > threshold:
+                assert got == exact, (a, b, threshold)
+            else:
+                assert got <= threshold, (a, b, threshold)
+
+
+def test_pure_python_path_matches_reference(monkeypatch):
+    monkeypatch.setattr(similarity, "Levenshtein", None)
+    for a, b in random_pairs(random.Random(4), 2000):
+        expected = reference_distance(a, b)
+        assert levenshtein_distance(a, b) == expected, (a, b)
+        for max_distance in (0, 1, 5, 10, 20):
+            assert levenshtein_distance(a, b, max_distance) == min(expected, max_distance + 1), (a, b, max_distance)
+        longest = max(len(a), len(b))
+        exact = 100.0 * (1 - expected / longest) if longest else 100.0
+        assert similarity_score(a, b) == exact, (a, b)
+        for threshold in (50.0, 70.0, 90.0):
+            got = similarity_score(a, b, threshold)
+            assert got == (exact if exact > threshold else 0.0), (a, b, threshold)
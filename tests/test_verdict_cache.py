@@ -0,0 +1,95 @@
+import random
+
+import pytest
+
+import clip_monitor
+from address_index import IndexedAddressBook
+from history import ClipboardHistory
+from verdict import Verdict
+from verdict_cache import VerdictCache, fingerprint
+
+
+def evm_address(rng, prefix=""):
+    return "0x" + prefix + "".join(rng.choice("0123456789abcdef") for _ in range(40 - len(prefix)))
+
+
+@pytest.fixture
+def book():
+    rng = random.Random(1)
+    return IndexedAddressBook({evm_address(rng): f"wallet {i}" for i in range(20)})
+
+
+def test_fingerprint_follows_keys_and_labels_not_order_or_case(book):
+    entries = book.to_dict()
+    same = IndexedAddressBook(dict(reversed(list(entries.items()))))
+    assert fingerprint(same.index) == fingerprint(book.index)
+    address = next(iter(entries))
+
+    relabelled = IndexedAddressBook(entries)
+    relabelled[address] = "renamed"
+    assert fingerprint(relabelled.index) != fingerprint(book.index)
+
+    removed = IndexedAddressBook(entries)
+    del removed[address]
+    assert fingerprint(removed.index) != fingerprint(book.index)
+
+    recased = IndexedAddressBook({key.upper().replace("0X", "0x"): label for key, label in entries.items()})
+    assert fingerprint(recased.index) == fingerprint(book.index)
+
+
+def test_lookups_need_matching_versions():
+    cache = VerdictCache(2)
+    verdict = Verdict("0xabc", 70.0)
+    cache.put("0xabc", (1, 1), verdict)
+    assert cache.get("0xabc", (1, 1)) is verdict
+    assert cache.get("0xabc", (2, 1)) is None
+    assert cache.get("0xabc", (1, 2)) is None
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = VerdictCache(2)
+    for key in ("a", "b"):
+        cache.put(key, (1, 1), Verdict(key, 70.0))
+    cache.get("a", (1, 1))
+    cache.put("c", (1, 1), Verdict("c", 70.0))
+    assert cache.get("b", (1, 1)) is None
+    assert cache.get("a", (1, 1)) is not None
+    assert len(cache) == 2
+
+
+def test_saved_verdicts_are_reused_only_for_the_same_book(monkeypatch, tmp_path, book):
+    rng = random.Random(2)
+    path = str(tmp_path / "verdicts.json")
+    monkeypatch.setattr(clip_monitor, "verdict_cache", VerdictCache(64))
+    monkeypatch.setattr(clip_monitor, "blocklist", None)
+    history = ClipboardHistory()
+    trusted = list(book)
+    safe = evm_address(rng)
+    lookalike = evm_address(rng, trusted[0][2:10])
+    copied = evm_address(rng)
+    history.add(copied)
+    history_lookalike = evm_address(rng, copied[2:10])
+    for address in (safe, lookalike, history_lookalike):
+        clip_monitor.check_address(address, book, history)
+    clip_monitor.save_verdict_cache(path, book)
+
+    # Same book after a restart: the book match and the safe verdict are
+    # reused, the history match is not kept
+    restarted, empty = IndexedAddressBook(book.to_dict()), ClipboardHistory()
+    monkeypatch.setattr(clip_monitor, "verdict_cache", VerdictCache(64))
+    assert clip_monitor.load_verdict_cache(path, restarted, empty) == 2
+    cache = clip_monitor.verdict_cache
+    assert clip_monitor.check_address(lookalike, restarted, empty).source == "book"
+    assert not clip_monitor.check_address(safe, restarted, empty).suspicious
+    assert (cache.hits, cache.misses) == (2, 0)
+    assert not clip_monitor.check_address(history_lookalike, restarted, empty).suspicious
+    assert cache.misses == 1
+
+    # A changed book, or a non-empty history, loads nothing
+    changed = IndexedAddressBook(book.to_dict())
+    changed[evm_address(rng)] = "new"
+    monkeypatch.setattr(clip_monitor, "verdict_cache", VerdictCache(64))
+    assert clip_monitor.load_verdict_cache(path, changed, ClipboardHistory()) == 0
+    assert clip_monitor.load_verdict_cache(path, restarted, history) == 0
+
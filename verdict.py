@@ -0,0 +1,74 @@
+import os
+
+from similarity import hamming_similarity, similarity_score
+
+# Fields of Verdict.to_dict, in order
+FIELDS = ("address", "suspicious", "source", "matched_address", "label", "threshold",
+          "levenshtein", "hamming", "prefix_length", "suffix_length")
+
+
+class Verdict:
+    """The outcome of scoring one copied address.
+
+    `source` is "book" or "history" when the address looks like a trusted
+    or previously copied address, "blocklist" when it is a known poisoning
+    address, and None when it is safe. For a match,
+    `matched_address` and `label` identify that address, `levenshtein` and
+    `hamming` are the similarities on the 0-100 scale of the similarity
+    module, and `prefix_length`/`suffix_length` count the leading and
+    trailing characters the two share. `threshold` is the dynamic threshold
+    the address was scored against.
+    """
+
+    __slots__ = ("address", "source", "matched_address", "label", "threshold",
+                 "levenshtein", "hamming", "prefix_length", "suffix_length")
+
+    def __init__(self, address, threshold, source=None, matched_address=None, label="",
+                 levenshtein=None, hamming=None, prefix_length=None, suffix_length=None):
+        self.address = address
+        self.threshold = threshold
+        self.source = source
+        self.matched_address = matched_address
+        self.label = label
+        self.levenshtein = levenshtein
+        self.hamming = hamming
+        self.prefix_length = prefix_length
+        self.suffix_length = suffix_length
+
+    @property
+    def suspicious(self):
+        return self.source is not None
+
+    def __repr__(self):
+        return f"Verdict({self.address!r}, source={self.source!r}, matched_address={self.matched_address!r})"
+
+    def evidence(self):
+        """Returns the similarity evidence as one line of text."""
+        if self.source == "blocklist":
+            return "Listed as a known address poisoning address"
+        return (f"Levenshtein {self.levenshtein:.0f}%, Hamming {self.hamming:.0f}%, "
+                f"first {self.prefix_length} and last {self.suffix_length} characters equal, "
+                f"threshold {self.threshold:.0f}%")
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in FIELDS}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**{field: data.get(field) for field in FIELDS if field != "suspicious"})
+
+
+def match_verdict(record, match, source, threshold):
+    """Returns the Verdict of `record` looking like the indexed `match`."""
+    key, other = record.key, match.key
+    return Verdict(
+        record.address,
+        threshold,
+        source=source,
+        matched_address=match.address,
+        label=match.label,
+        levenshtein=similarity_score(key, other),
+        hamming=hamming_similarity(key, other),
+        prefix_length=len(os.path.commonprefix([key, other])),
+        suffix_length=len(os.path.commonprefix([key[::-1], other[::-1]])),
+    )
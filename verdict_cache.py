@@ -0,0 +1,104 @@
+"""LRU cache of is_suspicious verdicts.
+
+A verdict (verdict.Verdict) only depends on the copied address, the trusted
+address book and the clipboard history, so it is cached under the address
+key together with the versions of the book and history indexes
+(AddressIndex.version). Any mutation of either index changes its version,
+and older entries simply stop matching and age out of the LRU.
+
+Verdicts can be saved to a JSON file and loaded after a restart, when the
+history starts out empty. A safe verdict stays safe against an empty history
+and a book match does not depend on the history, so those are saved, along
+with a fingerprint of the book; they are only reused when the book's
+fingerprint still matches. Matches against the history are not saved.
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import metrics
+from verdict import Verdict
+
+CACHE_FORMAT = 2
+
+
+def fingerprint(index):
+    """Returns a digest of the keys and labels of an AddressIndex."""
+    digest = hashlib.blake2b(digest_size=16)
+    for key, label in sorted((record.key, record.label) for record in index):
+        digest.update(f"{key}\0{label}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+class VerdictCache:
+    """Bounded LRU map of address key -> verdict at (book version, history
+    version).
+
+    `hits` and `misses` count lookups since the cache was created.
+    """
+
+    def __init__(self, max_entries=4096):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # address key -> (versions, verdict)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, versions):
+        """Returns the cached verdict of `key` at `versions`, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            hit = entry is not None and entry[0] == versions
+            if hit:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+        metrics.inc("verdict_cache_hits_total" if hit else "verdict_cache_misses_total")
+        return entry[1] if hit else None
+
+    def put(self, key, versions, verdict):
+        with self._lock:
+            self._entries[key] = (versions, verdict)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+    def save(self, path, book_version, fingerprint):
+        """Writes the verdicts computed against the book at `book_version`
+        that do not depend on the history to `path` atomically."""
+        with self._lock:
+            verdicts = [[key, verdict.to_dict()] for key, (versions, verdict) in self._entries.items()
+                        if versions[0] == book_version and verdict.source != "history"]
+        temporary = f"{path}.tmp"
+        with open(temporary, "w") as f:
+            json.dump({"format": CACHE_FORMAT, "fingerprint": fingerprint, "verdicts": verdicts}, f)
+        os.replace(temporary, path)
+
+    def load(self, path, versions, fingerprint):
+        """Loads the verdicts saved in `path` as verdicts at `versions` if
+        they were saved for a book with the same fingerprint. The history
+        must be empty. Returns how many verdicts were loaded."""
+        try:
+            with open(path) as f:
+                saved = json.load(f)
+        except FileNotFoundError:
+            return 0
+        if saved.get("format") != CACHE_FORMAT or saved.get("fingerprint") != fingerprint:
+            return 0
+        verdicts = saved.get("verdicts", [])
+        for key, verdict in verdicts:
+            self.put(key, versions, Verdict.from_dict(verdict))
+        return len(verdicts)